@@ -0,0 +1,79 @@
+"""
+Per-keystroke latency of the autocomplete index vs the old linear scan.
+
+  python -m bench.autocomplete [num_entries]
+"""
+
+import random
+import string
+import sys
+import time
+
+import emoji
+from discord import app_commands
+
+from bot.cogs.ui.autocomplete import AutocompleteIndex, react_display_name
+
+UNICODE_REACTS = list(emoji.EMOJI_DATA)
+
+
+def make_reacts(n: int, rng: random.Random) -> list[str]:
+  reacts = []
+  for i in range(n):
+    if i % 2:
+      name = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 12)))
+      reacts.append(f"<:{name}:{10**17 + i}>")
+    else:
+      reacts.append(UNICODE_REACTS[i % len(UNICODE_REACTS)])
+  return reacts
+
+
+def linear_search(reacts: list[str], current: str) -> list[app_commands.Choice[str]]:
+  """The pre-index implementation: demojize + substring on every keystroke."""
+  autocomplete_list = []
+  for e in reacts:
+    display_name = react_display_name(e)
+    if current.lower() in display_name.lower():
+      autocomplete_list.append(
+        app_commands.Choice(name=f"{e} ({display_name})", value=e)
+      )
+  return autocomplete_list[:25]
+
+
+def time_per_call(fn, queries: list[str], repeat: int) -> float:
+  start = time.perf_counter()
+  for _ in range(repeat):
+    for q in queries:
+      fn(q)
+  return (time.perf_counter() - start) / (repeat * len(queries))
+
+
+def main() -> None:
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+  rng = random.Random(0)
+  reacts = make_reacts(n, rng)
+
+  # Keystroke sequences: each query is a prefix of something being typed
+  words = ["tank", "healer", "dps", "smiling", "zzzq"]
+  queries = [w[: k + 1] for w in words for k in range(len(w))]
+
+  start = time.perf_counter()
+  entries = []
+  for e in reacts:
+    display_name = react_display_name(e)
+    entries.append((display_name, f"{e} ({display_name})", e))
+  index = AutocompleteIndex(entries)
+  build = time.perf_counter() - start
+
+  linear = time_per_call(lambda q: linear_search(reacts, q), queries, repeat=3)
+  indexed = time_per_call(index.search, queries, repeat=50)
+
+  print(f"entries:           {n}")
+  print(f"index build:       {build * 1e3:8.2f} ms (once per config change)")
+  print(f"linear / keystroke:{linear * 1e6:10.1f} us")
+  print(f"index / keystroke: {indexed * 1e6:10.1f} us")
+  print(f"speedup:           {linear / indexed:8.1f}x")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,973 @@
+"""
+A local stand-in for the parts of Discord's REST API and gateway the bot
+uses, for load tests that never touch Discord.
+
+It serves synthetic guilds, each with a signup post whose reactions are
+paged like Discord pages them, answers member chunk requests on the
+gateway, and accepts channel messages and interaction responses. Routes
+are rate limited per bucket and globally, with Discord's headers and 429
+bodies, and every response can be delayed.
+
+  python -m bench.fake_discord [--port 8900] [--guilds 1] [--members 10000]
+      [--latency-ms 0] [--jitter-ms 0] [--bucket-limit 5] [--global-limit 50]
+
+Point the bot at it with `DISCORD_API_URL=http://127.0.0.1:8900` (any
+`DISCORD_TOKEN` works). `GET /_fake/world` describes the guilds (ids to
+configure signups with), `POST /_fake/interactions` runs a slash command
+as a user and waits for its result, `POST /_fake/reactions` adds a
+signup, and `GET /_fake/stats` counts requests and 429s.
+`bench/load.py` drives all of it.
+
+Run from the repo root.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import dataclass, field
+
+from aiohttp import WSMsgType, web
+
+API_PREFIX = "/api/v10"
+
+BOT_ID = 1 << 32
+# Gateway heartbeat interval sent in HELLO, ms
+HEARTBEAT_INTERVAL = 41_250
+
+# Discord caps reaction user pages at 100 and member chunks at 1000
+REACTION_PAGE_LIMIT = 100
+MEMBER_CHUNK_SIZE = 1000
+
+# Roles on every member are drawn from these: a few GvG roles, the rest noise
+N_GVG_ROLES = 8
+N_OTHER_ROLES = 32
+
+# Interaction callback types that only acknowledge; the result comes later
+DEFERRED_CALLBACKS = {5, 6}
+
+
+def snowflake(n: int) -> int:
+  """Snowflake-shaped id: `n` in the timestamp bits, so guilds spread over shards."""
+  return (1 << 42) + (n << 22)
+
+
+def parse_emoji(path_emoji: str) -> str:
+  """Reaction route emoji (`name` or `name:id`) -> message text form."""
+  name, _, emoji_id = path_emoji.partition(":")
+  return f"<:{name}:{emoji_id}>" if emoji_id else name
+
+
+def json_response(data, status: int = 200, headers: dict[str, str] | None = None) -> web.Response:
+  # Exactly `application/json`: discord.py treats anything else as text
+  headers = {**(headers or {}), "Content-Type": "application/json"}
+  return web.Response(body=json.dumps(data).encode(), status=status, headers=headers)
+
+
+@dataclass
+class FakeMember:
+  id: int
+  name: str
+  role_ids: list[int]
+
+
+@dataclass
+class FakeGuild:
+  id: int
+  name: str
+  gvg_role_ids: list[int]
+  other_role_ids: list[int]
+  signup_channel_id: int
+  management_channel_id: int
+  post_id: int
+  members: dict[int, FakeMember]
+  # Emoji -> sorted user ids that reacted with it, paged with `after`
+  reactions: dict[str, list[int]]
+
+  @property
+  def role_ids(self) -> list[int]:
+    return self.gvg_role_ids + self.other_role_ids
+
+  @property
+  def channel_ids(self) -> list[int]:
+    return [self.signup_channel_id, self.management_channel_id]
+
+
+def make_world(
+  n_guilds: int, n_members: int, n_reactors: int, n_reacts: int, seed: int = 0
+) -> list[FakeGuild]:
+  """Guilds of `n_members`, `n_reactors` of which react to the signup post."""
+  rng = random.Random(seed)
+  # Regional indicator letters, so every react is a real emoji
+  reacts = [chr(0x1F1E6 + i) for i in range(n_reacts)]
+  guilds = []
+  next_id = 1
+  for g in range(n_guilds):
+    ids = [snowflake(next_id + i) for i in range(4 + N_GVG_ROLES + N_OTHER_ROLES)]
+    next_id += len(ids)
+    guild_id, signup_channel_id, management_channel_id, post_id = ids[:4]
+    gvg_role_ids = ids[4 : 4 + N_GVG_ROLES]
+    other_role_ids = ids[4 + N_GVG_ROLES :]
+
+    members = {}
+    for _ in range(n_members):
+      user_id = snowflake(next_id)
+      next_id += 1
+      roles = rng.sample(gvg_role_ids, k=rng.randint(1, 3)) + rng.sample(other_role_ids, k=3)
+      members[user_id] = FakeMember(user_id, f"Member {len(members)}", roles)
+
+    reactors = rng.sample(sorted(members), k=min(n_reactors, n_members))
+    reactions = {r: set() for r in reacts}
+    for user_id in reactors:
+      for react in rng.sample(reacts, k=rng.randint(1, min(3, n_reacts))):
+        reactions[react].add(user_id)
+
+    guilds.append(
+      FakeGuild(
+        id=guild_id,
+        name=f"Fake Guild {g}",
+        gvg_role_ids=gvg_role_ids,
+        other_role_ids=other_role_ids,
+        signup_channel_id=signup_channel_id,
+        management_channel_id=management_channel_id,
+        post_id=post_id,
+        members=members,
+        reactions={r: sorted(users) for r, users in reactions.items()},
+      )
+    )
+  return guilds
+
+
+# Payloads, shaped like Discord's (only the fields discord.py reads)
+
+
+def user_payload(user_id: int, name: str, bot: bool = False) -> dict:
+  return {
+    "id": str(user_id),
+    "username": name.lower().replace(" ", ""),
+    "global_name": name,
+    "discriminator": "0",
+    "avatar": None,
+    "bot": bot,
+  }
+
+
+def member_payload(member: FakeMember) -> dict:
+  return {
+    "user": user_payload(member.id, member.name),
+    "nick": None,
+    "roles": [str(r) for r in member.role_ids],
+    "joined_at": "2024-01-01T00:00:00+00:00",
+    "deaf": False,
+    "mute": False,
+    "flags": 0,
+  }
+
+
+def bot_member_payload() -> dict:
+  payload = member_payload(FakeMember(BOT_ID, "GvG Bot", []))
+  payload["user"] = user_payload(BOT_ID, "GvG Bot", bot=True)
+  return payload
+
+
+def role_payload(role_id: int, name: str, position: int) -> dict:
+  return {
+    "id": str(role_id),
+    "name": name,
+    "color": 0,
+    "hoist": False,
+    "position": position,
+    "permissions": "0",
+    "managed": False,
+    "mentionable": False,
+    "flags": 0,
+  }
+
+
+def channel_payload(guild: FakeGuild, channel_id: int) -> dict:
+  name = "signups" if channel_id == guild.signup_channel_id else "gvg-management"
+  return {
+    "id": str(channel_id),
+    "type": 0,
+    "guild_id": str(guild.id),
+    "name": name,
+    "position": guild.channel_ids.index(channel_id),
+    "permission_overwrites": [],
+    "nsfw": False,
+    "parent_id": None,
+    "topic": None,
+    "last_message_id": None,
+    "rate_limit_per_user": 0,
+  }
+
+
+def guild_payload(guild: FakeGuild) -> dict:
+  roles = [role_payload(guild.id, "@everyone", 0)]
+  roles += [role_payload(r, f"gvg-{i}", i + 1) for i, r in enumerate(guild.gvg_role_ids)]
+  roles += [
+    role_payload(r, f"role-{i}", N_GVG_ROLES + i + 1) for i, r in enumerate(guild.other_role_ids)
+  ]
+  return {
+    "id": str(guild.id),
+    "name": guild.name,
+    "owner_id": str(next(iter(guild.members), BOT_ID)),
+    "roles": roles,
+    "emojis": [],
+    "stickers": [],
+    "features": [],
+    "channels": [channel_payload(guild, c) for c in guild.channel_ids],
+    "threads": [],
+    "member_count": len(guild.members) + 1,
+    "large": True,
+    # Large guilds only send the bot's own member up front
+    "members": [bot_member_payload()],
+    "unavailable": False,
+  }
+
+
+def message_payload(
+  channel_id: int,
+  message_id: int,
+  content: str,
+  author: dict,
+  guild_id: int | None = None,
+  reactions: dict[str, list[int]] | None = None,
+) -> dict:
+  data = {
+    "id": str(message_id),
+    "channel_id": str(channel_id),
+    "author": author,
+    "content": content,
+    "timestamp": "2024-01-01T00:00:00+00:00",
+    "edited_timestamp": None,
+    "tts": False,
+    "mention_everyone": False,
+    "mentions": [],
+    "mention_roles": [],
+    "attachments": [],
+    "embeds": [],
+    "pinned": False,
+    "type": 0,
+    "flags": 0,
+    "components": [],
+  }
+  if guild_id is not None:
+    data["guild_id"] = str(guild_id)
+  if reactions is not None:
+    data["reactions"] = [
+      {
+        "emoji": {"id": None, "name": emoji},
+        "count": len(users),
+        "count_details": {"normal": len(users), "burst": 0},
+        "me": False,
+        "me_burst": False,
+        "burst_colors": [],
+      }
+      for emoji, users in reactions.items()
+      if users
+    ]
+  return data
+
+
+@dataclass
+class RateLimits:
+  """Discord-style limits: per route bucket (per major parameter) and global."""
+
+  bucket_limit: int = 5
+  bucket_window: float = 1.0
+  global_limit: int = 50
+  # Fraction of requests refused with a sub-limit 429 that the headers didn't predict
+  random_429: float = 0.0
+
+
+@dataclass
+class _Window:
+  reset_at: float
+  count: int = 0
+
+
+class RateLimiter:
+  """Fixed windows per bucket, like Discord's reset-after accounting."""
+
+  def __init__(self, limits: RateLimits) -> None:
+    self.limits = limits
+    self._buckets: dict[tuple, _Window] = {}
+    self._global = _Window(0.0)
+    self._rng = random.Random(0)
+
+  @staticmethod
+  def _take(window: _Window, length: float, now: float) -> None:
+    if now >= window.reset_at:
+      window.reset_at = now + length
+      window.count = 0
+    window.count += 1
+
+  def check(self, key: tuple, bucket_hash: str, global_limited: bool) -> tuple[str | None, dict]:
+    """The kind of 429 to send (None if allowed), and the headers to send."""
+    limits = self.limits
+    now = time.time()
+    window = self._buckets.setdefault(key, _Window(0.0))
+    self._take(window, limits.bucket_window, now)
+    reset_after = max(window.reset_at - now, 0.0)
+    headers = {
+      "X-RateLimit-Limit": str(limits.bucket_limit),
+      "X-RateLimit-Remaining": str(max(limits.bucket_limit - window.count, 0)),
+      "X-RateLimit-Reset": f"{window.reset_at:.3f}",
+      "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+      "X-RateLimit-Bucket": bucket_hash,
+    }
+
+    if global_limited:
+      self._take(self._global, 1.0, now)
+      if self._global.count > limits.global_limit:
+        return "global", {"X-RateLimit-Global": "true", "X-RateLimit-Scope": "global"}
+    if window.count > limits.bucket_limit:
+      return "bucket", {**headers, "X-RateLimit-Scope": "user"}
+    if limits.random_429 and self._rng.random() < limits.random_429:
+      return "shared", {**headers, "X-RateLimit-Scope": "shared"}
+    return None, headers
+
+  def retry_after(self, kind: str, key: tuple) -> float:
+    now = time.time()
+    if kind == "global":
+      return max(self._global.reset_at - now, 0.001)
+    if kind == "bucket":
+      return max(self._buckets[key].reset_at - now, 0.001)
+    return 0.1
+
+
+@dataclass
+class InteractionResult:
+  name: str
+  # Seconds from dispatch to the callback, and to the result
+  ack: float | None = None
+  done: float | None = None
+  # Callback types and webhook calls, in order
+  calls: list[str] = field(default_factory=list)
+
+
+@dataclass
+class _PendingInteraction:
+  result: InteractionResult
+  sent_at: float
+  finished: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class _GatewaySession:
+  def __init__(self, ws: web.WebSocketResponse) -> None:
+    self.ws = ws
+    self.seq = 0
+    self.shard = (0, 1)
+    self.lock = asyncio.Lock()
+
+  async def dispatch(self, event: str, data: dict) -> None:
+    async with self.lock:
+      self.seq += 1
+      await self.ws.send_str(json.dumps({"op": 0, "t": event, "s": self.seq, "d": data}))
+
+
+class FakeDiscord:
+  """The fake API's state: guilds, sessions, limits, latency and counters."""
+
+  def __init__(
+    self,
+    guilds: list[FakeGuild],
+    limits: RateLimits | None = None,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    shard_count: int = 1,
+  ) -> None:
+    self.guilds = {g.id: g for g in guilds}
+    self.limits = limits or RateLimits()
+    self.ratelimiter = RateLimiter(self.limits)
+    self.latency = latency
+    self.jitter = jitter
+    self.shard_count = shard_count
+    self.url = ""
+
+    self._sessions: dict[int, _GatewaySession] = {}
+    self._interactions: dict[str, _PendingInteraction] = {}
+    self._commands: dict[str, int] = {}
+    self._next_id = 1 << 20
+    self._rng = random.Random(1)
+
+    # "METHOD /route/{template}" -> requests, and 429s by kind
+    self.requests: Counter[str] = Counter()
+    self.limited: Counter[str] = Counter()
+    self.chunk_requests = 0
+    self.members_chunked = 0
+    self.messages_sent = 0
+    self.identified = 0
+
+  def new_id(self) -> int:
+    self._next_id += 1
+    return snowflake(self._next_id)
+
+  def guild_of_channel(self, channel_id: int) -> FakeGuild | None:
+    for guild in self.guilds.values():
+      if channel_id in guild.channel_ids:
+        return guild
+    return None
+
+  def shard_of(self, guild_id: int) -> int:
+    return (guild_id >> 22) % self.shard_count
+
+  async def delay(self) -> None:
+    if self.latency or self.jitter:
+      await asyncio.sleep(self.latency + self._rng.uniform(0, self.jitter))
+
+  def is_ready(self) -> bool:
+    """Every shard has identified."""
+    return len(self._sessions) == self.shard_count
+
+  def stats(self) -> dict:
+    return {
+      "requests": dict(self.requests.most_common()),
+      "total_requests": sum(self.requests.values()),
+      "rate_limited": dict(self.limited),
+      "chunk_requests": self.chunk_requests,
+      "members_chunked": self.members_chunked,
+      "messages_sent": self.messages_sent,
+      "identified": self.identified,
+      "shards_connected": len(self._sessions),
+    }
+
+  def world(self) -> list[dict]:
+    return [
+      {
+        "guild_id": g.id,
+        "management_channel_id": g.management_channel_id,
+        "signup_channel_id": g.signup_channel_id,
+        "post_id": g.post_id,
+        "gvg_role_ids": g.gvg_role_ids,
+        "reacts": list(g.reactions),
+        "members": len(g.members),
+        "reactors": len(set().union(*map(set, g.reactions.values()))),
+      }
+      for g in self.guilds.values()
+    ]
+
+  # Gateway
+
+  async def gateway(self, request: web.Request) -> web.WebSocketResponse:
+    ws = web.WebSocketResponse(max_msg_size=0)
+    await ws.prepare(request)
+    session = _GatewaySession(ws)
+    await ws.send_str(json.dumps({"op": 10, "d": {"heartbeat_interval": HEARTBEAT_INTERVAL}}))
+
+    try:
+      async for msg in ws:
+        if msg.type != WSMsgType.TEXT:
+          continue
+        payload = json.loads(msg.data)
+        op, data = payload["op"], payload.get("d")
+        if op == 1:
+          await ws.send_str(json.dumps({"op": 11}))
+        elif op == 2:
+          await self._identify(session, data)
+        elif op == 6:
+          # Sessions aren't kept, so resuming always starts over
+          await ws.send_str(json.dumps({"op": 9, "d": False}))
+        elif op == 8:
+          asyncio.create_task(self._send_member_chunks(session, data))
+    finally:
+      if self._sessions.get(session.shard[0]) is session:
+        del self._sessions[session.shard[0]]
+    return ws
+
+  async def _identify(self, session: _GatewaySession, data: dict) -> None:
+    shard_id, shard_count = data.get("shard") or [0, 1]
+    session.shard = (shard_id, shard_count)
+    self._sessions[shard_id] = session
+    self.identified += 1
+    guilds = [g for g in self.guilds.values() if self.shard_of(g.id) == shard_id]
+
+    await session.dispatch(
+      "READY",
+      {
+        "v": 10,
+        "user": user_payload(BOT_ID, "GvG Bot", bot=True),
+        "guilds": [{"id": str(g.id), "unavailable": True} for g in guilds],
+        "session_id": f"fake-{shard_id}-{self.identified}",
+        "resume_gateway_url": self.gateway_url,
+        "shard": [shard_id, shard_count],
+        "application": {"id": str(BOT_ID), "flags": 0},
+      },
+    )
+    for guild in guilds:
+      await session.dispatch("GUILD_CREATE", guild_payload(guild))
+
+  async def _send_member_chunks(self, session: _GatewaySession, data: dict) -> None:
+    self.chunk_requests += 1
+    guild = self.guilds.get(int(data["guild_id"]))
+    members = []
+    if guild is not None:
+      if data.get("user_ids"):
+        members = [guild.members[int(u)] for u in data["user_ids"] if int(u) in guild.members]
+      else:
+        query = (data.get("query") or "").lower()
+        members = [m for m in guild.members.values() if m.name.lower().startswith(query)]
+        if data.get("limit"):
+          members = members[: data["limit"]]
+
+    chunks = [members[i : i + MEMBER_CHUNK_SIZE] for i in range(0, len(members), MEMBER_CHUNK_SIZE)]
+    for index, chunk in enumerate(chunks or [[]]):
+      await self.delay()
+      self.members_chunked += len(chunk)
+      await session.dispatch(
+        "GUILD_MEMBERS_CHUNK",
+        {
+          "guild_id": data["guild_id"],
+          "members": [member_payload(m) for m in chunk],
+          "chunk_index": index,
+          "chunk_count": len(chunks) or 1,
+          "nonce": data.get("nonce"),
+        },
+      )
+
+  @property
+  def gateway_url(self) -> str:
+    return self.url.replace("http", "ws", 1) + "/gateway"
+
+  # Driving the bot
+
+  async def interact(
+    self,
+    guild_id: int,
+    name: str,
+    options: dict[str, str | int] | None = None,
+    timeout: float = 30.0,
+  ) -> InteractionResult:
+    """
+    Run slash command `name` as a random member and wait for its result:
+    a non-deferred callback, or the first call on the interaction webhook.
+    `done` stays None if that doesn't happen within `timeout`.
+    """
+    guild = self.guilds[guild_id]
+    session = self._sessions[self.shard_of(guild_id)]
+    member = guild.members[self._rng.choice(list(guild.members))]
+
+    data_options, resolved_roles = [], {}
+    for option, value in (options or {}).items():
+      if value in guild.role_ids:
+        data_options.append({"name": option, "type": 8, "value": str(value)})
+        resolved_roles[str(value)] = role_payload(int(value), f"gvg-{value}", 1)
+      else:
+        data_options.append({"name": option, "type": 3, "value": str(value)})
+
+    interaction_id = self.new_id()
+    token = f"fake-token-{interaction_id}"
+    pending = _PendingInteraction(InteractionResult(name), time.perf_counter())
+    self._interactions[token] = pending
+    command_data = {
+      "id": str(self._commands.get(name, self.new_id())),
+      "name": name,
+      "type": 1,
+      "options": data_options,
+    }
+    if resolved_roles:
+      command_data["resolved"] = {"roles": resolved_roles}
+
+    await session.dispatch(
+      "INTERACTION_CREATE",
+      {
+        "id": str(interaction_id),
+        "application_id": str(BOT_ID),
+        "type": 2,
+        "token": token,
+        "version": 1,
+        "guild_id": str(guild_id),
+        "channel_id": str(guild.management_channel_id),
+        "channel": channel_payload(guild, guild.management_channel_id),
+        "member": {**member_payload(member), "permissions": "8"},
+        "app_permissions": "8",
+        "locale": "en-US",
+        "guild_locale": "en-US",
+        "entitlements": [],
+        "authorizing_integration_owners": {"0": str(guild_id)},
+        "context": 0,
+        "attachment_size_limit": 10 * 1024 * 1024,
+        "data": command_data,
+      },
+    )
+    try:
+      await asyncio.wait_for(pending.finished.wait(), timeout)
+    except asyncio.TimeoutError:
+      pass
+    finally:
+      self._interactions.pop(token, None)
+    return pending.result
+
+  async def add_reaction(self, guild_id: int) -> int | None:
+    """A member who hasn't signed up reacts to the post; returns their id."""
+    guild = self.guilds[guild_id]
+    react = self._rng.choice(list(guild.reactions))
+    users = guild.reactions[react]
+    sample = self._rng.sample(list(guild.members), k=min(50, len(guild.members)))
+    candidates = [u for u in sample if u not in users]
+    if not candidates:
+      return None
+
+    user_id = candidates[0]
+    users.insert(bisect_right(users, user_id), user_id)
+    session = self._sessions.get(self.shard_of(guild_id))
+    if session is not None:
+      await session.dispatch(
+        "MESSAGE_REACTION_ADD",
+        {
+          "user_id": str(user_id),
+          "channel_id": str(guild.signup_channel_id),
+          "message_id": str(guild.post_id),
+          "guild_id": str(guild_id),
+          "member": member_payload(guild.members[user_id]),
+          "emoji": {"id": None, "name": react},
+          "burst": False,
+          "burst_colors": [],
+          "type": 0,
+        },
+      )
+    return user_id
+
+  def _interaction_call(self, token: str, call: str, final: bool) -> None:
+    pending = self._interactions.get(token)
+    if pending is None:
+      return
+
+    result = pending.result
+    elapsed = time.perf_counter() - pending.sent_at
+    result.calls.append(call)
+    if result.ack is None:
+      result.ack = elapsed
+    if final and result.done is None:
+      result.done = elapsed
+      pending.finished.set()
+
+  # REST
+
+  def routes(self) -> list[web.RouteDef]:
+    p = API_PREFIX
+    webhook_message = f"{p}/webhooks/{{application_id}}/{{token}}/messages/{{message_id}}"
+    return [
+      web.get(f"{p}/users/@me", self.get_me),
+      web.get(f"{p}/oauth2/applications/@me", self.get_application),
+      web.get(f"{p}/gateway/bot", self.get_gateway_bot),
+      web.get(f"{p}/gateway", self.get_gateway_bot),
+      web.get(f"{p}/applications/{{application_id}}/commands", self.get_commands),
+      web.put(f"{p}/applications/{{application_id}}/commands", self.put_commands),
+      web.get(f"{p}/applications/{{application_id}}/guilds/{{guild_id}}/commands", self.get_commands),
+      web.put(f"{p}/applications/{{application_id}}/guilds/{{guild_id}}/commands", self.put_commands),
+      web.get(f"{p}/channels/{{channel_id}}", self.get_channel),
+      web.get(f"{p}/channels/{{channel_id}}/messages/{{message_id}}", self.get_message),
+      web.post(f"{p}/channels/{{channel_id}}/messages", self.post_message),
+      web.get(
+        f"{p}/channels/{{channel_id}}/messages/{{message_id}}/reactions/{{emoji}}",
+        self.get_reaction_users,
+      ),
+      web.get(f"{p}/guilds/{{guild_id}}/members/{{user_id}}", self.get_member),
+      web.get(f"{p}/guilds/{{guild_id}}/members", self.list_members),
+      web.post(f"{p}/interactions/{{interaction_id}}/{{token}}/callback", self.post_callback),
+      web.post(f"{p}/webhooks/{{application_id}}/{{token}}", self.post_followup),
+      web.get(webhook_message, self.get_webhook_message),
+      web.patch(webhook_message, self.edit_webhook_message),
+      web.delete(webhook_message, self.delete_webhook_message),
+      web.get("/gateway", self.gateway),
+      web.get("/_fake/world", self.get_world),
+      web.get("/_fake/stats", self.get_stats),
+      web.post("/_fake/interactions", self.post_interaction),
+      web.post("/_fake/reactions", self.post_reaction),
+    ]
+
+  @web.middleware
+  async def api_middleware(self, request: web.Request, handler) -> web.StreamResponse:
+    """Latency, rate limits and request counts for the API routes."""
+    route = request.match_info.route.resource
+    if route is None or not request.path.startswith(API_PREFIX):
+      return await handler(request)
+
+    template = route.canonical.removeprefix(API_PREFIX)
+    route_key = f"{request.method} {template}"
+    self.requests[route_key] += 1
+    await self.delay()
+
+    info = request.match_info
+    major = info.get("channel_id") or info.get("guild_id") or info.get("token")
+    bucket_hash = hashlib.blake2b(route_key.encode(), digest_size=8).hexdigest()
+    # Interaction responses don't count towards the global limit
+    global_limited = not template.startswith(("/interactions", "/webhooks"))
+    key = (route_key, major)
+    kind, headers = self.ratelimiter.check(key, bucket_hash, global_limited)
+
+    if kind is not None:
+      self.limited[kind] += 1
+      retry_after = self.ratelimiter.retry_after(kind, key)
+      return json_response(
+        {"message": "You are being rate limited.", "retry_after": retry_after, "global": kind == "global"},
+        status=429,
+        # discord.py treats a 429 without `Via` as a Cloudflare ban
+        headers={**headers, "Retry-After": str(math.ceil(retry_after)), "Via": "1.1 google"},
+      )
+
+    response = await handler(request)
+    response.headers.update(headers)
+    return response
+
+  @staticmethod
+  def not_found(what: str, code: int) -> web.Response:
+    return json_response({"message": f"Unknown {what}", "code": code}, status=404)
+
+  async def get_me(self, request: web.Request) -> web.Response:
+    return json_response(user_payload(BOT_ID, "GvG Bot", bot=True))
+
+  async def get_application(self, request: web.Request) -> web.Response:
+    return json_response(
+      {
+        "id": str(BOT_ID),
+        "name": "GvG Bot",
+        "description": "",
+        "icon": None,
+        "bot_public": False,
+        "bot_require_code_grant": False,
+        "owner": user_payload(BOT_ID + 1, "Owner"),
+        "verify_key": "0" * 64,
+        "flags": 0,
+      }
+    )
+
+  async def get_gateway_bot(self, request: web.Request) -> web.Response:
+    return json_response(
+      {
+        "url": self.gateway_url,
+        "shards": self.shard_count,
+        "session_start_limit": {
+          "total": 1000,
+          "remaining": 1000,
+          "reset_after": 0,
+          "max_concurrency": 16,
+        },
+      }
+    )
+
+  async def get_commands(self, request: web.Request) -> web.Response:
+    return json_response([])
+
+  async def put_commands(self, request: web.Request) -> web.Response:
+    commands = await request.json()
+    for command in commands:
+      command_id = self._commands.setdefault(command["name"], self.new_id())
+      command.update(id=str(command_id), application_id=str(BOT_ID), version="1")
+      # Context menu commands have no description; Discord sends ""
+      command.setdefault("description", "")
+      if "guild_id" in request.match_info:
+        command["guild_id"] = request.match_info["guild_id"]
+    return json_response(commands)
+
+  async def get_channel(self, request: web.Request) -> web.Response:
+    channel_id = int(request.match_info["channel_id"])
+    guild = self.guild_of_channel(channel_id)
+    if guild is None:
+      return self.not_found("Channel", 10003)
+    return json_response(channel_payload(guild, channel_id))
+
+  async def get_message(self, request: web.Request) -> web.Response:
+    channel_id = int(request.match_info["channel_id"])
+    message_id = int(request.match_info["message_id"])
+    guild = self.guild_of_channel(channel_id)
+    if guild is None or (channel_id, message_id) != (guild.signup_channel_id, guild.post_id):
+      return self.not_found("Message", 10008)
+
+    author = user_payload(next(iter(guild.members)), "Officer")
+    content = "React below to sign up for GvG!"
+    return json_response(
+      message_payload(channel_id, message_id, content, author, guild.id, guild.reactions)
+    )
+
+  async def get_reaction_users(self, request: web.Request) -> web.Response:
+    channel_id = int(request.match_info["channel_id"])
+    guild = self.guild_of_channel(channel_id)
+    if guild is None or int(request.match_info["message_id"]) != guild.post_id:
+      return self.not_found("Message", 10008)
+
+    users = guild.reactions.get(parse_emoji(request.match_info["emoji"]))
+    if users is None:
+      return self.not_found("Emoji", 10014)
+
+    limit = min(int(request.query.get("limit", "25")), REACTION_PAGE_LIMIT)
+    start = bisect_right(users, int(request.query.get("after", "0")))
+    page = users[start : start + limit]
+    return json_response([user_payload(u, guild.members[u].name) for u in page])
+
+  async def get_member(self, request: web.Request) -> web.Response:
+    guild = self.guilds.get(int(request.match_info["guild_id"]))
+    if guild is None:
+      return self.not_found("Guild", 10004)
+    member = guild.members.get(int(request.match_info["user_id"]))
+    if member is None:
+      return self.not_found("Member", 10007)
+    return json_response(member_payload(member))
+
+  async def list_members(self, request: web.Request) -> web.Response:
+    guild = self.guilds.get(int(request.match_info["guild_id"]))
+    if guild is None:
+      return self.not_found("Guild", 10004)
+
+    limit = min(int(request.query.get("limit", "1")), MEMBER_CHUNK_SIZE)
+    after = int(request.query.get("after", "0"))
+    ids = sorted(guild.members)
+    start = bisect_right(ids, after)
+    return json_response([member_payload(guild.members[u]) for u in ids[start : start + limit]])
+
+  async def post_message(self, request: web.Request) -> web.Response:
+    channel_id = int(request.match_info["channel_id"])
+    guild = self.guild_of_channel(channel_id)
+    if guild is None:
+      return self.not_found("Channel", 10003)
+
+    payload = await request.json() if request.content_type == "application/json" else {}
+    self.messages_sent += 1
+    author = user_payload(BOT_ID, "GvG Bot", bot=True)
+    return json_response(
+      message_payload(channel_id, self.new_id(), payload.get("content") or "", author, guild.id)
+    )
+
+  async def post_callback(self, request: web.Request) -> web.Response:
+    interaction_id = request.match_info["interaction_id"]
+    token = request.match_info["token"]
+    payload = await request.json() if request.content_type == "application/json" else {}
+    callback_type = payload.get("type", 4)
+    self._interaction_call(token, f"callback {callback_type}", callback_type not in DEFERRED_CALLBACKS)
+
+    data = payload.get("data") or {}
+    flags = data.get("flags", 0)
+    result = {
+      "interaction": {
+        "id": interaction_id,
+        "type": 2,
+        "response_message_loading": callback_type == 5,
+        "response_message_ephemeral": bool(flags & 64),
+      },
+      "resource": {"type": callback_type},
+    }
+    if callback_type in (4, 7):
+      message = self._webhook_message(data.get("content") or "")
+      result["interaction"]["response_message_id"] = message["id"]
+      result["resource"]["message"] = message
+    return json_response(result)
+
+  def _webhook_message(self, content: str) -> dict:
+    author = user_payload(BOT_ID, "GvG Bot", bot=True)
+    return message_payload(0, self.new_id(), content, author)
+
+  async def post_followup(self, request: web.Request) -> web.Response:
+    token = request.match_info["token"]
+    payload = await request.json() if request.content_type == "application/json" else {}
+    self._interaction_call(token, "followup", final=True)
+    return json_response(self._webhook_message(payload.get("content") or ""))
+
+  async def get_webhook_message(self, request: web.Request) -> web.Response:
+    return json_response(self._webhook_message(""))
+
+  async def edit_webhook_message(self, request: web.Request) -> web.Response:
+    token = request.match_info["token"]
+    payload = await request.json() if request.content_type == "application/json" else {}
+    self._interaction_call(token, "edit", final=True)
+    return json_response(self._webhook_message(payload.get("content") or ""))
+
+  async def delete_webhook_message(self, request: web.Request) -> web.Response:
+    self._interaction_call(request.match_info["token"], "delete", final=True)
+    return web.Response(status=204)
+
+  # Control endpoints for manual runs
+
+  async def get_world(self, request: web.Request) -> web.Response:
+    return json_response(self.world())
+
+  async def get_stats(self, request: web.Request) -> web.Response:
+    return json_response(self.stats())
+
+  async def post_interaction(self, request: web.Request) -> web.Response:
+    body = await request.json()
+    if int(body["guild_id"]) not in self.guilds or not self.is_ready():
+      raise web.HTTPBadRequest(text="Unknown guild, or the bot isn't connected.")
+
+    result = await self.interact(
+      int(body["guild_id"]), body["name"], body.get("options"), body.get("timeout", 30.0)
+    )
+    return json_response(
+      {"name": result.name, "ack": result.ack, "done": result.done, "calls": result.calls}
+    )
+
+  async def post_reaction(self, request: web.Request) -> web.Response:
+    body = await request.json()
+    if int(body["guild_id"]) not in self.guilds:
+      raise web.HTTPBadRequest(text="Unknown guild.")
+    return json_response({"user_id": await self.add_reaction(int(body["guild_id"]))})
+
+
+def make_app(fake: FakeDiscord) -> web.Application:
+  app = web.Application(middlewares=[fake.api_middleware], client_max_size=8 * 1024 * 1024)
+  app.add_routes(fake.routes())
+  return app
+
+
+async def start_server(fake: FakeDiscord, host: str, port: int) -> web.AppRunner:
+  """Serve `fake` on `host:port`; clean up with `runner.cleanup()`."""
+  runner = web.AppRunner(make_app(fake), access_log=None)
+  await runner.setup()
+  await web.TCPSite(runner, host, port).start()
+  fake.url = f"http://{host}:{port}"
+  return runner
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+  """The world, limits and latency options, shared with `bench/load.py`."""
+  parser.add_argument("--guilds", type=int, default=1)
+  parser.add_argument("--members", type=int, default=10_000, help="per guild")
+  parser.add_argument("--reactors", type=int, default=3_000, help="per guild")
+  parser.add_argument("--reacts", type=int, default=6)
+  parser.add_argument("--shards", type=int, default=1)
+  parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every response")
+  parser.add_argument("--jitter-ms", type=float, default=0.0, help="random extra latency, up to")
+  parser.add_argument("--bucket-limit", type=int, default=5, help="requests per route bucket window")
+  parser.add_argument("--bucket-window", type=float, default=1.0, help="seconds")
+  parser.add_argument("--global-limit", type=int, default=50, help="requests per second")
+  parser.add_argument("--random-429", type=float, default=0.0, help="fraction refused anyway")
+
+
+def from_arguments(args: argparse.Namespace) -> FakeDiscord:
+  guilds = make_world(args.guilds, args.members, args.reactors, args.reacts)
+  limits = RateLimits(args.bucket_limit, args.bucket_window, args.global_limit, args.random_429)
+  return FakeDiscord(
+    guilds, limits, args.latency_ms / 1e3, args.jitter_ms / 1e3, shard_count=args.shards
+  )
+
+
+async def serve(fake: FakeDiscord, host: str, port: int) -> None:
+  runner = await start_server(fake, host, port)
+  print(f"Fake Discord on {fake.url} (set DISCORD_API_URL={fake.url})")
+  for guild in fake.world():
+    print(json.dumps(guild, ensure_ascii=False))
+  try:
+    await asyncio.Event().wait()
+  finally:
+    await runner.cleanup()
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8900)
+  add_arguments(parser)
+  args = parser.parse_args()
+  try:
+    asyncio.run(serve(from_arguments(args), args.host, args.port))
+  except KeyboardInterrupt:
+    pass
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,143 @@
+"""Synthetic guild objects standing in for discord.py models in benchmarks."""
+
+import bisect
+import random
+import string
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+
+from services.reaction_index import ReactSnapshot
+
+
+@dataclass(eq=False)
+class FakeRole:
+  id: int
+  name: str
+  color: str = "#99aab5"
+
+  @property
+  def mention(self) -> str:
+    return f"<@&{self.id}>"
+
+  def is_default(self) -> bool:
+    return False
+
+
+@dataclass(eq=False)
+class FakeAsset:
+  url: str
+
+
+@dataclass(eq=False)
+class FakeMember:
+  id: int
+  display_name: str
+  roles: list[FakeRole]
+  display_avatar: FakeAsset
+  bot: bool = False
+  guild: "FakeGuild | None" = field(default=None, repr=False)
+
+  @property
+  def mention(self) -> str:
+    return f"<@{self.id}>"
+
+
+@dataclass
+class FakeGuild:
+  id: int
+  name: str
+  roles: list[FakeRole]
+  gvg_roles: list[FakeRole]
+  reacts: list[str]
+  members: list[FakeMember]
+  react_data: dict[str, set[FakeMember]] = field(default_factory=dict)
+
+  _members_by_id: dict[int, FakeMember] = field(default_factory=dict, repr=False)
+
+  def get_role(self, role_id: int) -> FakeRole | None:
+    return next((r for r in self.roles if r.id == role_id), None)
+
+  def get_member(self, user_id: int) -> FakeMember | None:
+    if not self._members_by_id:
+      self._members_by_id.update((m.id, m) for m in self.members)
+    return self._members_by_id.get(user_id)
+
+  def snapshot(self, version: int = 1) -> ReactSnapshot:
+    return ReactSnapshot(self.id, 1, version, self.react_data)  # type: ignore[arg-type]
+
+
+class FakeReaction:
+  """
+  A reaction whose `users()` pages by id like the REST endpoint, each page
+  yielded in reverse like discord.py does.
+  """
+
+  def __init__(self, emoji: str, users: list[FakeMember]) -> None:
+    self.emoji = emoji
+    self._users = sorted(users, key=lambda u: u.id)
+    self._ids = [u.id for u in self._users]
+    self.count = len(users)
+
+  async def users(
+    self, limit: int = 100, after: FakeMember | None = None
+  ) -> AsyncIterator[FakeMember]:
+    start = bisect.bisect_right(self._ids, after.id) if after is not None else 0
+    for user in reversed(self._users[start : start + limit]):
+      yield user
+
+
+@dataclass(eq=False)
+class FakeMessage:
+  id: int
+  guild: FakeGuild
+  reactions: list[FakeReaction]
+
+  async def fetch(self) -> "FakeMessage":
+    return self
+
+
+def make_message(guild: FakeGuild) -> FakeMessage:
+  """The signup post `guild.react_data` describes."""
+  reactions = [FakeReaction(e, list(members)) for e, members in guild.react_data.items()]
+  return FakeMessage(1, guild, reactions)
+
+
+def random_name(rng: random.Random) -> str:
+  # Mix of ASCII, CJK and emoji to exercise wide-character handling
+  pools = [string.ascii_letters, "龍虎鳳凰雲風花月", "⚔️🛡️🏹"]
+  pool = rng.choice(pools)
+  return "".join(rng.choices(pool, k=rng.randint(3, 16)))
+
+
+def make_guild(
+  n_members: int,
+  n_roles: int = 40,
+  n_gvg_roles: int = 8,
+  n_reacts: int = 4,
+  roles_per_member: int = 6,
+  seed: int = 0,
+) -> FakeGuild:
+  """A guild where every member reacted to the signup post at least once."""
+  rng = random.Random(seed)
+
+  roles = [FakeRole(10_000 + i, f"role-{i}") for i in range(n_roles)]
+  gvg_roles = roles[:n_gvg_roles]
+  reacts = [f"<:react{i}:{20_000 + i}>" for i in range(n_reacts)]
+
+  members = []
+  react_data: dict[str, set[FakeMember]] = {r: set() for r in reacts}
+  for i in range(n_members):
+    m = FakeMember(
+      id=100_000 + i,
+      display_name=random_name(rng),
+      roles=rng.sample(roles, k=min(roles_per_member, n_roles)),
+      display_avatar=FakeAsset(f"https://cdn.example/avatars/{i}.png"),
+    )
+    members.append(m)
+    for r in rng.sample(reacts, k=rng.randint(1, n_reacts)):
+      react_data[r].add(m)
+
+  guild = FakeGuild(1, "Synthetic Guild", roles, gvg_roles, reacts, members, react_data)
+  for m in members:
+    m.guild = guild
+  return guild
@@ -0,0 +1,254 @@
+"""
+End-to-end load test against the fake Discord in `bench/fake_discord.py`:
+starts it, seeds a throwaway DB with a signup config per fake guild, runs
+`main.py` pointed at both, then fires slash commands and /roster loads at
+the given concurrency, with signups trickling in meanwhile.
+
+  python -m bench.load [--guilds 1] [--members 10000] [--commands 200]
+      [--roster 500] [--concurrency 50] [--churn 5] [--latency-ms 50]
+
+Takes the fake server's options too (rate limits, latency; see
+`python -m bench.fake_discord --help`). Bot settings such as
+`LEAN_MEMBER_CACHE` or `REACTION_SCAN_CONCURRENCY` are passed through from
+the environment. Reports latency percentiles per flow and what the bot
+asked of "Discord": requests per route, 429s and member chunk requests.
+
+Run from the repo root.
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+from sqlmodel import Session, SQLModel, create_engine
+
+from bench.fake_discord import FakeDiscord, add_arguments, from_arguments, start_server
+from core.models import ChannelConfig, MessageConfig, SignupConfig
+
+HOST = "127.0.0.1"
+READY_TIMEOUT = 60.0
+
+
+def seed_db(url: str, fake: FakeDiscord) -> None:
+  """A signup config per fake guild, as if set up with the config commands."""
+  engine = create_engine(url)
+  SQLModel.metadata.create_all(engine)
+  with Session(engine) as session:
+    for guild in fake.guilds.values():
+      post_channel = ChannelConfig(channel_id=guild.signup_channel_id, guild_id=guild.id)
+      session.add(
+        SignupConfig(
+          guild_id=guild.id,
+          management_channel=ChannelConfig(channel_id=guild.management_channel_id, guild_id=guild.id),
+          selected_post=MessageConfig(message_id=guild.post_id, channel_config=post_channel, content=""),
+          gvg_roles=guild.gvg_role_ids,
+          gvg_reacts=list(guild.reactions),
+        )
+      )
+    session.commit()
+  engine.dispose()
+
+
+def start_bot(api_url: str, db_url: str, web_port: int, log_path: str) -> subprocess.Popen:
+  env = {
+    **os.environ,
+    "DISCORD_API_URL": api_url,
+    "DISCORD_TOKEN": os.getenv("DISCORD_TOKEN", "fake-token"),
+    "DATABASE_URL": db_url,
+    "WEB_PORT": str(web_port),
+    "PYTHONUNBUFFERED": "1",
+  }
+  with open(log_path, "w") as log:
+    return subprocess.Popen(
+      [sys.executable, "main.py"], env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+def stop_bot(bot: subprocess.Popen) -> None:
+  # SIGINT, so it shuts down the way it would from a terminal
+  bot.send_signal(signal.SIGINT)
+  try:
+    bot.wait(timeout=10)
+  except subprocess.TimeoutExpired:
+    bot.kill()
+    bot.wait()
+
+
+async def wait_ready(fake: FakeDiscord, bot: subprocess.Popen, web_url: str) -> None:
+  """Until every shard is connected and the web app answers."""
+  deadline = time.monotonic() + READY_TIMEOUT
+  async with aiohttp.ClientSession() as http:
+    while time.monotonic() < deadline:
+      if bot.poll() is not None:
+        raise RuntimeError(f"The bot exited with status {bot.returncode}.")
+      if fake.is_ready():
+        try:
+          async with http.get(web_url) as response:
+            if response.status < 500:
+              return
+        except aiohttp.ClientError:
+          pass
+      await asyncio.sleep(0.2)
+  raise RuntimeError(f"The bot wasn't ready within {READY_TIMEOUT:.0f}s.")
+
+
+def percentiles(samples: list[float]) -> str:
+  if not samples:
+    return "no samples"
+  samples = sorted(samples)
+
+  def at(q: float) -> float:
+    return samples[round(q * (len(samples) - 1))] * 1e3
+
+  return f"p50 {at(0.5):7.1f}  p95 {at(0.95):7.1f}  p99 {at(0.99):7.1f}  max {at(1):7.1f} ms"
+
+
+async def run_concurrently(total: int, concurrency: int, task) -> float:
+  """Run `task(i)` for i < `total`, `concurrency` at a time; returns wall time."""
+  counter = itertools.count()
+  start = time.perf_counter()
+
+  async def worker() -> None:
+    while (i := next(counter)) < total:
+      await task(i)
+
+  await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+  return time.perf_counter() - start
+
+
+async def load_commands(fake: FakeDiscord, total: int, concurrency: int) -> None:
+  guilds = list(fake.guilds.values())
+  commands = [
+    ("signup_summary", lambda g: {}),
+    ("signup_by_roles", lambda g: {"target_role": g.gvg_role_ids[0]}),
+    ("team_balance", lambda g: {}),
+  ]
+  acks: dict[str, list[float]] = {name: [] for name, _ in commands}
+  done: dict[str, list[float]] = {name: [] for name, _ in commands}
+  unfinished = 0
+
+  async def one(i: int) -> None:
+    nonlocal unfinished
+    guild = guilds[i % len(guilds)]
+    name, options = commands[i % len(commands)]
+    result = await fake.interact(guild.id, name, options(guild))
+    if result.ack is not None:
+      acks[name].append(result.ack)
+    if result.done is None:
+      unfinished += 1
+    else:
+      done[name].append(result.done)
+
+  elapsed = await run_concurrently(total, concurrency, one)
+  print(f"\n{total} commands, {concurrency} at a time, in {elapsed:.1f}s ({total / elapsed:.1f}/s)")
+  for name, _ in commands:
+    print(f"  {name:<16} ack     {percentiles(acks[name])}")
+    print(f"  {'':<16} result  {percentiles(done[name])}")
+  if unfinished:
+    print(f"  {unfinished} got no result in time")
+
+
+async def load_roster(fake: FakeDiscord, web_url: str, total: int, concurrency: int) -> None:
+  guild_ids = list(fake.guilds)
+  times: list[float] = []
+  statuses: dict[int, int] = {}
+
+  async with aiohttp.ClientSession() as http:
+
+    async def one(i: int) -> None:
+      start = time.perf_counter()
+      async with http.get(f"{web_url}/roster", params={"guild_id": guild_ids[i % len(guild_ids)]}) as r:
+        await r.read()
+      times.append(time.perf_counter() - start)
+      statuses[r.status] = statuses.get(r.status, 0) + 1
+
+    elapsed = await run_concurrently(total, concurrency, one)
+
+  print(f"\n{total} /roster loads, {concurrency} at a time, in {elapsed:.1f}s ({total / elapsed:.1f}/s)")
+  print(f"  {'/roster':<16} {percentiles(times)}")
+  print(f"  statuses {statuses}")
+
+
+async def churn(fake: FakeDiscord, per_second: float) -> None:
+  """New signups at `per_second`, spread over the guilds, until cancelled."""
+  for guild_id in itertools.cycle(fake.guilds):
+    await fake.add_reaction(guild_id)
+    await asyncio.sleep(1 / per_second)
+
+
+def print_stats(fake: FakeDiscord) -> None:
+  stats = fake.stats()
+  print(
+    f"\nFake Discord: {stats['total_requests']} REST requests, 429s {stats['rate_limited'] or 'none'}, "
+    f"{stats['chunk_requests']} member chunk requests ({stats['members_chunked']} members), "
+    f"{stats['messages_sent']} messages sent, {stats['identified']} identifies"
+  )
+  for route, count in stats["requests"].items():
+    print(f"  {count:>7}  {route}")
+
+
+async def run(args: argparse.Namespace, workdir: str) -> None:
+  fake = from_arguments(args)
+  runner = await start_server(fake, HOST, args.port)
+  db_url = f"sqlite:///{workdir}/load.db"
+  seed_db(db_url, fake)
+
+  log_path = f"{workdir}/bot.log"
+  web_url = f"http://{HOST}:{args.web_port}"
+  print(f"Fake Discord on {fake.url}, bot log in {log_path}")
+  for guild in fake.world():
+    print(
+      f"  guild {guild['guild_id']}: {guild['members']} members, "
+      f"{guild['reactors']} reactors on {len(guild['reacts'])} reacts"
+    )
+
+  bot = start_bot(fake.url, db_url, args.web_port, log_path)
+  churning = None
+  try:
+    start = time.perf_counter()
+    await wait_ready(fake, bot, web_url)
+    print(f"Bot ready in {time.perf_counter() - start:.1f}s")
+
+    if args.churn:
+      churning = asyncio.create_task(churn(fake, args.churn))
+    if args.commands:
+      await load_commands(fake, args.commands, args.concurrency)
+    if args.roster:
+      await load_roster(fake, web_url, args.roster, args.concurrency)
+  except RuntimeError as e:
+    print(e)
+    with open(log_path) as f:
+      print("".join(f.readlines()[-30:]))
+    raise SystemExit(1)
+  finally:
+    if churning is not None:
+      churning.cancel()
+    stop_bot(bot)
+    print_stats(fake)
+    await runner.cleanup()
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+  parser.add_argument("--port", type=int, default=8900, help="for the fake Discord")
+  parser.add_argument("--web-port", type=int, default=8901, help="for the bot's web app")
+  parser.add_argument("--commands", type=int, default=200, help="slash commands to run")
+  parser.add_argument("--roster", type=int, default=500, help="/roster loads")
+  parser.add_argument("--concurrency", type=int, default=50)
+  parser.add_argument("--churn", type=float, default=5.0, help="new signups per second")
+  add_arguments(parser)
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory(prefix="gvg-load-") as workdir:
+    asyncio.run(run(args, workdir))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,226 @@
+"""
+Resident memory and time to ready for a large guild: discord.py's default
+member caching with startup chunking vs the lean mode (no startup
+chunking, reactors chunked on demand by id).
+
+A fake gateway feeds discord.py's connection state the READY, GUILD_CREATE
+and GUILD_MEMBERS_CHUNK payloads Discord would send, so the parsing and
+caching work is real; network time is only the optional per-chunk delay.
+
+  python -m bench.member_cache [num_members] [num_reactors] [chunk_delay_ms]
+
+Each mode runs in a fresh interpreter so their memory doesn't mix.
+"""
+
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+import discord
+from discord.state import AutoShardedConnectionState
+
+from bot.client import member_cache_options
+from services.member_cache import MemberCache
+
+GUILD_ID = 1
+BOT_ID = 2
+N_ROLES = 40
+
+# Discord sends startup chunks of up to 1000 members
+FULL_CHUNK_SIZE = 1000
+
+
+def rss_kib() -> int:
+  """Current resident set size."""
+  with open("/proc/self/status") as f:
+    for line in f:
+      if line.startswith("VmRSS:"):
+        return int(line.split()[1])
+  return 0
+
+
+def member_payload(user_id: int, rng: random.Random) -> dict:
+  roles = rng.sample(range(10_000, 10_000 + N_ROLES), k=6)
+  return {
+    "user": {
+      "id": str(user_id),
+      "username": f"user{user_id}",
+      "global_name": f"Member {user_id}",
+      "discriminator": "0",
+      "avatar": None,
+      "bot": user_id == BOT_ID,
+    },
+    "nick": None,
+    "roles": [str(r) for r in roles],
+    "joined_at": "2024-01-01T00:00:00+00:00",
+    "deaf": False,
+    "mute": False,
+    "flags": 0,
+  }
+
+
+def guild_payload(n_members: int) -> dict:
+  roles = [
+    {
+      "id": str(role_id),
+      "name": f"role-{role_id}",
+      "color": 0,
+      "hoist": False,
+      "position": i,
+      "permissions": "0",
+      "managed": False,
+      "mentionable": False,
+      "flags": 0,
+    }
+    for i, role_id in enumerate([GUILD_ID] + list(range(10_000, 10_000 + N_ROLES)))
+  ]
+  return {
+    "id": str(GUILD_ID),
+    "name": "Synthetic Guild",
+    "owner_id": "3",
+    "roles": roles,
+    "emojis": [],
+    "stickers": [],
+    "features": [],
+    "channels": [],
+    "threads": [],
+    "member_count": n_members,
+    "large": True,
+    # Large guilds only send the bot's own member up front
+    "members": [member_payload(BOT_ID, random.Random(0))],
+    "unavailable": False,
+  }
+
+
+class FakeGateway:
+  """Answers member chunk requests the way Discord does, from a fixed member list."""
+
+  def __init__(self, state, user_ids: list[int], chunk_delay: float) -> None:
+    self.state = state
+    self.user_ids = user_ids
+    self.chunk_delay = chunk_delay
+    self.chunks_sent = 0
+    self.members_sent = 0
+
+  async def request_chunks(self, guild_id, query=None, *, limit, user_ids=None, presences=False, nonce=None):
+    asyncio.get_running_loop().create_task(self._send(guild_id, user_ids, nonce))
+
+  async def _send(self, guild_id: int, user_ids, nonce) -> None:
+    ids = user_ids if user_ids is not None else self.user_ids
+    chunks = [ids[i : i + FULL_CHUNK_SIZE] for i in range(0, len(ids), FULL_CHUNK_SIZE)] or [[]]
+    for index, chunk in enumerate(chunks):
+      await asyncio.sleep(self.chunk_delay)
+      rng = random.Random(index)
+      self.chunks_sent += 1
+      self.members_sent += len(chunk)
+      self.state.parse_guild_members_chunk(
+        {
+          "guild_id": str(guild_id),
+          "members": [member_payload(u, rng) for u in chunk],
+          "chunk_index": index,
+          "chunk_count": len(chunks),
+          "nonce": nonce,
+        }
+      )
+
+
+async def run(mode: str, n_members: int, n_reactors: int, chunk_delay: float) -> dict:
+  intents = discord.Intents.default()
+  intents.members = True
+  ready = asyncio.Event()
+
+  def dispatch(event: str, *args) -> None:
+    if event == "ready":
+      ready.set()
+
+  options = member_cache_options(lean=mode == "lean")
+  state = AutoShardedConnectionState(
+    dispatch=dispatch,
+    handlers={},
+    hooks={},
+    http=None,  # type: ignore[arg-type]
+    intents=intents,
+    # Only one GUILD_CREATE is coming, don't wait for more
+    guild_ready_timeout=0.01,
+    **options,
+  )
+  state.loop = asyncio.get_running_loop()
+  user_ids = list(range(100_000, 100_000 + n_members))
+  gateway = FakeGateway(state, user_ids, chunk_delay)
+  state._get_websocket = lambda *_, **__: gateway  # type: ignore[method-assign]
+  state.shard_count = 1
+  state.shard_ids = [0]
+
+  baseline = rss_kib()
+  start = time.perf_counter()
+  state.parse_ready(
+    {
+      "v": 10,
+      "user": {"id": str(BOT_ID), "username": "bot", "discriminator": "0", "avatar": None, "bot": True},
+      "guilds": [{"id": str(GUILD_ID), "unavailable": True}],
+      "session_id": "x",
+      "shard": [0, 1],
+      "application": {"id": str(BOT_ID), "flags": 0},
+    }  # type: ignore[arg-type]
+  )
+  state.parse_guild_create(guild_payload(n_members))  # type: ignore[arg-type]
+  await ready.wait()
+  time_to_ready = time.perf_counter() - start
+
+  # Then the first roster: resolve everyone who reacted
+  guild = state._get_guild(GUILD_ID)
+  assert guild is not None
+  reactors = random.Random(1).sample(user_ids, k=n_reactors)
+  member_cache = MemberCache(guild_cache=mode != "lean")
+  resolved = await member_cache.resolve(guild, reactors)
+  time_to_roster = time.perf_counter() - start
+
+  return {
+    "mode": mode,
+    "ready_s": time_to_ready,
+    "roster_s": time_to_roster,
+    "rss_mib": (rss_kib() - baseline) / 1024,
+    # Held by discord.py, or in lean mode by the MemberCache alone
+    "cached_members": len(guild._members) + (0 if member_cache.guild_cache else len(member_cache)),
+    "resolved": len(resolved),
+    "chunks": gateway.chunks_sent,
+    "members_sent": gateway.members_sent,
+  }
+
+
+def main() -> None:
+  if len(sys.argv) > 1 and sys.argv[1] == "--mode":
+    _, _, mode, n_members, n_reactors, delay = sys.argv
+    result = asyncio.run(run(mode, int(n_members), int(n_reactors), float(delay)))
+    print(json.dumps(result))
+    return
+
+  n_members = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+  n_reactors = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+  chunk_delay = float(sys.argv[3]) / 1e3 if len(sys.argv) > 3 else 0.0
+
+  print(f"members: {n_members}, reactors: {n_reactors}, delay per chunk: {chunk_delay * 1e3:.0f} ms")
+  print(
+    f"{'mode':<8} {'ready s':>8} {'+roster s':>10} {'RSS MiB':>8}"
+    f" {'cached':>8} {'chunks':>7} {'sent':>8}"
+  )
+  for mode in ["default", "lean"]:
+    out = subprocess.run(
+      [sys.executable, "-m", "bench.member_cache", "--mode", mode]
+      + [str(n_members), str(n_reactors), str(chunk_delay)],
+      capture_output=True,
+      text=True,
+      check=True,
+    )
+    r = json.loads(out.stdout.strip().splitlines()[-1])
+    print(
+      f"{r['mode']:<8} {r['ready_s']:8.2f} {r['roster_s']:10.2f} {r['rss_mib']:8.1f}"
+      f" {r['cached_members']:>8} {r['chunks']:>7} {r['members_sent']:>8}"
+    )
+
+
+if __name__ == "__main__":
+  main()
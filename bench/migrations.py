@@ -0,0 +1,78 @@
+"""
+Migration check: upgrades throwaway SQLite DBs holding the old singleton
+signup config and fails (exit status 1) if a config is lost or stranded.
+
+  python -m bench.migrations
+
+Covers a guild inferred from the config's channels, and a guild that is
+unknown until `LEGACY_GUILD_ID` is set on a later start.
+"""
+
+import json
+import sys
+
+from sqlalchemy import Connection, create_engine
+
+from core import models  # noqa: F401  (registers the tables)
+from core.migrations import SINGLETON_TABLE, migrate_singleton_signup_config
+
+GUILD_ID = 123
+
+
+def old_db(management_guild_id: int | None) -> Connection:
+  """An in-memory DB with the pre-guild `signupconfig` table and its row."""
+  connection = create_engine("sqlite://").connect()
+  connection.exec_driver_sql(
+    "CREATE TABLE signupconfig (id INTEGER PRIMARY KEY, management_channel JSON,"
+    " selected_post JSON, gvg_roles JSON NOT NULL, gvg_reacts JSON NOT NULL)"
+  )
+  channel = {"channel_id": 1, "guild_id": management_guild_id}
+  connection.exec_driver_sql(
+    "INSERT INTO signupconfig VALUES (1, ?, NULL, ?, ?)",
+    (json.dumps(channel), json.dumps([5, 6]), json.dumps(["👍"])),
+  )
+  return connection
+
+
+def configs(connection: Connection) -> list[tuple]:
+  return list(connection.exec_driver_sql("SELECT guild_id, gvg_roles FROM signupconfig"))
+
+
+def has_singleton(connection: Connection) -> bool:
+  return connection.exec_driver_sql(
+    "SELECT 1 FROM sqlite_master WHERE name = ?", (SINGLETON_TABLE,)
+  ).first() is not None
+
+
+def main() -> None:
+  failures = []
+
+  # The management channel says which guild it was
+  connection = old_db(GUILD_ID)
+  migrate_singleton_signup_config(connection, legacy_guild_id=None)
+  if configs(connection) != [(GUILD_ID, "[5, 6]")] or has_singleton(connection):
+    failures.append(f"inferred guild: got {configs(connection)}")
+
+  # Unknown guild: kept aside, then migrated once LEGACY_GUILD_ID is set
+  connection = old_db(None)
+  migrate_singleton_signup_config(connection, legacy_guild_id=None)
+  if configs(connection) or not has_singleton(connection):
+    failures.append("unknown guild: the old config wasn't kept aside")
+  migrate_singleton_signup_config(connection, legacy_guild_id=str(GUILD_ID))
+  if configs(connection) != [(GUILD_ID, "[5, 6]")] or has_singleton(connection):
+    failures.append(f"LEGACY_GUILD_ID on restart: got {configs(connection)}")
+
+  # Every later start is a no-op
+  migrate_singleton_signup_config(connection, legacy_guild_id=None)
+  if configs(connection) != [(GUILD_ID, "[5, 6]")]:
+    failures.append(f"rerun: got {configs(connection)}")
+
+  for failure in failures:
+    print(f"FAIL: {failure}")
+  if failures:
+    sys.exit(1)
+  print("OK")
+
+
+if __name__ == "__main__":
+  main()
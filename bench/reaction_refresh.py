@@ -0,0 +1,102 @@
+"""
+Failed rescan check: a pre-warm rescan that errors or is cancelled midway
+must keep the reaction events seen meanwhile and leave the post stale, so
+the next tick rescans it. Fails (exit status 1) otherwise.
+
+  python -m bench.reaction_refresh
+"""
+
+import asyncio
+import sys
+from types import SimpleNamespace
+
+from bench.fixtures import FakeAsset, FakeMember, FakeReaction, make_guild, make_message
+from services.member_cache import MemberCache
+from services.reaction_index import ReactionIndex
+
+NEW_USER_ID = 1
+
+
+class StalledFetch:
+  """Holds `message.fetch()` until released, then fails or carries on."""
+
+  def __init__(self, message) -> None:
+    self.message = message
+    self.started = asyncio.Event()
+    self.release = asyncio.Event()
+    self.fail = True
+
+  async def __call__(self):
+    self.started.set()
+    await self.release.wait()
+    if self.fail:
+      raise RuntimeError("REST error")
+    return self.message
+
+
+def payload(message_id: int, emoji: str, user_id: int) -> SimpleNamespace:
+  return SimpleNamespace(message_id=message_id, emoji=emoji, user_id=user_id, member=None)
+
+
+async def check(cancel: bool) -> list[str]:
+  guild = make_guild(300)
+  message = make_message(guild)
+  # Rescan on every refresh
+  index = ReactionIndex(MemberCache(), refresh_interval=0)
+  await index.refresh(guild, message, guild.reacts)  # type: ignore[arg-type]
+
+  emoji = guild.reacts[0]
+  removed = next(iter(guild.react_data[emoji]))
+  fetch = message.fetch = StalledFetch(message)  # type: ignore[method-assign]
+  refresh = asyncio.create_task(index.refresh(guild, message, guild.reacts))  # type: ignore[arg-type]
+  await fetch.started.wait()
+
+  # Signups changing while the scan is in flight
+  index.on_add(payload(message.id, emoji, NEW_USER_ID))  # type: ignore[arg-type]
+  index.on_remove(payload(message.id, emoji, removed.id))  # type: ignore[arg-type]
+  if cancel:
+    refresh.cancel()
+  else:
+    fetch.release.set()
+  try:
+    await refresh
+  except (RuntimeError, asyncio.CancelledError):
+    pass
+
+  what = "cancelled scan" if cancel else "failed scan"
+  failures = []
+  post = index.posts[0]
+  reactors = post.reactor_ids()[emoji]
+  if NEW_USER_ID not in reactors or removed.id in reactors:
+    failures.append(f"{what}: events seen during the scan were lost")
+  if not post.is_stale(index.refresh_interval) or post.live:
+    failures.append(f"{what}: the post still looks freshly scanned")
+
+  # Discord has the changes too; the next tick's rescan must land
+  new_member = FakeMember(NEW_USER_ID, "new", [], FakeAsset("https://cdn.example/avatars/new.png"))
+  guild.react_data[emoji] = (guild.react_data[emoji] - {removed}) | {new_member}
+  message.reactions = [FakeReaction(e, list(m)) for e, m in guild.react_data.items()]
+  fetch.fail = False
+  fetch.release.set()
+  await index.refresh(guild, message, guild.reacts)  # type: ignore[arg-type]
+  if not post.live or post.reactor_ids()[emoji] != {m.id for m in guild.react_data[emoji]}:
+    failures.append(f"{what}: the next refresh didn't rescan")
+
+  return failures
+
+
+async def run() -> list[str]:
+  return await check(cancel=False) + await check(cancel=True)
+
+
+def main() -> None:
+  failures = asyncio.run(run())
+  for failure in failures:
+    print(f"FAIL: {failure}")
+  if failures:
+    sys.exit(1)
+  print("OK")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,152 @@
+"""
+Bytes and time per /roster load: first load, compressed, and conditional
+repeat loads answered with 304. Then the same for /api/roster, including
+a delta after one member changed.
+
+  python -m bench.roster_http [num_members]
+
+Run from the repo root (templates are loaded relative to it).
+"""
+
+import asyncio
+import dataclasses
+import sys
+import time
+
+from bench.fixtures import make_guild
+from services.roster_matrix import RosterMatrix
+from services import roster_payload
+from services.roster_store import RosterView
+from web import caching
+from web.app import app, roster_payloads
+
+
+class FixedRosterSource:
+  def __init__(self, view: RosterView) -> None:
+    self.view = view
+
+  async def get(self, guild_id: int) -> RosterView | None:
+    return self.view if guild_id == self.view.guild_id else None
+
+
+class NoAssignments:
+  async def flush(self, guild_id: int, session_id: str) -> None:
+    pass
+
+  async def get(self, guild_id: int) -> tuple[int, dict]:
+    return 0, {}
+
+
+class FakePost:
+  id = 1
+
+
+class FakeSignup:
+  def __init__(self, guild) -> None:
+    self.guild = guild
+    self.post = FakePost()
+
+
+async def get(path: str, headers: dict[str, str]) -> tuple[int, dict[str, str], bytes]:
+  """Drive the ASGI app directly, no HTTP server or client library needed."""
+  raw_path, _, query = path.partition("?")
+  scope = {
+    "type": "http",
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": raw_path,
+    "raw_path": raw_path.encode(),
+    "query_string": query.encode(),
+    "root_path": "",
+    "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    "client": ("127.0.0.1", 1234),
+    "server": ("127.0.0.1", 8000),
+  }
+  status = 0
+  response_headers: dict[str, str] = {}
+  body = bytearray()
+
+  async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+  async def send(message):
+    nonlocal status
+    if message["type"] == "http.response.start":
+      status = message["status"]
+      response_headers.update((k.decode(), v.decode()) for k, v in message["headers"])
+    elif message["type"] == "http.response.body":
+      body.extend(message.get("body", b""))
+
+  await app(scope, receive, send)
+  return status, response_headers, bytes(body)
+
+
+async def timed(path: str, headers: dict[str, str], repeat: int = 20):
+  best = float("inf")
+  for _ in range(repeat):
+    start = time.perf_counter()
+    status, response_headers, body = await get(path, headers)
+    best = min(best, time.perf_counter() - start)
+  return status, response_headers, len(body), best
+
+
+async def run(n: int) -> None:
+  guild = make_guild(n)
+  matrix = RosterMatrix(guild.snapshot(), guild.gvg_roles, guild.reacts)  # type: ignore[arg-type]
+  view = RosterView.from_matrix(FakeSignup(guild), matrix)  # type: ignore[arg-type]
+  app.state.rosters = FixedRosterSource(view)
+  app.state.assignments = NoAssignments()
+
+  path = f"/roster?guild_id={guild.id}"
+  encodings = ["identity", "gzip"] + (["br"] if caching.brotli is not None else [])
+
+  print(f"members: {n}, page: /roster (header + first page of rows)")
+  print(f"{'request':<22} {'status':>6} {'bytes':>9} {'ms':>8}")
+  for encoding in encodings:
+    status, headers, size, best = await timed(path, {"accept-encoding": encoding})
+    print(f"{'full, ' + encoding:<22} {status:>6} {size:>9} {best * 1e3:8.2f}")
+
+    etag = headers["etag"]
+    status, _, size, best = await timed(
+      path, {"accept-encoding": encoding, "if-none-match": etag}
+    )
+    print(f"{'repeat, ' + encoding:<22} {status:>6} {size:>9} {best * 1e3:8.2f}")
+
+  if caching.brotli is None:
+    print("(brotli not installed; br not offered)")
+
+  api = f"/api/roster?guild_id={guild.id}"
+  start = time.perf_counter()
+  _, headers, body = await get(api, {})
+  encode = time.perf_counter() - start
+
+  print(f"\n/api/roster ({'orjson' if roster_payload.orjson else 'json'})")
+  print(f"{'request':<22} {'status':>6} {'bytes':>9} {'ms':>8}")
+  print(f"{'first (encodes)':<22} {200:>6} {len(body):>9} {encode * 1e3:8.2f}")
+  for name, path, request_headers in [
+    ("full, cached bytes", api, {}),
+    ("full, gzip", api, {"accept-encoding": "gzip"}),
+    ("repeat (304)", api, {"if-none-match": headers["etag"]}),
+  ]:
+    status, _, size, best = await timed(path, request_headers)
+    print(f"{name:<22} {status:>6} {size:>9} {best * 1e3:8.2f}")
+
+  # One member un-reacts
+  members = list(view.members)
+  members[0] = dataclasses.replace(members[0], react_mask=members[0].react_mask ^ 1)
+  app.state.rosters = FixedRosterSource(
+    dataclasses.replace(view, members=tuple(members), published_at=view.published_at + 1)
+  )
+  status, _, size, best = await timed(f"{api}&since={view.version}", {})
+  print(f"{'delta, 1 changed':<22} {status:>6} {size:>9} {best * 1e3:8.2f}")
+  print(f"payload cache: {roster_payloads.summary()}")
+
+
+def main() -> None:
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+  asyncio.run(run(n))
+
+
+if __name__ == "__main__":
+  main()
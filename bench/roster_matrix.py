@@ -0,0 +1,167 @@
+"""
+Roster table rendering: bitset RosterMatrix vs the pre-matrix functions.
+
+  python -m bench.roster_matrix [num_members]
+"""
+
+import asyncio
+import sys
+import time
+import tracemalloc
+
+from tabulate import tabulate
+
+from bench.fixtures import make_guild
+from bot.cogs.signup import (
+  MAX_DISPLAY_NAME_LEN,
+  ROLE_NAME_STR_SIZE,
+  get_overview_table_str,
+  get_role_list_str,
+  get_summary_table_str,
+  render_key,
+)
+from services.name_width import format_name_for_table
+from services.render_cache import render_cache
+from services.roster_matrix import RosterMatrix
+
+
+# The implementations the matrix replaced, scanning `member.roles` lists
+
+
+async def legacy_overview(members, gvg_roles) -> str:
+  headers = ["User"] + [r.name[:ROLE_NAME_STR_SIZE].upper() for r in gvg_roles]
+
+  def role_weights(member):
+    return tuple(role not in member.roles for role in gvg_roles)
+
+  table_data = []
+  for member in sorted(members, key=lambda m: (role_weights(m), m.display_name.lower())):
+    row = [format_name_for_table(member.display_name, MAX_DISPLAY_NAME_LEN)]
+    for role in gvg_roles:
+      row.append("✅" if role in member.roles else " ")
+    table_data.append(row)
+
+  table_str = tabulate(table_data, headers=headers, tablefmt="simple")
+  role_mentions = " ".join([r.mention for r in gvg_roles])
+  return f"### GvG Roster Overview\n```\n{table_str}\n```\n**Roles:** {role_mentions}"
+
+
+async def legacy_summary(guild, members, gvg_role_ids) -> str:
+  role_names = []
+  for r_id in gvg_role_ids:
+    r = guild.get_role(r_id)
+    role_names.append(r.name[:ROLE_NAME_STR_SIZE].upper() if r else "???")
+
+  total_counts = [0] * len(gvg_role_ids)
+  unique_counts = [0] * len(gvg_role_ids)
+  for member in members:
+    m_role_ids = [r.id for r in member.roles if r.id in gvg_role_ids]
+    for i, r_id in enumerate(gvg_role_ids):
+      if r_id in m_role_ids:
+        total_counts[i] += 1
+        if len(m_role_ids) == 1:
+          unique_counts[i] += 1
+
+  summary_data = [["TOTAL"] + total_counts, ["UNIQUE"] + unique_counts]
+  table_str = tabulate(summary_data, headers=["Type"] + role_names, tablefmt="simple")
+  return f"### 📊 Role Distribution Summary\n```\n{table_str}\n```"
+
+
+async def legacy_role_list(members, role_id, gvg_roles) -> list[str]:
+  member_str_list = []
+  gvg_roles_ids = [r.id for r in gvg_roles]
+  for member in members:
+    m_role_ids = [r.id for r in member.roles if r.id in gvg_roles_ids]
+    if role_id not in m_role_ids:
+      continue
+    m_str = member.mention
+    other = [r_id for r_id in m_role_ids if r_id != role_id]
+    if other:
+      m_str += f" (other GvG roles: {' '.join([f'<@&{r_id}>' for r_id in other])})"
+    member_str_list.append(m_str)
+  return member_str_list
+
+
+def timed(coro_fn, repeat: int = 3) -> float:
+  best = float("inf")
+  for _ in range(repeat):
+    start = time.perf_counter()
+    asyncio.run(coro_fn())
+    best = min(best, time.perf_counter() - start)
+  return best
+
+
+def main() -> None:
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+  # Memory: what a snapshot holds (member objects, here lighter-weight fakes
+  # than discord.Member) vs the matrix built from it
+  tracemalloc.start()
+  guild = make_guild(n)
+  snapshot_bytes, _ = tracemalloc.get_traced_memory()
+  tracemalloc.reset_peak()
+  before, _ = tracemalloc.get_traced_memory()
+  snapshot = guild.snapshot()
+  RosterMatrix(snapshot, guild.gvg_roles, guild.reacts)  # type: ignore[arg-type]
+  matrix_bytes = tracemalloc.get_traced_memory()[0] - before
+  tracemalloc.stop()
+
+  members = set().union(*snapshot.react_data.values())
+  gvg_roles = guild.gvg_roles
+  gvg_role_ids = [r.id for r in gvg_roles]
+  target = gvg_roles[0].id
+
+  start = time.perf_counter()
+  matrix = RosterMatrix(snapshot, gvg_roles, guild.reacts)  # type: ignore[arg-type]
+  build = time.perf_counter() - start
+  mask = matrix.react_mask(None)
+
+  rows = [
+    (
+      "overview",
+      timed(lambda: legacy_overview(members, gvg_roles)),
+      timed(lambda: get_overview_table_str(matrix, mask)),
+    ),
+    (
+      "summary",
+      timed(lambda: legacy_summary(guild, members, gvg_role_ids)),
+      timed(lambda: get_summary_table_str(matrix, mask)),
+    ),
+    (
+      "role list",
+      timed(lambda: legacy_role_list(members, target, gvg_roles)),
+      timed(lambda: get_role_list_str(matrix, mask, target)),
+    ),
+  ]
+
+  # Repeated /signup_summary on an unchanged snapshot
+  def overview_cold():
+    render_cache.clear()
+    format_name_for_table.cache_clear()
+    return overview_cached()
+
+  def overview_cached():
+    return render_cache.get_or_render(
+      guild.id,
+      render_key("overview", matrix, None), lambda: get_overview_table_str(matrix, mask)
+    )
+
+  cold = timed(overview_cold)
+  names_warm = timed(lambda: get_overview_table_str(matrix, mask))
+  cached = timed(overview_cached)
+
+  print(f"members: {len(members)}, gvg roles: {len(gvg_roles)}, reacts: {len(guild.reacts)}")
+  print(f"matrix build: {build * 1e3:.1f} ms (once per snapshot version)")
+  print(f"snapshot members: {snapshot_bytes / 1024:.0f} KiB ({snapshot_bytes / n:.0f} B/member)")
+  print(f"matrix:           {matrix_bytes / 1024:.0f} KiB ({matrix_bytes / n:.0f} B/member)")
+  print(f"{'render':<10} {'legacy ms':>10} {'matrix ms':>10} {'speedup':>8}")
+  for name, legacy, new in rows:
+    print(f"{name:<10} {legacy * 1e3:10.2f} {new * 1e3:10.2f} {legacy / new:7.1f}x")
+  print("repeat overview (same snapshot version):")
+  print(f"  cold render:         {cold * 1e3:10.2f} ms")
+  print(f"  name widths cached:  {names_warm * 1e3:10.2f} ms")
+  print(f"  render cache hit:    {cached * 1e3:10.3f} ms")
+
+
+if __name__ == "__main__":
+  main()
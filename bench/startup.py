@@ -0,0 +1,79 @@
+"""
+Cold-start regression check: imports `main` and every cog in fresh
+interpreters and fails (exit status 1) if the best time is over budget or
+a lazily imported dependency got imported at startup again.
+
+  python -m bench.startup [budget_ms] [runs]
+
+The budget defaults to `STARTUP_BUDGET_MS`.
+"""
+
+import json
+import os
+import pathlib
+import subprocess
+import sys
+
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+# Only imported by the commands, pages or processes that need them
+LAZY_MODULES = ["tabulate", "emoji", "wcwidth", "jinja2", "fastapi", "uvicorn"]
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from core.import_profiler import import_profiler
+import_profiler.install()
+import main
+for cog in {cogs!r}:
+  __import__(cog)
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+  "ms": elapsed * 1e3,
+  "packages": import_profiler.by_package(),
+  "eager": [m for m in {lazy!r} if m in sys.modules],
+}}))
+"""
+
+
+def cold_start() -> dict:
+  cogs = [f"bot.cogs.{p.stem}" for p in sorted(pathlib.Path("bot/cogs").glob("*.py"))]
+  out = subprocess.run(
+    [sys.executable, "-c", CHILD.format(cogs=cogs, lazy=LAZY_MODULES)],
+    capture_output=True,
+    text=True,
+    check=True,
+  )
+  return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+  budget = float(sys.argv[1]) if len(sys.argv) > 1 else STARTUP_BUDGET_MS
+  runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+  results = [cold_start() for _ in range(runs)]
+  best = min(results, key=lambda r: r["ms"])
+  times = sorted(r["ms"] for r in results)
+
+  print(f"cold start (import main + cogs), {runs} runs:")
+  print(f"  best {times[0]:.0f} ms, median {times[len(times) // 2]:.0f} ms, budget {budget:.0f} ms")
+  print("slowest packages (best run, self time):")
+  packages = sorted(best["packages"].items(), key=lambda kv: kv[1], reverse=True)
+  for package, seconds in packages[:10]:
+    print(f"  {package:<20} {seconds * 1e3:7.1f} ms")
+
+  failures = []
+  if times[0] > budget:
+    failures.append(f"cold start {times[0]:.0f} ms is over the {budget:.0f} ms budget")
+  if best["eager"]:
+    failures.append(f"imported at startup, should be lazy: {', '.join(best['eager'])}")
+
+  for failure in failures:
+    print(f"FAIL: {failure}")
+  if failures:
+    sys.exit(1)
+  print("OK")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,197 @@
+"""
+Benchmark suite for the signup hot paths on synthetic guilds, with JSON
+output and a regression check against a stored baseline.
+
+  python -m bench.suite [--sizes 100,1000,10000] [--out results.json]
+  python -m bench.suite --compare baseline.json [--threshold 0.25]
+
+Store a baseline with `--out bench/baseline.json` before a change, then
+`--compare` it after; the run exits 1 if any case got slower by more than
+`threshold` (and by more than the noise floor). `--out -` prints the JSON
+to stdout and the table to stderr. Sizes up to 50000 work, but the table
+renders take seconds each at that scale.
+
+Run from the repo root.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from collections.abc import Awaitable, Callable
+
+import discord
+
+from bench.fixtures import FakeGuild, make_guild, make_message
+from bot.cogs.signup import get_overview_table_str, get_role_list_str, get_summary_table_str
+from bot.cogs.ui.autocomplete import _emoji_indexes, emoji_autocomplete
+from core.models import SignupConfig
+from services.config import config_cache
+from services.member_cache import MemberCache
+from services.name_width import format_name_for_table, pad_wide_name
+from services.roster_matrix import RosterMatrix
+from services.signup_service import get_react_data
+
+DEFAULT_SIZES = [100, 1000, 10000]
+
+# Keystrokes typing a react name into an autocomplete field
+KEYSTROKES = [w[: k + 1] for w in ["react1", "react12", "zzz"] for k in range(len(w))]
+
+
+class FakeInteraction:
+  def __init__(self, guild_id: int) -> None:
+    self.guild_id = guild_id
+
+
+async def best_of(repeat: int, fn: Callable[[], Awaitable[object]]) -> float:
+  """Best wall time of `fn` in ms."""
+  best = float("inf")
+  for _ in range(repeat):
+    start = time.perf_counter()
+    await fn()
+    best = min(best, time.perf_counter() - start)
+  return best * 1e3
+
+
+def clear_name_caches() -> None:
+  format_name_for_table.cache_clear()
+  pad_wide_name.cache_clear()
+
+
+async def run_size(guild: FakeGuild, repeat: int) -> dict[str, float]:
+  message = make_message(guild)
+  results = {}
+
+  async def react_data():
+    # A fresh member cache each time: resolving is part of the path
+    return await get_react_data(guild, message, guild.reacts, MemberCache())  # type: ignore[arg-type]
+
+  results["get_react_data"] = await best_of(repeat, react_data)
+
+  snapshot = guild.snapshot()
+
+  async def build_matrix():
+    return RosterMatrix(snapshot, guild.gvg_roles, guild.reacts)  # type: ignore[arg-type]
+
+  results["roster_matrix"] = await best_of(repeat, build_matrix)
+  matrix = await build_matrix()
+  mask = matrix.react_mask(None)
+  target = guild.gvg_roles[0].id
+
+  async def cold(render: Callable[[], Awaitable[object]]):
+    clear_name_caches()
+    return await render()
+
+  results["overview_table"] = await best_of(
+    repeat, lambda: cold(lambda: get_overview_table_str(matrix, mask))
+  )
+  results["summary_table"] = await best_of(
+    repeat, lambda: get_summary_table_str(matrix, mask)
+  )
+  results["role_list"] = await best_of(repeat, lambda: get_role_list_str(matrix, mask, target))
+
+  config_cache.store(SignupConfig(guild_id=guild.id, gvg_reacts=guild.reacts))
+  interaction = FakeInteraction(guild.id)
+
+  async def autocomplete_cold():
+    _emoji_indexes.clear()
+    return await emoji_autocomplete(interaction, KEYSTROKES[0])  # type: ignore[arg-type]
+
+  async def autocomplete_keystrokes():
+    for current in KEYSTROKES:
+      await emoji_autocomplete(interaction, current)  # type: ignore[arg-type]
+
+  results["autocomplete_build"] = await best_of(repeat, autocomplete_cold)
+  keystrokes = await best_of(repeat, autocomplete_keystrokes)
+  results["autocomplete_keystroke"] = keystrokes / len(KEYSTROKES)
+  return results
+
+
+async def run(sizes: list[int], n_roles: int, n_reacts: int, repeat: int) -> dict:
+  results = {}
+  for n in sizes:
+    guild = make_guild(n, n_roles=n_roles, n_reacts=n_reacts)
+    for case, ms in (await run_size(guild, repeat)).items():
+      results[f"{case}/{n}"] = ms
+
+  return {
+    "meta": {
+      "python": platform.python_version(),
+      "discord.py": discord.__version__,
+      "machine": platform.machine(),
+      "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+      "sizes": sizes,
+      "roles": n_roles,
+      "reacts": n_reacts,
+      "repeat": repeat,
+    },
+    # "<case>/<members>" -> best time in ms
+    "results": results,
+  }
+
+
+def print_results(report: dict, out) -> None:
+  print(f"{'case':<34} {'ms':>12}", file=out)
+  for key, ms in report["results"].items():
+    print(f"{key:<34} {ms:12.4f}", file=out)
+
+
+def compare(report: dict, baseline: dict, threshold: float, min_delta: float, out) -> list[str]:
+  """Print old vs new per case; returns the cases that regressed."""
+  regressions = []
+  print(f"\n{'case':<34} {'baseline':>10} {'now':>10} {'change':>8}", file=out)
+  for key, ms in report["results"].items():
+    old = baseline["results"].get(key)
+    if old is None:
+      print(f"{key:<34} {'-':>10} {ms:10.3f} {'new':>8}", file=out)
+      continue
+
+    change = ms / old - 1 if old else 0.0
+    flag = ""
+    if change > threshold and ms - old > min_delta:
+      flag = "  REGRESSION"
+      regressions.append(key)
+    print(f"{key:<34} {old:10.3f} {ms:10.3f} {change:+8.1%}{flag}", file=out)
+  return regressions
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+  parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+  parser.add_argument("--roles", type=int, default=40, help="guild roles (8 are GvG roles)")
+  parser.add_argument("--reacts", type=int, default=12)
+  parser.add_argument("--repeat", type=int, default=5, help="runs per case; the best counts")
+  parser.add_argument("--out", help="write JSON results here ('-' for stdout)")
+  parser.add_argument("--compare", metavar="BASELINE", help="JSON results to compare with")
+  parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown")
+  parser.add_argument("--min-delta-ms", type=float, default=0.2, help="noise floor")
+  args = parser.parse_args()
+
+  sizes = [int(s) for s in args.sizes.split(",")]
+  report = asyncio.run(run(sizes, args.roles, args.reacts, args.repeat))
+
+  # Keep stdout clean for the JSON when it goes there
+  table_out = sys.stderr if args.out == "-" else sys.stdout
+  print_results(report, table_out)
+
+  if args.out == "-":
+    json.dump(report, sys.stdout, indent=2)
+    print()
+  elif args.out:
+    with open(args.out, "w") as f:
+      json.dump(report, f, indent=2)
+
+  if args.compare:
+    with open(args.compare) as f:
+      baseline = json.load(f)
+    regressions = compare(report, baseline, args.threshold, args.min_delta_ms, table_out)
+    if regressions:
+      print(f"\n{len(regressions)} regressions over {args.threshold:.0%}", file=table_out)
+      sys.exit(1)
+    print("\nNo regressions.", file=table_out)
+
+
+if __name__ == "__main__":
+  main()
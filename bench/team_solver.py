@@ -0,0 +1,78 @@
+"""
+Team balancing time for 100-1000 signups: the greedy pass alone vs greedy
+plus local search, with even-split quotas and with tight quotas (not
+everyone fits), a tenth of the members locked by hand.
+
+  python -m bench.team_solver [budget_seconds]
+"""
+
+import math
+import sys
+import time
+
+from bench.fixtures import make_guild
+from services.assignments import MAX_NUM_GROUPS
+from services.roster_matrix import RosterMatrix
+from services.team_solver import SOLVER_TIME_BUDGET, TeamSolution, default_quotas, solve_teams
+
+SIZES = [100, 250, 500, 1000]
+
+
+def imbalance(solution: TeamSolution) -> int:
+  """Sum over roles of the largest minus the smallest group count."""
+  per_role = zip(*solution.counts)
+  return sum(max(counts) - min(counts) for counts in per_role)
+
+
+def locks(matrix: RosterMatrix) -> dict[tuple[int, int], int]:
+  """Every tenth member pinned to their first GvG role, round robin over groups."""
+  locked = {}
+  for j, member in enumerate(matrix.members[::10]):
+    if member.role_mask:
+      i = (member.role_mask & -member.role_mask).bit_length() - 1
+      locked[(member.id, matrix.role_ids[i])] = j % MAX_NUM_GROUPS + 1
+  return locked
+
+
+def timed(fn, repeat: int = 3) -> tuple[float, TeamSolution]:
+  best = float("inf")
+  for _ in range(repeat):
+    start = time.perf_counter()
+    solution = fn()
+    best = min(best, time.perf_counter() - start)
+  return best, solution
+
+
+def main() -> None:
+  budget = float(sys.argv[1]) if len(sys.argv) > 1 else SOLVER_TIME_BUDGET
+  print(f"groups: {MAX_NUM_GROUPS}, local search budget: {budget * 1e3:.0f} ms")
+  print(
+    f"{'signups':>7} {'quotas':<6} {'greedy ms':>10} {'imbal':>6} {'placed':>7}"
+    f" {'full ms':>9} {'imbal':>6} {'placed':>7}"
+  )
+
+  for n in SIZES:
+    guild = make_guild(n)
+    matrix = RosterMatrix(guild.snapshot(), guild.gvg_roles, guild.reacts)  # type: ignore[arg-type]
+    locked = locks(matrix)
+    even = default_quotas(matrix.members, len(matrix.role_ids), MAX_NUM_GROUPS)
+    tight = [math.ceil(q * 0.6) for q in even]
+
+    for name, quotas in [("even", even), ("tight", tight)]:
+
+      def solve(budget: float) -> TeamSolution:
+        return solve_teams(
+          matrix.members, matrix.role_ids, MAX_NUM_GROUPS, quotas, locked, budget
+        )
+
+      greedy_time, greedy = timed(lambda: solve(0.0))
+      full_time, full = timed(lambda: solve(budget))
+      print(
+        f"{n:>7} {name:<6} {greedy_time * 1e3:10.2f} {imbalance(greedy):>6}"
+        f" {len(greedy.assignments):>7} {full_time * 1e3:9.2f} {imbalance(full):>6}"
+        f" {len(full.assignments):>7}" + (" (budget hit)" if full.timed_out else "")
+      )
+
+
+if __name__ == "__main__":
+  main()
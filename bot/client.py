@@ -1,11 +1,76 @@
+import asyncio
+import os
 import pathlib
+import time
 import discord
+import yarl
 from discord.ext import commands
+from discord.gateway import DiscordWebSocket
 
+from bot.command_sync import sync_commands
+from bot.sharding import shard_for_guild
+from core.import_profiler import STARTED
+from services.assignments import TeamAssignments
+from services.member_cache import MemberCache
+from services.reaction_index import ReactionIndex
+from services.roster_store import LiveRosterSource, RosterPublisher
+from services.snapshot_service import SnapshotService
 
-class Bot(commands.Bot):
-  def __init__(self) -> None:
+# Cache only the members GvG needs: reactors, chunked on demand by id
+# instead of every member of every guild at login. Opt in with 1.
+LEAN_MEMBER_CACHE = os.getenv("LEAN_MEMBER_CACHE", "0") == "1"
+
+# Talk to a stand-in for Discord at this URL instead (e.g. bench/fake_discord.py)
+DISCORD_API_URL = os.getenv("DISCORD_API_URL", "")
+
+
+def member_cache_options(lean: bool) -> dict:
+  """discord.py member caching and startup chunking options."""
+  if not lean:
+    return {}
+  return {
+    # Reactors chunked by id live only in MemberCache (see `guild_cache`)
+    "member_cache_flags": discord.MemberCacheFlags.none(),
+    "chunk_guilds_at_startup": False,
+  }
+
+
+def use_discord_api(url: str) -> None:
+  """Send REST requests (webhooks included) and gateway connections to `url`."""
+  url = url.rstrip("/")
+  discord.http.Route.BASE = f"{url}/api/v10"
+  # Used when the shard count is set, instead of asking `/gateway/bot`
+  DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(url.replace("http", "ws", 1) + "/gateway")
+
+
+class Bot(commands.AutoShardedBot):
+  """
+  The GvG bot. Runs every shard of `shard_count` by default, or only
+  `shard_ids` when several processes split the shards between them.
+
+  With `publish_rosters`, rosters are also published to the DB for web
+  workers running in other processes. With `lean_members`, discord.py
+  only caches the members that `member_cache` resolves.
+  """
+
+  def __init__(
+    self,
+    shard_ids: list[int] | None = None,
+    shard_count: int | None = None,
+    publish_rosters: bool = False,
+    lean_members: bool = LEAN_MEMBER_CACHE,
+  ) -> None:
     # self.store = storage  # Shared storage access
+    if DISCORD_API_URL:
+      use_discord_api(DISCORD_API_URL)
+
+    self.member_cache = MemberCache(guild_cache=not lean_members)
+    self.reaction_index = ReactionIndex(self.member_cache)
+    self.snapshots = SnapshotService(self.reaction_index)
+    self.rosters = LiveRosterSource(self, self.snapshots)
+    self.publisher = RosterPublisher()
+    self.publish_rosters = publish_rosters
+    self.assignments = TeamAssignments()
 
     intents = discord.Intents.default()
     intents.message_content = True
@@ -16,21 +81,50 @@ class Bot(commands.Bot):
       command_prefix="!",
       intents=intents,
       help_command=commands.DefaultHelpCommand(),
+      shard_ids=shard_ids,
+      shard_count=shard_count,
+      **member_cache_options(lean_members),
     )
 
+  def shard_of(self, guild_id: int) -> int:
+    return shard_for_guild(guild_id, self.shard_count or 1)
+
+  def owns_guild(self, guild_id: int) -> bool:
+    """Whether this process runs the shard that `guild_id` is on."""
+    if self.shard_ids is None:
+      return True
+    return self.shard_of(guild_id) in self.shard_ids
+
   async def setup_hook(self) -> None:
-    cog_dir = pathlib.Path("./bot/cogs")
-    for ext_path in cog_dir.glob("*.py"):
-      ext_name = ext_path.name[:-3]
+    # Independent, so restore warm state while the cogs load
+    await asyncio.gather(self.snapshots.restore(self.owns_guild), self.load_cogs())
+
+    # Commands are per application, so one process syncs for all of them
+    if self.shard_ids is None or 0 in self.shard_ids:
+      assert self.application_id is not None
+      await sync_commands(self.tree, self.application_id)
+
+  async def load_cogs(self) -> None:
+    """Load every cog concurrently, reporting how long each took."""
+    start = time.perf_counter()
 
+    async def load(ext_name: str) -> None:
+      ext_start = time.perf_counter()
       await self.load_extension(f"bot.cogs.{ext_name}")
-      print(f"Loaded extension: {ext_name}")
+      print(f"Loaded extension: {ext_name} ({(time.perf_counter() - ext_start) * 1e3:.0f} ms)")
 
-    synced = await self.tree.sync()
-    print(f"Synced {len(synced)} global commands.")
+    cog_dir = pathlib.Path("./bot/cogs")
+    await asyncio.gather(*(load(p.stem) for p in sorted(cog_dir.glob("*.py"))))
+    print(f"Loaded all extensions in {(time.perf_counter() - start) * 1e3:.0f} ms")
+
+  async def close(self) -> None:
+    await self.snapshots.persist()
+    await super().close()
 
   async def on_ready(self):
     assert self.user is not None
-    print(f"Logged in as {self.user} (ID: {self.user.id})")
-
-bot = Bot()
+    print(
+      f"Logged in as {self.user} (ID: {self.user.id}), "
+      f"shards {self.shard_ids or 'all'} of {self.shard_count}, "
+      f"{time.perf_counter() - STARTED:.1f}s after start"
+    )
@@ -3,13 +3,22 @@ from discord import app_commands
 from discord.ext import commands
 
 from bot.cogs.ui.views import ReactionSetupView, RolePersistenceView
-from core.database import get_session_context
 from core.models import ChannelConfig, SignupConfig
-from services.config import get_signup_config, update_signup_config
+from services.config import (
+  SignupConfigSnapshot,
+  get_cached_signup_config,
+  save_signup_config,
+)
 from services.discord_bus import hydrate_channel
 
 
-async def get_gvg_status_str(signup_config: SignupConfig) -> str:
+def interaction_guild_id(interaction: discord.Interaction) -> int:
+  # Every command here is guild_only
+  assert interaction.guild_id is not None
+  return interaction.guild_id
+
+
+async def get_gvg_status_str(signup_config: SignupConfigSnapshot) -> str:
   # Report
   lines = ["## 🛡️ GvG Configuration Summary"]
 
@@ -49,6 +58,7 @@ class Configure(commands.Cog):
   def __init__(self, bot: commands.Bot) -> None:
     self.bot = bot
 
+  @app_commands.guild_only()
   @app_commands.command(
     name="set_gvg_management_channel", description="Where to post gvg bot messages."
   )
@@ -61,21 +71,15 @@ class Configure(commands.Cog):
     )
 
     # Update DB
-    with get_session_context() as session:
-      signup_config: SignupConfig = get_signup_config(session)
-      signup_config = SignupConfig(
-        selected_post=signup_config.selected_post,
-        gvg_roles=signup_config.gvg_roles,
-        gvg_reacts=signup_config.gvg_reacts,
-        management_channel=c_config,
-      )
-
-      signup_config = update_signup_config(session, signup_config)
+    await save_signup_config(
+      management_channel.guild.id, SignupConfig(management_channel=c_config)
+    )
 
     await interaction.response.send_message(
       f"Management channel set to: {management_channel}", ephemeral=True
     )
 
+  @app_commands.guild_only()
   @app_commands.command(
     name="set_gvg_roles", description="Open up menu to select GvG roles."
   )
@@ -87,11 +91,10 @@ class Configure(commands.Cog):
       return
 
     # Get current info
-    with get_session_context() as session:
-      signup_config: SignupConfig = get_signup_config(session)
+    signup_config = await get_cached_signup_config(interaction.guild.id)
 
     # Pass the current set and the guild roles to the view
-    view = RolePersistenceView(signup_config.gvg_roles, interaction.guild.roles)
+    view = RolePersistenceView(list(signup_config.gvg_roles), interaction.guild.roles)
     await interaction.response.send_message(
       "Select GvG class roles:",
       view=view,
@@ -103,17 +106,10 @@ class Configure(commands.Cog):
       await interaction.followup.send("Role selection timeout. Exiting", ephemeral=True)
       return
 
-    # Update DB (repull incase changes)
-    with get_session_context() as session:
-      signup_config: SignupConfig = get_signup_config(session)
-      signup_config = SignupConfig(
-        management_channel=signup_config.management_channel,
-        selected_post=signup_config.selected_post,
-        gvg_reacts=signup_config.gvg_reacts,
-        gvg_roles=view.role_ids,
-      )
-
-      signup_config = update_signup_config(session, signup_config)
+    # Update DB (only the changed field, so concurrent edits aren't lost)
+    signup_config = await save_signup_config(
+      interaction.guild.id, SignupConfig(gvg_roles=view.role_ids)
+    )
 
     # Confirm update to user
     management_channel = await hydrate_channel(
@@ -132,14 +128,15 @@ class Configure(commands.Cog):
         f"Updated! Tracking {len(view.role_ids)} roles: {all_role_strs}", ephemeral=True
       )
 
+  @app_commands.guild_only()
   @app_commands.command(
     name="set_gvg_reactions",
     description="Create temporary post to add specify GvG reactions.",
   )
   async def set_gvg_reactions(self, interaction: discord.Interaction) -> None:
     """Set GvG reactions."""
-    with get_session_context() as session:
-      signup_config: SignupConfig = get_signup_config(session)
+    guild_id = interaction_guild_id(interaction)
+    signup_config = await get_cached_signup_config(guild_id)
 
     management_channel = await hydrate_channel(
       self.bot, signup_config.management_channel
@@ -174,42 +171,34 @@ class Configure(commands.Cog):
     reactions = view.result
 
     # Update DB
-    with get_session_context() as session:
-      signup_config: SignupConfig = get_signup_config(session)
-      signup_config = SignupConfig(
-        management_channel=signup_config.management_channel,
-        selected_post=signup_config.selected_post,
-        gvg_roles=signup_config.gvg_roles,
-        gvg_reacts=list(reactions),
-      )
-      signup_config = update_signup_config(session, signup_config)
+    await save_signup_config(guild_id, SignupConfig(gvg_reacts=list(reactions)))
 
     # Confirm update to user
     await management_channel.send(
       f"Updated! GvG reactions set: {', '.join(reactions)}."
     )
 
+  @app_commands.guild_only()
   @app_commands.command(
     name="peak_gvg_config", description="Peak current GvG configuration."
   )
   async def peak_gvg_config(self, interaction: discord.Interaction):
     """Peak the config in any channel."""
-    # Get the config from DB
-    with get_session_context() as session:
-      signup_config: SignupConfig = get_signup_config(session)
+    # Get the (cached) config
+    signup_config = await get_cached_signup_config(interaction_guild_id(interaction))
 
     summary_text = await get_gvg_status_str(signup_config)
     await interaction.response.send_message(summary_text, ephemeral=True)
 
+  @app_commands.guild_only()
   @app_commands.command(
     name="post_gvg_config",
     description="Post current GvG configuration to management channel.",
   )
   async def post_gvg_config(self, interaction: discord.Interaction):
     """Post the config in the management channel."""
-    # Get the config from DB
-    with get_session_context() as session:
-      signup_config: SignupConfig = get_signup_config(session)
+    # Get the (cached) config
+    signup_config = await get_cached_signup_config(interaction_guild_id(interaction))
 
     management_channel = await hydrate_channel(
       self.bot, signup_config.management_channel
@@ -225,6 +214,7 @@ class Configure(commands.Cog):
     await interaction.response.send_message(summary_text, ephemeral=True)
     await management_channel.send(summary_text)
 
+  @app_commands.guild_only()
   @app_commands.command(
     name="add_gvg_reaction_str", description="Manually add a GvG react string."
   )
@@ -232,8 +222,8 @@ class Configure(commands.Cog):
   async def add_gvg_reaction_str(
     self, interaction: discord.Interaction, react_str: str
   ) -> None:
-    with get_session_context() as session:
-      signup_config: SignupConfig = get_signup_config(session)
+    guild_id = interaction_guild_id(interaction)
+    signup_config = await get_cached_signup_config(guild_id)
 
     management_channel = await hydrate_channel(
       self.bot, signup_config.management_channel
@@ -252,19 +242,10 @@ class Configure(commands.Cog):
       )
       return
 
-    signup_config.gvg_reacts.append(react_str)
-    reactions = signup_config.gvg_reacts
+    reactions = [*signup_config.gvg_reacts, react_str]
 
     # Update DB
-    with get_session_context() as session:
-      signup_config: SignupConfig = get_signup_config(session)
-      signup_config = SignupConfig(
-        management_channel=signup_config.management_channel,
-        selected_post=signup_config.selected_post,
-        gvg_roles=signup_config.gvg_roles,
-        gvg_reacts=reactions,
-      )
-      signup_config = update_signup_config(session, signup_config)
+    await save_signup_config(guild_id, SignupConfig(gvg_reacts=reactions))
 
     # Confirm update to user
     await interaction.response.send_message("Added reaction.", ephemeral=True)
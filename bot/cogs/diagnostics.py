@@ -0,0 +1,74 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from bot.client import Bot
+from services.config import config_cache
+from services.name_width import format_name_for_table
+from services.render_cache import render_cache
+from services.signup_service import get_and_hydrate_signup, signup_cache
+
+
+class Diagnostics(commands.Cog):
+  def __init__(self, bot: Bot) -> None:
+    self.bot = bot
+
+  @app_commands.command(
+    name="signup_index_verify",
+    description="Check the live reaction index against a full scan of the post.",
+  )
+  async def signup_index_verify(self, interaction: discord.Interaction):
+    """Verify (and resync) the incremental reaction index."""
+    await interaction.response.defer(ephemeral=True, thinking=True)
+
+    signup = await get_and_hydrate_signup(self.bot, interaction)
+    if not signup:
+      return
+
+    diff = await self.bot.reaction_index.verify(signup.post, signup.tracked_reacts)
+    if not diff:
+      await interaction.followup.send(
+        "Reaction index matches a full scan.", ephemeral=True
+      )
+      return
+
+    lines = ["### Reaction index drift (resynced)"]
+    for emoji_str, (missing, extra) in diff.items():
+      lines.append(f"{emoji_str}: {len(missing)} missing, {len(extra)} extra")
+
+    await interaction.followup.send("\n".join(lines), ephemeral=True)
+
+  @app_commands.command(
+    name="gvg_stats",
+    description="Cache and scan statistics for the signup tracker.",
+  )
+  async def gvg_stats(self, interaction: discord.Interaction):
+    """Report internal cache state."""
+    lines = ["### GvG Bot Stats"]
+    for post in self.bot.reaction_index.posts:
+      if post.guild_id != interaction.guild_id:
+        continue
+      age = f"{post.age:.0f}s old" if post.age is not None else "never scanned"
+      lines.append(
+        f"**Post {post.message_id}:** {'live' if post.live else 'stale'}, "
+        f"version {post.version}, {age}"
+      )
+      lines.append(f"**Last scan:** {post.last_scan or 'never'}")
+    lines.append(f"**Snapshots:** {self.bot.snapshots.summary()}")
+    if self.bot.publish_rosters:
+      lines.append(f"**Published rosters:** {self.bot.publisher.summary()}")
+    lines.append(f"**Member cache:** {self.bot.member_cache.summary()}")
+    lines.append(f"**Config cache:** {config_cache.summary()}")
+    lines.append(f"**Signup cache:** {signup_cache.summary()}")
+    lines.append(f"**Render cache:** {render_cache.summary()}")
+    names = format_name_for_table.cache_info()
+    lines.append(
+      f"**Name widths:** {names.currsize}/{names.maxsize} entries, "
+      f"{names.hits} hits, {names.misses} misses"
+    )
+
+    await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+
+async def setup(bot: Bot):
+  await bot.add_cog(Diagnostics(bot))
@@ -0,0 +1,101 @@
+import discord
+from discord.ext import commands
+
+from bot.client import Bot
+from services.signup_service import signup_cache
+
+
+class CacheEvents(commands.Cog):
+  """Gateway listeners that keep the bot's caches current."""
+
+  def __init__(self, bot: Bot) -> None:
+    self.bot = bot
+
+  # Reactions on the tracked post
+
+  @commands.Cog.listener()
+  async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+    self.bot.reaction_index.on_add(payload)
+
+  @commands.Cog.listener()
+  async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+    self.bot.reaction_index.on_remove(payload)
+
+  @commands.Cog.listener()
+  async def on_raw_reaction_clear(self, payload: discord.RawReactionClearEvent):
+    self.bot.reaction_index.on_clear(payload)
+
+  @commands.Cog.listener()
+  async def on_raw_reaction_clear_emoji(
+    self, payload: discord.RawReactionClearEmojiEvent
+  ):
+    self.bot.reaction_index.on_clear_emoji(payload)
+
+  # Members resolved for reactors
+
+  @commands.Cog.listener()
+  async def on_member_update(self, before: discord.Member, after: discord.Member):
+    self.bot.member_cache.invalidate(after.guild.id, after.id)
+    self.bot.reaction_index.on_member_changed(after.guild.id, after.id)
+
+  @commands.Cog.listener()
+  async def on_member_remove(self, member: discord.Member):
+    self.bot.member_cache.invalidate(member.guild.id, member.id)
+    self.bot.reaction_index.on_member_changed(member.guild.id, member.id)
+
+  # Things the hydrated Signup was built from
+
+  @commands.Cog.listener()
+  async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+    signup_cache.invalidate_for(message_id=payload.message_id)
+
+  @commands.Cog.listener()
+  async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+    signup_cache.invalidate_for(message_id=payload.message_id)
+
+  @commands.Cog.listener()
+  async def on_raw_bulk_message_delete(
+    self, payload: discord.RawBulkMessageDeleteEvent
+  ):
+    for message_id in payload.message_ids:
+      signup_cache.invalidate_for(message_id=message_id)
+
+  @commands.Cog.listener()
+  async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+    signup_cache.invalidate_for(channel_id=channel.id)
+
+  @commands.Cog.listener()
+  async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+    signup_cache.invalidate_for(guild_id=after.guild.id)
+
+  @commands.Cog.listener()
+  async def on_guild_role_delete(self, role: discord.Role):
+    signup_cache.invalidate_for(guild_id=role.guild.id)
+
+  @commands.Cog.listener()
+  async def on_guild_emojis_update(
+    self, guild: discord.Guild, before: list[discord.Emoji], after: list[discord.Emoji]
+  ):
+    signup_cache.invalidate_for(guild_id=guild.id)
+
+  # Gateway gaps on a shard: its guilds' events may have been missed, so
+  # fall back to a rescan for those posts only
+
+  def invalidate_shard(self, shard_id: int) -> None:
+    self.bot.reaction_index.invalidate(lambda g_id: self.bot.shard_of(g_id) == shard_id)
+
+  @commands.Cog.listener()
+  async def on_shard_disconnect(self, shard_id: int):
+    self.invalidate_shard(shard_id)
+
+  @commands.Cog.listener()
+  async def on_shard_resumed(self, shard_id: int):
+    self.invalidate_shard(shard_id)
+
+  @commands.Cog.listener()
+  async def on_shard_ready(self, shard_id: int):
+    self.invalidate_shard(shard_id)
+
+
+async def setup(bot: Bot):
+  await bot.add_cog(CacheEvents(bot))
@@ -2,9 +2,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from core.database import get_session_context
-from core.models import SignupConfig
-from services.config import get_signup_config
+from services.config import get_cached_signup_config
 
 
 class General(commands.Cog):
@@ -18,8 +16,7 @@ class General(commands.Cog):
   @app_commands.describe(target="The member you want to look up.")
   async def peak_role(self, interaction: discord.Interaction, target: discord.Member):
     """Peak the role of a member."""
-    with get_session_context() as session:
-      signup_config: SignupConfig = get_signup_config(session)
+    signup_config = await get_cached_signup_config(target.guild.id)
 
     name = target.mention
     roles = [r for r in target.roles if not r.is_default()]
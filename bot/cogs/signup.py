@@ -1,120 +1,76 @@
-import time
+import asyncio
+from collections.abc import Awaitable, Callable
+
 import discord
 from discord import app_commands
-from discord.ext import commands
-from tabulate import tabulate
-from wcwidth import wcswidth, wcwidth
+from discord.ext import commands, tasks
 
+from bot.client import Bot
 from bot.cogs.ui.autocomplete import emoji_autocomplete
 from bot.cogs.ui.embeds import forward_as_embed
-from core.database import get_session_context
 from core.models import ChannelConfig, MessageConfig, SignupConfig
-from services.config import get_signup_config, update_signup_config
+from services.assignments import MAX_NUM_GROUPS
+from services.config import config_cache, save_signup_config
 from services.discord_bus import hydrate_channel
-from services.signup_service import get_and_hydrate_signup, get_react_data
+from services.name_width import format_name_for_table
+from services.reaction_index import SNAPSHOT_REFRESH_INTERVAL
+from services.render_cache import render_cache
+from services.roster_store import ROSTER_PUBLISH_INTERVAL
+from services.roster_matrix import RosterMatrix, get_roster_matrix
+from services.signup_service import Signup, get_and_hydrate_signup
+from services.team_solver import TeamSolution, run_solver
 
 
 ROLE_NAME_STR_SIZE = 6
 MAX_DISPLAY_NAME_LEN = 10
 
 
-def pad_wide_name(name: str, width: int) -> str:
-  visual_len = wcswidth(name)
-  if visual_len < 0:
-    visual_len = len(name)
-
-  padding_needed = width - visual_len
-  return name + " " * max(0, padding_needed)
-
-
-def format_name_for_table(name: str, max_width: int) -> str:
-  current_width = 0
-  truncated_name = ""
-
-  # Truncate based on visual width
-  for char in name:
-    width = wcwidth(char)
-    # Handle non-printable or zero-width characters
-    char_width = max(0, width)
-
-    if (
-      current_width + char_width > max_width - 1
-    ):  # Leave 1 space for an ellipsis if you like
-      truncated_name += "…"
-      current_width += 1
-      break
-
-    truncated_name += char
-    current_width += char_width
-
-  # Pad the remaining space with standard spaces
-  padding = " " * (max_width - current_width)
-  return truncated_name + padding
+def render_key(kind: str, matrix: RosterMatrix, react_filter: str | None, *extra) -> tuple:
+  """Everything a rendered table depends on; the version covers reacts and members."""
+  roles = tuple((r.id, r.name) for r in matrix.roles)
+  return (kind, matrix.version, roles, tuple(matrix.reacts), react_filter, *extra)
 
 
-async def get_overview_table_str(
-  members: set[discord.Member], gvg_roles: list[discord.Role]
-) -> str:
+async def get_overview_table_str(matrix: RosterMatrix, member_mask: int) -> str:
   """A overview table of signups (each role highlighted)."""
-  role_objects = []
+  from tabulate import tabulate
+
   headers = ["User"]
 
-  for role in gvg_roles:
+  for role in matrix.roles:
     name = role.name if role else "???"
-    role_objects.append(role)
     headers.append(name[:ROLE_NAME_STR_SIZE].upper())
 
   table_data = []
 
-  def role_weights(member: discord.Member):
-    return tuple(role not in member.roles for role in gvg_roles)
-
-  sorted_members = sorted(
-    list(members), key=lambda m: (role_weights(m), m.display_name.lower())
-  )
-  for member in sorted_members:
+  # Matrix members are already in overview order
+  role_bits = [1 << i for i in range(len(matrix.roles))]
+  for member in matrix.select(member_mask):
     padded_name = format_name_for_table(member.display_name, MAX_DISPLAY_NAME_LEN)
 
     row = [padded_name]
 
-    for role in gvg_roles:
-      row.append("✅" if role in member.roles else " ")
+    for bit in role_bits:
+      row.append("✅" if member.role_mask & bit else " ")
 
     table_data.append(row)
 
   table_str = tabulate(table_data, headers=headers, tablefmt="simple")
-  role_mentions = " ".join([r.mention for r in gvg_roles])
+  role_mentions = " ".join([r.mention for r in matrix.roles])
   return f"### GvG Roster Overview\n```\n{table_str}\n```\n**Roles:** {role_mentions}"
 
 
-async def get_summary_table_str(
-  guild: discord.Guild, members: set[discord.Member], gvg_role_ids: list[int]
-) -> str:
+async def get_summary_table_str(matrix: RosterMatrix, member_mask: int) -> str:
   """Summary table of counts."""
-
-  # TODO: Need to change `gvg_role_ids` to `list[discord.Role]`.
+  from tabulate import tabulate
 
   # Prepare Role Metadata
-  role_names = []
-  for r_id in gvg_role_ids:
-    r = guild.get_role(r_id)
-    role_names.append(r.name[:ROLE_NAME_STR_SIZE].upper() if r else "???")
+  role_names = [r.name[:ROLE_NAME_STR_SIZE].upper() for r in matrix.roles]
 
   # total_counts: Total people with the role
-  # unique_counts: People who have ONLY this role (from the gvg_role_ids list)
-  total_counts = [0] * len(gvg_role_ids)
-  unique_counts = [0] * len(gvg_role_ids)
-
-  for member in members:
-    # Get intersection of member roles and our target roles
-    m_role_ids = [r.id for r in member.roles if r.id in gvg_role_ids]
-
-    for i, r_id in enumerate(gvg_role_ids):
-      if r_id in m_role_ids:
-        total_counts[i] += 1
-        # If this is the ONLY target role they have, it's a unique count
-        if len(m_role_ids) == 1:
-          unique_counts[i] += 1
+  # unique_counts: People who have ONLY this role (from the GvG roles)
+  total_counts = matrix.totals(member_mask)
+  unique_counts = matrix.unique_counts(member_mask)
 
   # Format Data for Tabulate
   summary_data = [["TOTAL"] + total_counts, ["UNIQUE"] + unique_counts]
@@ -126,20 +82,22 @@ async def get_summary_table_str(
 
 
 async def get_role_list_str(
-  members: set[discord.Member], role_id: int, gvg_roles: list[discord.Role]
+  matrix: RosterMatrix, member_mask: int, role_id: int
 ) -> list[str]:
   """Get mention strings by filtered role."""
-  member_str_list = []
-  gvg_roles_ids = [r.id for r in gvg_roles]
-  for member in members:
-    m_role_ids = [r.id for r in member.roles if r.id in gvg_roles_ids]
-
-    if role_id not in m_role_ids:
-      continue
+  role_index = matrix.role_index(role_id)
+  if role_index is None:
+    return []
 
+  member_str_list = []
+  role_bit = 1 << role_index
+  for member in matrix.select(matrix.role_columns[role_index] & member_mask):
     m_str = member.mention
-    other_gvg_roles = [r_id for r_id in m_role_ids if r_id != role_id]
-    if other_gvg_roles:
+    other_mask = member.role_mask & ~role_bit
+    if other_mask:
+      other_gvg_roles = [
+        matrix.role_ids[i] for i in range(len(matrix.role_ids)) if other_mask >> i & 1
+      ]
       other_str = (
         f" (other GvG roles: {' '.join([f'<@&{r_id}>' for r_id in other_gvg_roles])})"
       )
@@ -150,10 +108,37 @@ async def get_role_list_str(
   return member_str_list
 
 
-class GvGSignup(commands.Cog):
-  TIME_TO_STALE = 300
+def parse_quotas(text: str, roles: list[discord.Role]) -> list[int]:
+  """`"tank=2, healer=3"` -> per-group quota per role; unnamed roles get none."""
+  by_name = {r.name.lower(): i for i, r in enumerate(roles)}
+  quotas = [0] * len(roles)
+  for item in text.split(","):
+    name, _, count = item.partition("=")
+    i = by_name.get(name.strip().lower())
+    if i is None or not count.strip().isdigit():
+      raise ValueError(f"Expected `role name=count`, got `{item.strip()}`.")
+    quotas[i] = int(count)
+  return quotas
+
+
+def get_balance_table_str(matrix: RosterMatrix, solution: TeamSolution) -> str:
+  """Members per group and role after balancing, against the quotas."""
+  from tabulate import tabulate
+
+  headers = ["Group"] + [r.name[:ROLE_NAME_STR_SIZE].upper() for r in matrix.roles]
+  table_data = [[f"G{g + 1}"] + counts for g, counts in enumerate(solution.counts)]
+  table_data.append(["QUOTA"] + solution.quotas)
+
+  table_str = tabulate(table_data, headers=headers, tablefmt="simple")
+  return (
+    f"### Team Balance\n```\n{table_str}\n```\n"
+    f"Placed {len(solution.assignments)} members, {len(solution.unplaced)} did not fit "
+    f"({solution.elapsed * 1e3:.0f} ms)."
+  )
 
-  def __init__(self, bot: commands.Bot) -> None:
+
+class GvGSignup(commands.Cog):
+  def __init__(self, bot: Bot) -> None:
     self.bot = bot
 
     # Post Selector
@@ -164,29 +149,80 @@ class GvGSignup(commands.Cog):
     )
     self.bot.tree.add_command(post_select_ctx_menu)
 
-    self._last_fetch_time = 0
-    self._last_snapshot: dict[str, set[discord.Member]] = {}
+  async def cog_load(self) -> None:
+    self.refresh_react_data.start()
+    if self.bot.publish_rosters:
+      self.publish_rosters.start()
+
+  async def cog_unload(self) -> None:
+    self.refresh_react_data.cancel()
+    self.publish_rosters.cancel()
+
+  async def for_each_guild(self, what: str, fn: Callable[[int], Awaitable[None]]) -> None:
+    """Run `fn` for every owned guild with a selected post, concurrently."""
+    # Concurrent so one slow guild doesn't hold up the rest
+    results = await asyncio.gather(
+      *(
+        fn(c.guild_id)
+        for c in config_cache.with_selected_post()
+        if self.bot.owns_guild(c.guild_id)
+      ),
+      return_exceptions=True,
+    )
+    for result in results:
+      if isinstance(result, Exception):
+        print(f"{what} failed: {result!r}")
+
+  @tasks.loop(seconds=SNAPSHOT_REFRESH_INTERVAL)
+  async def refresh_react_data(self) -> None:
+    """Pre-warm and periodically revalidate each guild's selected post."""
+
+    async def refresh_guild(guild_id: int) -> None:
+      signup = await get_and_hydrate_signup(self.bot, guild_id=guild_id)
+      if not signup:
+        return
+
+      await self.bot.reaction_index.refresh(
+        signup.guild, signup.post, signup.tracked_reacts
+      )
 
-  async def get_cached_react_data(
-    self, guild: discord.Guild, message: discord.Message
-  ) -> dict[str, set[discord.Member]]:
-    """Quick caching of the react data."""
-    if time.time() - self._last_fetch_time < self.TIME_TO_STALE:
-      return self._last_snapshot
+    await self.for_each_guild("Reaction refresh", refresh_guild)
+    await self.bot.snapshots.persist()
 
-    data = await get_react_data(guild, message)
+  @tasks.loop(seconds=ROSTER_PUBLISH_INTERVAL)
+  async def publish_rosters(self) -> None:
+    """Publish changed rosters for web workers in other processes."""
 
-    self._last_fetch_time = time.time()
-    self._last_snapshot = data
-    return data
+    async def publish_guild(guild_id: int) -> None:
+      view = await self.bot.rosters.get(guild_id)
+      if view:
+        await self.bot.publisher.publish(view)
+
+    await self.for_each_guild("Roster publish", publish_guild)
+
+  @refresh_react_data.before_loop
+  @publish_rosters.before_loop
+  async def before_loops(self) -> None:
+    await self.bot.wait_until_ready()
+
+  async def get_cached_matrix(self, signup: Signup) -> RosterMatrix:
+    """Roster matrix over the shared snapshot service's react data."""
+    snapshot = await self.bot.snapshots.get(signup)
+    return get_roster_matrix(snapshot, signup.roles, signup.tracked_reacts)
 
   async def select_post_cb(
     self, interaction: discord.Interaction, message: discord.Message
   ) -> None:
     """Callback for selecting post via context menu."""
 
+    if message.guild is None:
+      await interaction.response.send_message(
+        "Signup posts must be in a server.", ephemeral=True
+      )
+      return
+
     # Construct message config
-    guild_id = message.guild.id if message.guild else None
+    guild_id = message.guild.id
     c_config = ChannelConfig(
       channel_id=message.channel.id,
       guild_id=guild_id,
@@ -196,21 +232,11 @@ class GvGSignup(commands.Cog):
     )
 
     # Update DB
-    with get_session_context() as session:
-      signup_config: SignupConfig = get_signup_config(session)
-
-    signup_config = SignupConfig(
-      management_channel=signup_config.management_channel,
-      gvg_roles=signup_config.gvg_roles,
-      gvg_reacts=signup_config.gvg_reacts,
-      selected_post=m_config,
+    signup_config = await save_signup_config(
+      guild_id, SignupConfig(selected_post=m_config)
     )
-    with get_session_context() as session:
-      signup_config = update_signup_config(session, signup_config)
 
-    # Extra bot logging
-    if guild_id is None:
-      await interaction.followup.send("NOTE: No guild id detected.", ephemeral=True)
+    self.bot.reaction_index.select(guild_id, message.id)
 
     management_channel = await hydrate_channel(
       self.bot, signup_config.management_channel
@@ -242,18 +268,17 @@ class GvGSignup(commands.Cog):
     if not signup:
       return
 
-    data = await self.get_cached_react_data(signup.guild, signup.post)
+    matrix = await self.get_cached_matrix(signup)
+    member_mask = matrix.react_mask(react_filter)
 
-    if react_filter is None:
-      filtered_members = set().union(*data.values())
-    else:
-      filtered_members = data[react_filter]
+    overview_str = await render_cache.get_or_render(
+      signup.guild.id,
+      render_key("overview", matrix, react_filter),
+      lambda: get_overview_table_str(matrix, member_mask),
+    )
 
     header_str = "## Signup Summary" + (f" for {react_filter}" if react_filter else "")
-    # summary_str = await get_summary_table_str(
-    #   signup.guild, filtered_members, signup_config.gvg_roles
-    # )
-    overview_str = await get_overview_table_str(filtered_members, signup.roles)
+    # summary_str = await get_summary_table_str(matrix, member_mask)
 
     # TODO(alexandersoen): This is kinda annoying due to 2000 char limit :/
     # output_str = "\n".join([header_str, summary_str, overview_str])
@@ -286,14 +311,13 @@ class GvGSignup(commands.Cog):
     if not signup:
       return
 
-    data = await self.get_cached_react_data(signup.guild, signup.post)
-    if react_filter is None:
-      filtered_members = set().union(*data.values())
-    else:
-      filtered_members = data[react_filter]
+    matrix = await self.get_cached_matrix(signup)
+    member_mask = matrix.react_mask(react_filter)
 
-    role_list_str = await get_role_list_str(
-      filtered_members, target_role.id, signup.roles
+    role_list_str = await render_cache.get_or_render(
+      signup.guild.id,
+      render_key("role_list", matrix, react_filter, target_role.id),
+      lambda: get_role_list_str(matrix, member_mask, target_role.id),
     )
 
     no_pings = discord.AllowedMentions(users=False, roles=False, everyone=False)
@@ -316,6 +340,52 @@ class GvGSignup(commands.Cog):
     await signup.management_channel.send(output_str, allowed_mentions=no_pings)
     await interaction.delete_original_response()
 
+  @app_commands.command(
+    name="team_balance",
+    description="Place signed up members into groups, around existing assignments.",
+  )
+  @app_commands.describe(
+    react_filter="Only place members with this react.",
+    quotas="Per-group slots, e.g. `tank=2, healer=3`. Default: every holder, split evenly.",
+  )
+  @app_commands.autocomplete(react_filter=emoji_autocomplete)
+  async def team_balance(
+    self,
+    interaction: discord.Interaction,
+    react_filter: str | None = None,
+    quotas: str | None = None,
+  ) -> None:
+    """Fill the team builder groups automatically."""
+    await interaction.response.defer(ephemeral=True, thinking=False)
+
+    signup = await get_and_hydrate_signup(self.bot, interaction)
+    if not signup:
+      return
+
+    matrix = await self.get_cached_matrix(signup)
+    try:
+      role_quotas = parse_quotas(quotas, matrix.roles) if quotas else None
+    except ValueError as e:
+      await interaction.followup.send(str(e), ephemeral=True)
+      return
+
+    assignments = self.bot.assignments
+    # Lock in team builder clicks still buffered
+    await assignments.flush_guild(signup.guild.id)
+    _, locked = await assignments.get(signup.guild.id)
+    solution = await run_solver(
+      list(matrix.select(matrix.react_mask(react_filter))),
+      matrix.role_ids,
+      MAX_NUM_GROUPS,
+      role_quotas,
+      locked,
+    )
+    if solution.assignments:
+      await assignments.save(signup.guild.id, "bot", solution.assignments)
+
+    await signup.management_channel.send(get_balance_table_str(matrix, solution))
+    await interaction.delete_original_response()
+
 
-async def setup(bot: commands.Bot):
+async def setup(bot: Bot):
   await bot.add_cog(GvGSignup(bot))
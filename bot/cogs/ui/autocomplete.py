@@ -1,38 +1,126 @@
+import bisect
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import Generic, TypeVar
+
 import discord
-import emoji
 from discord import app_commands
 
-from core.database import get_session_context
-from core.models import SignupConfig
-from services.config import get_signup_config
+from services.config import get_cached_signup_config
+
+# Discord shows at most 25 autocomplete choices
+MAX_CHOICES = 25
+
+T = TypeVar("T", str, int, float)
+
+
+class AutocompleteIndex(Generic[T]):
+  """
+  Precomputed autocomplete choices answering prefix and substring queries.
+
+  Built once from (display name, label, value) entries; queries only touch
+  the precomputed lowercase names. Prefix matches come first, via bisect on
+  a sorted key list, then substring matches via a trigram index. Usable for
+  emojis, role names, member names, etc.
+  """
+
+  def __init__(self, entries: Iterable[tuple[str, str, T]]) -> None:
+    self.names: list[str] = []
+    self.choices: list[app_commands.Choice[T]] = []
+    for display_name, label, value in entries:
+      self.names.append(display_name.lower())
+      self.choices.append(app_commands.Choice(name=label[:100], value=value))
+
+    # Prefix keys ignore the surrounding colons of `:emoji_names:`
+    self._prefix_keys = sorted(
+      (name.strip(":"), i) for i, name in enumerate(self.names)
+    )
+
+    self._trigrams: dict[str, list[int]] = defaultdict(list)
+    for i, name in enumerate(self.names):
+      for gram in {name[j : j + 3] for j in range(len(name) - 2)}:
+        self._trigrams[gram].append(i)
+
+  def __len__(self) -> int:
+    return len(self.choices)
+
+  def search(self, current: str, limit: int = MAX_CHOICES) -> list[app_commands.Choice[T]]:
+    query = current.lower()
+    if not query:
+      return self.choices[:limit]
+
+    # Prefix matches, in original order
+    prefix = query.strip(":")
+    lo = bisect.bisect_left(self._prefix_keys, (prefix, -1))
+    hits = []
+    for key, i in self._prefix_keys[lo:]:
+      if not key.startswith(prefix):
+        break
+      hits.append(i)
+    hits.sort()
+    del hits[limit:]
+
+    # Then substring matches
+    if len(hits) < limit:
+      seen = set(hits)
+      if len(query) >= 3:
+        postings = [self._trigrams.get(query[j : j + 3], []) for j in range(len(query) - 2)]
+        candidates = min(postings, key=len)
+      else:
+        candidates = range(len(self.names))
+
+      for i in candidates:
+        if i not in seen and query in self.names[i]:
+          hits.append(i)
+          if len(hits) >= limit:
+            break
+
+    return [self.choices[i] for i in hits]
+
+
+def react_display_name(e: str) -> str:
+  # Splits '<:tank:12345>' into ['', 'tank', '12345>']
+  if ":" in e:
+    return f":{e.split(':')[1]}:"
+
+  # Is unicode; `emoji` is slow to import and only needed here
+  import emoji
+
+  return emoji.demojize(e)
+
+
+def role_index(roles: Iterable[discord.Role]) -> AutocompleteIndex[str]:
+  return AutocompleteIndex((r.name, r.name, str(r.id)) for r in roles)
+
+
+def member_index(members: Iterable[discord.Member]) -> AutocompleteIndex[str]:
+  return AutocompleteIndex((m.display_name, m.display_name, str(m.id)) for m in members)
+
+
+# Guild id -> (config version, index)
+_emoji_indexes: dict[int, tuple[int, AutocompleteIndex[str]]] = {}
+
+
+async def get_emoji_index(guild_id: int) -> AutocompleteIndex[str]:
+  """Index over the guild's GvG reacts, rebuilt when its config changes."""
+  signup_config = await get_cached_signup_config(guild_id)
+  cached = _emoji_indexes.get(guild_id)
+  if cached is None or cached[0] != signup_config.version:
+    entries = []
+    for e in signup_config.gvg_reacts:
+      display_name = react_display_name(e)
+      entries.append((display_name, f"{e} ({display_name})", e))
+
+    cached = (signup_config.version, AutocompleteIndex(entries))
+    _emoji_indexes[guild_id] = cached
+
+  return cached[1]
 
 
 async def emoji_autocomplete(
   interaction: discord.Interaction, current: str
 ) -> list[app_commands.Choice[str]]:
-  with get_session_context() as session:
-    signup_config: SignupConfig = get_signup_config(session)
-
-  # Get all custom emojis the bot can see in this server
-
-  guild = interaction.guild
-  if guild is None:
+  if interaction.guild_id is None:
     return []
 
-  emojis = signup_config.gvg_reacts
-  autocomplete_list = []
-  for e in emojis:
-    # Splits '<:tank:12345>' into ['', 'tank', '12345>']
-    if ":" in e:
-      display_name = f":{e.split(':')[1]}:"
-    else:
-      # Is unicode
-      display_name = emoji.demojize(e)
-
-    # Autocomplete feature
-    if current.lower() in display_name.lower():
-      autocomplete_list.append(
-        app_commands.Choice(name=f"{e} ({display_name})", value=e)
-      )
-
-  return autocomplete_list[:25]
+  return (await get_emoji_index(interaction.guild_id)).search(current)
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import time
+
+import discord
+from discord import app_commands
+from sqlmodel import Session
+
+from core.database import get_session_context, run_db
+from core.models import CommandSyncRecord
+
+# Sync even if the command tree looks unchanged
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC", "0") == "1"
+
+# Comma separated guild ids. When set, commands are synced to these guilds
+# only (instant, unlike global commands), for development.
+DEV_GUILD_IDS = [int(g) for g in os.getenv("DEV_GUILD_IDS", "").split(",") if g.strip()]
+
+# Record key for the global commands
+GLOBAL_SCOPE = 0
+
+
+def command_fingerprint(
+  tree: app_commands.CommandTree, application_id: int, guild: discord.abc.Snowflake | None
+) -> str:
+  """Stable hash of the payload `tree.sync(guild=guild)` would upload."""
+  payload = sorted(
+    (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+    key=lambda c: (c.get("type", 1), c["name"]),
+  )
+  encoded = json.dumps([application_id, payload], sort_keys=True, default=str)
+  return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+async def sync_commands(
+  tree: app_commands.CommandTree,
+  application_id: int,
+  force: bool = FORCE_COMMAND_SYNC,
+  dev_guild_ids: list[int] = DEV_GUILD_IDS,
+) -> None:
+  """
+  Sync the command tree globally, or to `dev_guild_ids`, skipping each
+  scope whose fingerprint matches the one stored at its last sync.
+  """
+  if dev_guild_ids:
+    scopes = [discord.Object(id=g) for g in dev_guild_ids]
+    for guild in scopes:
+      tree.copy_global_to(guild=guild)
+  else:
+    scopes = [None]
+
+  for guild in scopes:
+    scope_id = guild.id if guild is not None else GLOBAL_SCOPE
+    where = f"guild {scope_id}" if guild is not None else "global"
+    fingerprint = command_fingerprint(tree, application_id, guild)
+
+    stored = await run_db(_get_fingerprint, scope_id)
+    if stored == fingerprint and not force:
+      print(f"Commands unchanged ({where}), skipping sync.")
+      continue
+
+    start = time.perf_counter()
+    synced = await tree.sync(guild=guild)
+    await run_db(_save_fingerprint, scope_id, fingerprint)
+    print(f"Synced {len(synced)} {where} commands in {time.perf_counter() - start:.2f}s.")
+
+
+def _get_fingerprint(scope_id: int) -> str | None:
+  with get_session_context() as session:
+    return get_command_fingerprint(session, scope_id)
+
+
+def _save_fingerprint(scope_id: int, fingerprint: str) -> None:
+  with get_session_context() as session:
+    save_command_fingerprint(session, scope_id, fingerprint)
+
+
+def get_command_fingerprint(session: Session, scope_id: int) -> str | None:
+  record = session.get(CommandSyncRecord, scope_id)
+  return record.fingerprint if record is not None else None
+
+
+def save_command_fingerprint(session: Session, scope_id: int, fingerprint: str) -> None:
+  session.merge(
+    CommandSyncRecord(scope_id=scope_id, fingerprint=fingerprint, synced_at=time.time())
+  )
+  session.commit()
@@ -0,0 +1,54 @@
+import os
+from dataclasses import dataclass
+
+# 0 lets discord.py pick Discord's recommended count (single process only)
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+SHARD_PROCESSES = int(os.getenv("SHARD_PROCESSES", "1"))
+
+# Discord allows one IDENTIFY per 5s (per max_concurrency bucket)
+IDENTIFY_INTERVAL = 5.0
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+  """Discord's guild -> shard mapping."""
+  return (guild_id >> 22) % shard_count
+
+
+@dataclass(frozen=True)
+class ShardLayout:
+  """
+  How `shard_count` shards are split across `processes` worker processes.
+
+  Each worker gets a contiguous shard range and serves the web app on its
+  own port, `base_port + 1 + index`, for the front router to forward to.
+  """
+
+  shard_count: int
+  processes: int
+  base_port: int
+
+  def __post_init__(self) -> None:
+    if not 1 <= self.processes <= self.shard_count:
+      raise ValueError(
+        f"Cannot split {self.shard_count} shards across {self.processes} processes."
+      )
+
+  def shard_ids(self, index: int) -> list[int]:
+    per_process, extra = divmod(self.shard_count, self.processes)
+    start = index * per_process + min(index, extra)
+    end = start + per_process + (1 if index < extra else 0)
+    return list(range(start, end))
+
+  def process_for_guild(self, guild_id: int) -> int:
+    shard_id = shard_for_guild(guild_id, self.shard_count)
+    for index in range(self.processes):
+      if shard_id in self.shard_ids(index):
+        return index
+    raise AssertionError("unreachable")
+
+  def worker_port(self, index: int) -> int:
+    return self.base_port + 1 + index
+
+  def start_delay(self, index: int) -> float:
+    """Stagger workers so their IDENTIFYs don't collide."""
+    return IDENTIFY_INTERVAL * sum(len(self.shard_ids(i)) for i in range(index))
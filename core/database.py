@@ -1,12 +1,57 @@
-from typing import Generator
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Generator, ParamSpec, TypeVar
+from sqlalchemy import event
 from sqlmodel import create_engine, Session, SQLModel
 
-DATABASE_URL = "sqlite:///./data/prod.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+P = ParamSpec("P")
+R = TypeVar("R")
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/prod.db")
+
+# Threads doing DB work, and pooled connections to match
+DB_THREADS = int(os.getenv("DB_THREADS", "4"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+
+engine = create_engine(
+  DATABASE_URL,
+  connect_args={"check_same_thread": False, "timeout": 30},
+  pool_size=DB_THREADS,
+  max_overflow=0,
+)
+
+
+@event.listens_for(engine, "connect")
+def _tune_sqlite(dbapi_connection, _) -> None:
+  """WAL lets readers run alongside the writer; NORMAL sync is safe under WAL."""
+  cursor = dbapi_connection.cursor()
+  cursor.execute("PRAGMA journal_mode=WAL")
+  cursor.execute("PRAGMA synchronous=NORMAL")
+  cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+  cursor.execute("PRAGMA temp_store=MEMORY")
+  cursor.close()
+
+
+# Blocking SQLite calls run here so they never stall the event loop
+# (Discord gateway heartbeats and uvicorn share that loop).
+db_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="db")
 
 
 def init_db():
-  from core.models import SignupConfig  # noqa: F401
+  from core.migrations import run_migrations
+  from core.models import (  # noqa: F401
+    CommandSyncRecord,
+    PostReactionsRecord,
+    RosterRecord,
+    SignupConfig,
+    TeamAssignment,
+    TeamAssignmentRevision,
+  )
+
+  with engine.begin() as connection:
+    run_migrations(connection)
   SQLModel.metadata.create_all(engine)
 
 
@@ -18,3 +63,9 @@ def get_db_yield() -> Generator[Session, None, None]:
   """Will be useful for webapp."""
   with get_session_context() as session:
     yield session
+
+
+async def run_db(fn: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+  """Run blocking DB work on the DB thread pool."""
+  loop = asyncio.get_running_loop()
+  return await loop.run_in_executor(db_executor, partial(fn, *args, **kwargs))
@@ -0,0 +1,101 @@
+"""
+Import timings for the startup report. `import_profiler.install()` starts
+timing every module imported afterwards; `report()` prints where the time
+went, per top-level package.
+"""
+
+import importlib.abc
+import os
+import sys
+import time
+from collections import defaultdict
+
+# 0 turns the profiler off
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "1") == "1"
+
+# When the process started, near enough: main.py imports this module first
+STARTED = time.perf_counter()
+
+
+class _TimedLoader(importlib.abc.Loader):
+  def __init__(self, profiler: "ImportProfiler", loader: importlib.abc.Loader) -> None:
+    self.profiler = profiler
+    self.loader = loader
+
+  def create_module(self, spec):
+    return self.loader.create_module(spec)
+
+  def exec_module(self, module) -> None:
+    # The module should only ever see its real loader
+    module.__loader__ = self.loader
+    if module.__spec__ is not None:
+      module.__spec__.loader = self.loader
+    with self.profiler.timing(module.__name__):
+      self.loader.exec_module(module)
+
+  def __getattr__(self, name: str):
+    return getattr(self.loader, name)
+
+
+class ImportProfiler(importlib.abc.MetaPathFinder):
+  """Times module execution; nested imports are subtracted to get self time."""
+
+  def __init__(self) -> None:
+    self.self_times: dict[str, float] = {}
+    # Time spent in child imports of each module being imported
+    self._children: list[float] = []
+
+  def install(self) -> None:
+    if self not in sys.meta_path:
+      sys.meta_path.insert(0, self)
+
+  def uninstall(self) -> None:
+    if self in sys.meta_path:
+      sys.meta_path.remove(self)
+
+  def find_spec(self, fullname, path, target=None):
+    for finder in sys.meta_path:
+      if finder is self or not hasattr(finder, "find_spec"):
+        continue
+      spec = finder.find_spec(fullname, path, target)
+      if spec is not None:
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+          spec.loader = _TimedLoader(self, spec.loader)
+        return spec
+    return None
+
+  def timing(self, name: str) -> "_Timing":
+    return _Timing(self, name)
+
+  def by_package(self) -> dict[str, float]:
+    totals: dict[str, float] = defaultdict(float)
+    for name, seconds in self.self_times.items():
+      totals[name.partition(".")[0]] += seconds
+    return dict(totals)
+
+  def report(self, top: int = 8) -> None:
+    total = sum(self.self_times.values())
+    packages = sorted(self.by_package().items(), key=lambda kv: kv[1], reverse=True)
+    print(f"Imported {len(self.self_times)} modules in {total * 1e3:.0f} ms:")
+    for package, seconds in packages[:top]:
+      print(f"  {package:<20} {seconds * 1e3:7.1f} ms")
+
+
+class _Timing:
+  def __init__(self, profiler: ImportProfiler, name: str) -> None:
+    self.profiler = profiler
+    self.name = name
+
+  def __enter__(self) -> None:
+    self.profiler._children.append(0.0)
+    self.start = time.perf_counter()
+
+  def __exit__(self, *_) -> None:
+    elapsed = time.perf_counter() - self.start
+    children = self.profiler._children.pop()
+    self.profiler.self_times[self.name] = elapsed - children
+    if self.profiler._children:
+      self.profiler._children[-1] += elapsed
+
+
+import_profiler = ImportProfiler()
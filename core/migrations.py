@@ -0,0 +1,91 @@
+import json
+import os
+
+from sqlalchemy import Connection, inspect
+from sqlmodel import SQLModel
+
+# Guild to file the old singleton config under, if it can't be inferred from
+# the channels it references
+LEGACY_GUILD_ID = os.getenv("LEGACY_GUILD_ID")
+
+# Where the old singleton table waits while its guild isn't known
+SINGLETON_TABLE = "signupconfig_singleton"
+
+
+def run_migrations(connection: Connection) -> None:
+  """Bring an existing DB up to the current schema. Safe to run every start."""
+  migrate_singleton_signup_config(connection)
+
+
+def migrate_singleton_signup_config(
+  connection: Connection, legacy_guild_id: str | None = LEGACY_GUILD_ID
+) -> None:
+  """
+  Rekey `signupconfig` from the old single row (`id = 1`) to one row per guild.
+
+  The old row is filed under the guild of its management channel or selected
+  post (or `LEGACY_GUILD_ID`). If no guild is known, the old table is kept as
+  `signupconfig_singleton` so nothing is lost, and the migration finishes
+  from it on a later start once `LEGACY_GUILD_ID` is set.
+  """
+  inspector = inspect(connection)
+  if inspector.has_table("signupconfig"):
+    columns = {c["name"] for c in inspector.get_columns("signupconfig")}
+    if "id" in columns:
+      print("Migrating singleton signup config to per-guild config...")
+      connection.exec_driver_sql(f"ALTER TABLE signupconfig RENAME TO {SINGLETON_TABLE}")
+      SQLModel.metadata.tables["signupconfig"].create(connection)
+
+  if inspect(connection).has_table(SINGLETON_TABLE):
+    _migrate_singleton_table(connection, legacy_guild_id)
+
+
+def _migrate_singleton_table(connection: Connection, legacy_guild_id: str | None) -> None:
+  row = connection.exec_driver_sql(
+    "SELECT management_channel, selected_post, gvg_roles, gvg_reacts"
+    f" FROM {SINGLETON_TABLE}"
+  ).first()
+  if row is None:
+    connection.exec_driver_sql(f"DROP TABLE {SINGLETON_TABLE}")
+    return
+
+  management_channel, selected_post, gvg_roles, gvg_reacts = row
+  guild_id = _legacy_guild_id(management_channel, selected_post, legacy_guild_id)
+  if guild_id is None:
+    print(
+      "Could not tell which guild the old signup config belongs to; kept it in "
+      f"`{SINGLETON_TABLE}`. Set LEGACY_GUILD_ID and restart to migrate it."
+    )
+    return
+
+  existing = connection.exec_driver_sql(
+    "SELECT 1 FROM signupconfig WHERE guild_id = ?", (guild_id,)
+  ).first()
+  if existing is not None:
+    # Configured again since the upgrade; that config is the newer one
+    print(f"Guild {guild_id} already has a signup config; dropped the old singleton one.")
+  else:
+    connection.exec_driver_sql(
+      "INSERT INTO signupconfig"
+      " (guild_id, management_channel, selected_post, gvg_roles, gvg_reacts)"
+      " VALUES (?, ?, ?, ?, ?)",
+      (guild_id, management_channel, selected_post, gvg_roles, gvg_reacts),
+    )
+    print(f"Migrated signup config to guild {guild_id}")
+  connection.exec_driver_sql(f"DROP TABLE {SINGLETON_TABLE}")
+
+
+def _legacy_guild_id(
+  management_channel: str | None, selected_post: str | None, legacy_guild_id: str | None
+) -> int | None:
+  if management_channel:
+    guild_id = json.loads(management_channel).get("guild_id")
+    if guild_id:
+      return int(guild_id)
+
+  if selected_post:
+    guild_id = json.loads(selected_post).get("channel_config", {}).get("guild_id")
+    if guild_id:
+      return int(guild_id)
+
+  return int(legacy_guild_id) if legacy_guild_id else None
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlmodel import Column, SQLModel, Field, JSON, CheckConstraint
+from sqlmodel import Column, SQLModel, Field, JSON
 
 from core.database_utils import PydanticJSON
 
@@ -18,10 +18,8 @@ class MessageConfig(SQLModel):
 
 
 class SignupConfig(SQLModel, table=True):
-  # Singleton, only one global config
-  id: int = Field(
-    default=1, primary_key=True, sa_column_args=[CheckConstraint("id = 1")]
-  )
+  # One config per guild
+  guild_id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
 
   management_channel: ChannelConfig | None = Field(
     default=None, sa_column=Column(PydanticJSON(ChannelConfig))
@@ -36,3 +34,65 @@ class SignupConfig(SQLModel, table=True):
     default_factory=list, sa_column=Column(JSON, nullable=False)
   )
 
+
+class PostReactionsRecord(SQLModel, table=True):
+  """Last known reactions on a signup post, kept for warm restarts."""
+
+  guild_id: int = Field(primary_key=True)
+  message_id: int = Field(primary_key=True)
+
+  # Emoji -> reactor user ids
+  reactors: dict[str, list[int]] = Field(
+    default_factory=dict, sa_column=Column(JSON, nullable=False)
+  )
+  # User id -> role ids (JSON object keys are strings)
+  member_roles: dict[str, list[int]] = Field(
+    default_factory=dict, sa_column=Column(JSON, nullable=False)
+  )
+  # Unix time of the scan the data is based on
+  fetched_at: float
+
+
+class RosterRecord(SQLModel, table=True):
+  """A guild's roster as published by the bot for the web workers."""
+
+  guild_id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+  message_id: int
+  guild_name: str
+
+  # [{"id", "name", "color"}] of the GvG roles, in config order
+  roles: list[dict] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
+  reacts: list[str] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
+  # [id, display_name, avatar_url, role_mask, react_mask] per member, in roster order
+  members: list[list] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
+
+  # Unix time of publication; changes every time the roster does
+  published_at: float
+
+
+class TeamAssignment(SQLModel, table=True):
+  """A member's group for one GvG role in the team builder."""
+
+  guild_id: int = Field(primary_key=True)
+  member_id: int = Field(primary_key=True)
+  role_id: int = Field(primary_key=True)
+
+  # 1..MAX_NUM_GROUPS; unassigned cells have no row
+  group: int
+
+
+class TeamAssignmentRevision(SQLModel, table=True):
+  """Bumped with every write to a guild's assignments, for cheap revalidation."""
+
+  guild_id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+  revision: int = 0
+
+
+class CommandSyncRecord(SQLModel, table=True):
+  """Fingerprint of the command tree at its last sync, to skip unchanged ones."""
+
+  # Guild id for guild-scoped syncs, 0 for the global commands
+  scope_id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+  fingerprint: str
+  # Unix time of the sync
+  synced_at: float
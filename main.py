@@ -1,42 +1,173 @@
+# First, so it times every import below. Not in worker processes, which
+# import this module too.
+from core.import_profiler import STARTUP_PROFILE, import_profiler
+
+if STARTUP_PROFILE and __name__ == "__main__":
+  import_profiler.install()
+
 import os
 import asyncio
-import uvicorn
+import multiprocessing
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
 
-from bot.client import bot
-from web.app import app
-from core.database import init_db
+from bot.client import Bot
+from bot.sharding import SHARD_COUNT, SHARD_PROCESSES, ShardLayout
+from core.database import engine, init_db
+from services.config import config_cache
+
+# The web stack (FastAPI, uvicorn, Jinja) is only imported by processes
+# that serve it
+if TYPE_CHECKING:
+  from fastapi import FastAPI
 
 # Configure env
 load_dotenv()
 
 TOKEN = os.getenv("DISCORD_TOKEN")
+WEB_HOST = "127.0.0.1"
+WEB_PORT = int(os.getenv("WEB_PORT", "8000"))
+
+# 0 serves the web app from the bot process, reading live bot state. N > 0
+# runs it as N uvicorn worker processes reading rosters the bot publishes.
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "0"))
 
 
-async def run_bot():
+async def run_bot(bot: Bot, start_delay: float = 0.0):
   if TOKEN is None:
     raise ValueError("Discord token not found in environment variable `DISCORD_TOKEN`.")
 
-  await bot.start(TOKEN)
+  await asyncio.sleep(start_delay)
+  # Closes the bot (saving snapshots) on shutdown, Ctrl+C included
+  async with bot:
+    await bot.start(TOKEN)
 
 
-async def run_web():
-  config = uvicorn.Config(app, host="127.0.0.1", port=8000, loop="asyncio")
+async def run_web(app: "FastAPI", port: int):
+  import uvicorn
+
+  config = uvicorn.Config(app, host=WEB_HOST, port=port, loop="asyncio")
   server = uvicorn.Server(config)
   await server.serve()
 
 
-async def main():
+async def run_worker(
+  shard_ids: list[int] | None,
+  shard_count: int | None,
+  web_port: int | None,
+  start_delay: float = 0.0,
+):
+  """
+  A bot running `shard_ids` (all if None), plus the web app on the same
+  loop unless `web_port` is None (the web app runs in its own workers).
+  """
+  bot = Bot(shard_ids=shard_ids, shard_count=shard_count, publish_rosters=web_port is None)
+  await config_cache.load_all()
+
+  if web_port is None:
+    await run_bot(bot, start_delay)
+    return
+
+  from web.app import app
+
+  app.state.rosters = bot.rosters
+  # One owner for the click buffers, so /team_balance can flush them
+  app.state.assignments = bot.assignments
+  await asyncio.gather(run_bot(bot, start_delay), run_web(app, web_port))
+
+
+def worker_main(
+  shard_ids: list[int] | None,
+  shard_count: int | None,
+  web_port: int | None,
+  start_delay: float = 0.0,
+) -> None:
+  # Never reuse DB connections inherited from the parent process
+  engine.dispose(close=False)
+  try:
+    asyncio.run(run_worker(shard_ids, shard_count, web_port, start_delay))
+  except KeyboardInterrupt:
+    pass
+
+
+def start_bot_processes(serve_web: bool) -> list[multiprocessing.Process]:
+  """
+  One bot process, or with `SHARD_PROCESSES` > 1 one per shard range, each
+  with its own gateway connections, caches and event loop. With
+  `serve_web`, each also serves the web app on its worker port.
+  """
+  if SHARD_PROCESSES <= 1:
+    layout = None
+    args = [(None, SHARD_COUNT or None, None)]
+  else:
+    if not SHARD_COUNT:
+      raise ValueError("`SHARD_COUNT` must be set when `SHARD_PROCESSES` > 1.")
+
+    layout = ShardLayout(SHARD_COUNT, SHARD_PROCESSES, WEB_PORT)
+    args = [
+      (
+        layout.shard_ids(i),
+        layout.shard_count,
+        layout.worker_port(i) if serve_web else None,
+        layout.start_delay(i),
+      )
+      for i in range(layout.processes)
+    ]
+
+  workers = []
+  for worker_args in args:
+    shards = worker_args[0] or "all"
+    worker = multiprocessing.Process(
+      target=worker_main, args=worker_args, name=f"shards-{shards}"
+    )
+    worker.start()
+    print(f"Started bot worker {worker.name} (pid {worker.pid})")
+    workers.append(worker)
+
+  return workers
+
+
+def main() -> None:
+  if STARTUP_PROFILE:
+    import_profiler.report()
+    import_profiler.uninstall()
+
   print("Initializing Database...")
   init_db()
 
-  app.state.bot = bot
+  if WEB_WORKERS > 0:
+    # Web traffic can't delay gateway heartbeats, and scales across cores
+    import uvicorn
+
+    workers = start_bot_processes(serve_web=False)
+    try:
+      uvicorn.run("web.app:app", host=WEB_HOST, port=WEB_PORT, workers=WEB_WORKERS)
+    finally:
+      stop(workers)
+
+  elif SHARD_PROCESSES > 1:
+    # Each shard range serves its own guilds' pages; route requests to them
+    from web.router import make_router
+
+    workers = start_bot_processes(serve_web=True)
+    layout = ShardLayout(SHARD_COUNT, SHARD_PROCESSES, WEB_PORT)
+    try:
+      asyncio.run(run_web(make_router(layout), WEB_PORT))
+    finally:
+      stop(workers)
+
+  else:
+    asyncio.run(run_worker(None, SHARD_COUNT or None, WEB_PORT))
+
 
-  await asyncio.gather(run_bot(), run_web())
+def stop(workers: list[multiprocessing.Process]) -> None:
+  for worker in workers:
+    worker.terminate()
+    worker.join()
 
 
 if __name__ == "__main__":
   try:
-    asyncio.run(main())
+    main()
   except KeyboardInterrupt:
     pass
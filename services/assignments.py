@@ -0,0 +1,165 @@
+import asyncio
+import os
+import time
+
+from sqlmodel import Session, select
+
+from core.database import get_session_context, run_db
+from core.models import TeamAssignment, TeamAssignmentRevision
+
+# TODO: Make this configurable in the UI
+MAX_NUM_GROUPS = 3
+
+# A burst of team builder clicks is written once it has been quiet this
+# long, or at the latest this long after its first click
+ASSIGNMENT_FLUSH_DELAY = float(os.getenv("ASSIGNMENT_FLUSH_DELAY", "0.5"))
+ASSIGNMENT_MAX_DELAY = float(os.getenv("ASSIGNMENT_MAX_DELAY", "2"))
+
+# (member id, role id) -> group, 0 for unassigned
+Cells = dict[tuple[int, int], int]
+
+
+class TeamAssignments:
+  """
+  Team builder assignments, written through a per-session coalescing
+  buffer: each session's changed cells are merged (last click wins) and
+  saved in one transaction once the session stops clicking.
+
+  Reads see every flushed write; a session sees its own buffered ones
+  by calling `flush` first, and `flush_guild` writes every session's.
+  Buffers are per process, so only one owner may buffer a guild's clicks:
+  with `buffered=False` each update is written before it returns.
+  """
+
+  def __init__(
+    self,
+    flush_delay: float = ASSIGNMENT_FLUSH_DELAY,
+    max_delay: float = ASSIGNMENT_MAX_DELAY,
+    buffered: bool = True,
+  ) -> None:
+    self.flush_delay = flush_delay
+    self.max_delay = max_delay
+    self.buffered = buffered
+
+    # (guild id, session) -> cells not yet written, and when the first arrived
+    self._pending: dict[tuple[int, str], Cells] = {}
+    self._pending_since: dict[tuple[int, str], float] = {}
+    self._timers: dict[tuple[int, str], asyncio.Task] = {}
+    # Guild id -> keeps its batches in order. Per guild, not per session, so
+    # there's one per guild however many browsers come and go; SQLite
+    # writes one at a time anyway.
+    self._locks: dict[int, asyncio.Lock] = {}
+    # Guild id -> (revision, cells) last read
+    self._loaded: dict[int, tuple[int, Cells]] = {}
+
+    self.updates = 0
+    self.cells = 0
+    self.flushes = 0
+
+  async def update(self, guild_id: int, session_id: str, cells: Cells) -> None:
+    """Buffer changed cells, (re)starting the session's flush timer."""
+    if not self.buffered:
+      await self.save(guild_id, session_id, cells)
+      return
+
+    key = (guild_id, session_id)
+    self._pending.setdefault(key, {}).update(cells)
+    first = self._pending_since.setdefault(key, time.monotonic())
+    self.updates += 1
+    self.cells += len(cells)
+
+    timer = self._timers.pop(key, None)
+    if timer is not None:
+      timer.cancel()
+    delay = min(self.flush_delay, first + self.max_delay - time.monotonic())
+    self._timers[key] = asyncio.create_task(self._flush_later(key, max(delay, 0.0)))
+
+  async def _flush_later(self, key: tuple[int, str], delay: float) -> None:
+    await asyncio.sleep(delay)
+    # Past the sleep, a newer click must not cancel the write itself
+    self._timers.pop(key, None)
+    try:
+      await self.flush(*key)
+    except Exception as e:
+      print(f"Failed to save team assignments for guild {key[0]}: {e}")
+
+  async def flush(self, guild_id: int, session_id: str) -> None:
+    """Write the session's buffered cells now, if any."""
+    key = (guild_id, session_id)
+    timer = self._timers.pop(key, None)
+    if timer is not None:
+      timer.cancel()
+
+    async with self._locks.setdefault(guild_id, asyncio.Lock()):
+      cells = self._pending.pop(key, None)
+      self._pending_since.pop(key, None)
+      if not cells:
+        return
+
+      def _save() -> None:
+        with get_session_context() as session:
+          save_assignments(session, guild_id, cells)
+
+      await run_db(_save)
+      self.flushes += 1
+
+  async def save(self, guild_id: int, session_id: str, cells: Cells) -> None:
+    """Write cells now, along with anything the session had buffered."""
+    self._pending.setdefault((guild_id, session_id), {}).update(cells)
+    self.updates += 1
+    self.cells += len(cells)
+    await self.flush(guild_id, session_id)
+
+  async def flush_guild(self, guild_id: int) -> None:
+    """Write every session's buffered cells for the guild."""
+    await asyncio.gather(*(self.flush(*key) for key in list(self._pending) if key[0] == guild_id))
+
+  async def flush_all(self) -> None:
+    await asyncio.gather(*(self.flush(*key) for key in list(self._pending)))
+
+  async def get(self, guild_id: int) -> tuple[int, Cells]:
+    """The guild's saved assignments and their revision."""
+    cached = self._loaded.get(guild_id)
+
+    def _load() -> tuple[int, Cells]:
+      with get_session_context() as session:
+        revision = get_assignment_revision(session, guild_id)
+        if cached is not None and cached[0] == revision:
+          return cached
+        return revision, load_assignments(session, guild_id)
+
+    loaded = self._loaded[guild_id] = await run_db(_load)
+    return loaded
+
+  def summary(self) -> str:
+    return (
+      f"{self.updates} updates of {self.cells} cells in {self.flushes} writes, "
+      f"{len(self._pending)} sessions pending"
+    )
+
+
+def get_assignment_revision(session: Session, guild_id: int) -> int:
+  revision = session.get(TeamAssignmentRevision, guild_id)
+  return revision.revision if revision is not None else 0
+
+
+def load_assignments(session: Session, guild_id: int) -> Cells:
+  rows = session.exec(select(TeamAssignment).where(TeamAssignment.guild_id == guild_id))
+  return {(row.member_id, row.role_id): row.group for row in rows}
+
+
+def save_assignments(session: Session, guild_id: int, cells: Cells) -> None:
+  for (member_id, role_id), group in cells.items():
+    if group:
+      session.merge(
+        TeamAssignment(guild_id=guild_id, member_id=member_id, role_id=role_id, group=group)
+      )
+    elif row := session.get(TeamAssignment, (guild_id, member_id, role_id)):
+      session.delete(row)
+
+  revision = session.get(TeamAssignmentRevision, guild_id)
+  if revision is None:
+    revision = TeamAssignmentRevision(guild_id=guild_id)
+  revision.revision += 1
+  session.add(revision)
+  session.commit()
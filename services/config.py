@@ -1,27 +1,166 @@
-from sqlmodel import Session
+import itertools
+import threading
+from dataclasses import dataclass
 
-from core.models import SignupConfig
+from sqlmodel import Session, select
 
+from core.database import get_session_context, run_db
+from core.models import ChannelConfig, MessageConfig, SignupConfig
 
-def get_signup_config(session: Session) -> SignupConfig:
-  config = session.get(SignupConfig, ident=1)
+# Versions are unique across guilds, so anything keyed on a config version
+# never confuses one guild's config with another's
+_versions = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class SignupConfigSnapshot:
+  """Read-only copy of a guild's `SignupConfig` handed out by the config cache."""
+
+  guild_id: int
+  version: int
+  management_channel: ChannelConfig | None
+  selected_post: MessageConfig | None
+  gvg_roles: tuple[int, ...]
+  gvg_reacts: tuple[str, ...]
+
+
+class SignupConfigCache:
+  """
+  Process-wide cache of every guild's signup config.
+
+  Loaded from the DB once per guild (all at startup via `load_all`), then
+  refreshed write-through by `update_signup_config`, so readers never need
+  a session.
+  """
+
+  def __init__(self) -> None:
+    self.snapshots: dict[int, SignupConfigSnapshot] = {}
+    self.hits = 0
+    self.misses = 0
+
+    # Stores happen on DB threads
+    self._lock = threading.Lock()
+    # Guild id -> held across a write's commit and store, so snapshots are
+    # stored in commit order
+    self._write_locks: dict[int, threading.Lock] = {}
+
+  def write_lock(self, guild_id: int) -> threading.Lock:
+    with self._lock:
+      return self._write_locks.setdefault(guild_id, threading.Lock())
+
+  def store(self, config: SignupConfig, only_if_empty: bool = False) -> SignupConfigSnapshot:
+    with self._lock:
+      current = self.snapshots.get(config.guild_id)
+      if only_if_empty and current is not None:
+        return current
+
+      snapshot = SignupConfigSnapshot(
+        guild_id=config.guild_id,
+        version=next(_versions),
+        management_channel=(
+          config.management_channel.model_copy() if config.management_channel else None
+        ),
+        selected_post=(
+          config.selected_post.model_copy(deep=True) if config.selected_post else None
+        ),
+        gvg_roles=tuple(config.gvg_roles),
+        gvg_reacts=tuple(config.gvg_reacts),
+      )
+      self.snapshots[config.guild_id] = snapshot
+      return snapshot
+
+  async def get(self, guild_id: int) -> SignupConfigSnapshot:
+    snapshot = self.snapshots.get(guild_id)
+    if snapshot is not None:
+      self.hits += 1
+      return snapshot
+
+    self.misses += 1
+    return await run_db(self._load, guild_id)
+
+  def _load(self, guild_id: int) -> SignupConfigSnapshot:
+    with get_session_context() as session:
+      # Reads never insert: a guild's row is created by its first save
+      config = find_signup_config(session, guild_id) or SignupConfig(guild_id=guild_id)
+      # A concurrent write may have landed first; never overwrite it
+      return self.store(config, only_if_empty=True)
+
+  async def load_all(self) -> None:
+    def _load_all() -> None:
+      with get_session_context() as session:
+        for config in list_signup_configs(session):
+          self.store(config, only_if_empty=True)
+
+    await run_db(_load_all)
+
+  def with_selected_post(self) -> list[SignupConfigSnapshot]:
+    """Configs of guilds that have a signup post selected."""
+    return [s for s in self.snapshots.values() if s.selected_post is not None]
+
+  def summary(self) -> str:
+    return f"{len(self.snapshots)} guilds, {self.hits} hits, {self.misses} misses"
+
+
+config_cache = SignupConfigCache()
+
+
+async def get_cached_signup_config(guild_id: int) -> SignupConfigSnapshot:
+  return await config_cache.get(guild_id)
+
+
+def find_signup_config(session: Session, guild_id: int) -> SignupConfig | None:
+  return session.get(SignupConfig, ident=guild_id)
+
+
+def get_signup_config(session: Session, guild_id: int) -> SignupConfig:
+  """The guild's config, inserting an empty one if it has none yet."""
+  config = find_signup_config(session, guild_id)
   if not config:
-    config = SignupConfig(id=1)
+    config = SignupConfig(guild_id=guild_id)
     session.add(config)
     session.commit()
     session.refresh(config)
 
   return config
 
-def update_signup_config(session: Session, updated_config: SignupConfig) -> SignupConfig:
-  db_config = get_signup_config(session)
 
-  # Ensure singleton never violated
-  update_data = updated_config.model_dump(exclude_unset=True, exclude={"id"})
+def list_signup_configs(session: Session) -> list[SignupConfig]:
+  return list(session.exec(select(SignupConfig)).all())
+
+
+def update_signup_config(
+  session: Session, guild_id: int, updated_config: SignupConfig
+) -> SignupConfigSnapshot:
+  # One write per guild at a time, or a slower save could store its
+  # snapshot over a newer commit's
+  with config_cache.write_lock(guild_id):
+    db_config = get_signup_config(session, guild_id)
+
+    # Never move a config to another guild
+    update_data = updated_config.model_dump(exclude_unset=True, exclude={"guild_id"})
+
+    db_config.sqlmodel_update(update_data)
+
+    session.add(db_config)
+    session.commit()
+    session.refresh(db_config)
+
+    # Write-through so cached readers see the change immediately
+    return config_cache.store(db_config)
+
+
+async def save_signup_config(
+  guild_id: int, updated_config: SignupConfig
+) -> SignupConfigSnapshot:
+  """
+  Apply the fields set on `updated_config` to `guild_id`'s config on a DB
+  thread.
+
+  Returns the refreshed cached snapshot.
+  """
 
-  db_config.sqlmodel_update(update_data)
+  def _save() -> SignupConfigSnapshot:
+    with get_session_context() as session:
+      return update_signup_config(session, guild_id, updated_config)
 
-  session.add(db_config)
-  session.commit()
-  session.refresh(db_config)
-  return db_config
+  return await run_db(_save)
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+
+import discord
+
+from services.reaction_scan import SCAN_CONCURRENCY
+
+MEMBER_CACHE_TTL = float(os.getenv("MEMBER_CACHE_TTL", "900"))
+MEMBER_CACHE_SIZE = int(os.getenv("MEMBER_CACHE_SIZE", "10000"))
+
+# Gateway member requests accept at most 100 user ids each
+QUERY_CHUNK_SIZE = 100
+
+
+class MemberCache:
+  """
+  TTL + LRU cache of resolved members, one LRU per guild.
+
+  Each guild gets its own `maxsize` budget so one large guild can't evict
+  another's members. Misses are resolved in bulk: the gateway member cache
+  first, then gateway member chunk requests by id (100 per request), and
+  only if those are unavailable one REST fetch per member.
+
+  Without `guild_cache`, members chunked by id are kept only here, not in
+  discord.py's guild member cache, so memory stays within this budget.
+  They then get no member update events and are refreshed after `ttl`.
+  """
+
+  def __init__(
+    self,
+    ttl: float = MEMBER_CACHE_TTL,
+    maxsize: int = MEMBER_CACHE_SIZE,
+    guild_cache: bool = True,
+  ) -> None:
+    self.ttl = ttl
+    self.maxsize = maxsize
+    self.guild_cache = guild_cache
+    # Guild id -> user id -> (expiry, member)
+    self._guilds: dict[int, OrderedDict[int, tuple[float, discord.Member]]] = {}
+
+    self.hits = 0
+    self.misses = 0
+    self.chunk_requests = 0
+    self.rest_fetches = 0
+
+  def __len__(self) -> int:
+    return sum(len(entries) for entries in self._guilds.values())
+
+  def get(self, guild_id: int, user_id: int) -> discord.Member | None:
+    entries = self._guilds.get(guild_id)
+    entry = entries.get(user_id) if entries is not None else None
+    if entries is None or entry is None:
+      return None
+
+    expires, member = entry
+    if expires < time.monotonic():
+      del entries[user_id]
+      return None
+
+    entries.move_to_end(user_id)
+    return member
+
+  def put(self, member: discord.Member) -> None:
+    entries = self._guilds.setdefault(member.guild.id, OrderedDict())
+    entries[member.id] = (time.monotonic() + self.ttl, member)
+    entries.move_to_end(member.id)
+
+    while len(entries) > self.maxsize:
+      entries.popitem(last=False)
+
+  def invalidate(self, guild_id: int, user_id: int) -> None:
+    entries = self._guilds.get(guild_id)
+    if entries is not None:
+      entries.pop(user_id, None)
+
+  def clear(self, guild_id: int | None = None) -> None:
+    if guild_id is None:
+      self._guilds.clear()
+    else:
+      self._guilds.pop(guild_id, None)
+
+  async def resolve(
+    self, guild: discord.Guild, user_ids: Iterable[int]
+  ) -> dict[int, discord.Member]:
+    """User ids -> members. Ids that are no longer in the guild are dropped."""
+    members = {}
+    missing = []
+    for user_id in set(user_ids):
+      m = self.get(guild.id, user_id)
+      if m is None and (m := guild.get_member(user_id)):
+        # Tracked here too, so it's evicted and expired like the rest
+        self.put(m)
+      if m:
+        members[user_id] = m
+        self.hits += 1
+      else:
+        missing.append(user_id)
+    self.misses += len(missing)
+
+    if missing:
+      try:
+        resolved = await self._query_members(guild, missing)
+      except (discord.ClientException, asyncio.TimeoutError):
+        # No members intent or the gateway is unavailable, use REST instead
+        resolved = await self._fetch_members(guild, missing)
+
+      for m in resolved:
+        self.put(m)
+        members[m.id] = m
+
+    return members
+
+  async def _query_members(
+    self, guild: discord.Guild, user_ids: list[int]
+  ) -> list[discord.Member]:
+    resolved = []
+    for i in range(0, len(user_ids), QUERY_CHUNK_SIZE):
+      chunk = user_ids[i : i + QUERY_CHUNK_SIZE]
+      self.chunk_requests += 1
+      resolved.extend(
+        await guild.query_members(user_ids=chunk, limit=len(chunk), cache=self.guild_cache)
+      )
+
+    return resolved
+
+  async def _fetch_members(
+    self, guild: discord.Guild, user_ids: list[int]
+  ) -> list[discord.Member]:
+    semaphore = asyncio.Semaphore(SCAN_CONCURRENCY)
+    resolved = []
+
+    async def fetch_one(user_id: int) -> None:
+      async with semaphore:
+        self.rest_fetches += 1
+        try:
+          resolved.append(await guild.fetch_member(user_id))
+        except discord.NotFound:
+          # Left the guild since reacting
+          pass
+
+    await asyncio.gather(*(fetch_one(u) for u in user_ids))
+    return resolved
+
+  def summary(self) -> str:
+    mode = "" if self.guild_cache else ", lean"
+    return (
+      f"{len(self)} cached over {len(self._guilds)} guilds "
+      f"({self.maxsize} per guild{mode}), {self.hits} hits, {self.misses} misses, "
+      f"{self.chunk_requests} chunk requests, {self.rest_fetches} REST fetches"
+    )
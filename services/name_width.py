@@ -0,0 +1,46 @@
+import os
+from functools import lru_cache
+
+# Distinct (name, width) pairs whose padded/truncated form is kept around.
+# Lives outside the cogs so every importer shares the one cache.
+NAME_WIDTH_CACHE_SIZE = int(os.getenv("NAME_WIDTH_CACHE_SIZE", "8192"))
+
+
+@lru_cache(maxsize=NAME_WIDTH_CACHE_SIZE)
+def pad_wide_name(name: str, width: int) -> str:
+  from wcwidth import wcswidth
+
+  visual_len = wcswidth(name)
+  if visual_len < 0:
+    visual_len = len(name)
+
+  padding_needed = width - visual_len
+  return name + " " * max(0, padding_needed)
+
+
+@lru_cache(maxsize=NAME_WIDTH_CACHE_SIZE)
+def format_name_for_table(name: str, max_width: int) -> str:
+  from wcwidth import wcwidth
+
+  current_width = 0
+  truncated_name = ""
+
+  # Truncate based on visual width
+  for char in name:
+    width = wcwidth(char)
+    # Handle non-printable or zero-width characters
+    char_width = max(0, width)
+
+    if (
+      current_width + char_width > max_width - 1
+    ):  # Leave 1 space for an ellipsis if you like
+      truncated_name += "…"
+      current_width += 1
+      break
+
+    truncated_name += char
+    current_width += char_width
+
+  # Pad the remaining space with standard spaces
+  padding = " " * (max_width - current_width)
+  return truncated_name + padding
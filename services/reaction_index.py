@@ -0,0 +1,390 @@
+import asyncio
+import itertools
+import os
+import time
+from collections import defaultdict
+from collections.abc import Callable, Collection
+from dataclasses import dataclass
+
+import discord
+
+from services.member_cache import MemberCache
+from services.reaction_scan import ScanStats, scan_reactions
+
+# Seconds before a post's reactions are revalidated with a full scan in the
+# background. Also the period of the bot's pre-warm loop.
+SNAPSHOT_REFRESH_INTERVAL = float(os.getenv("SNAPSHOT_REFRESH_INTERVAL", "300"))
+
+# Share of the interval a post scanned on one pre-warm tick may fall short
+# of by the next (ticks start a full interval apart, scans end later) and
+# still be rescanned, so revalidation doesn't slip to every other tick
+REFRESH_SLACK = 0.1
+
+# Versions are unique across posts, so (message_id, version) never repeats
+# even when a post is dropped and tracked again
+_versions = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class ReactSnapshot:
+  """Emoji -> members for one post at one version. Treat as read-only."""
+
+  guild_id: int
+  message_id: int
+  version: int
+  react_data: dict[str, set[discord.Member]]
+
+  @property
+  def members(self) -> set[discord.Member]:
+    return set().union(*self.react_data.values())
+
+
+class PostReactions:
+  """Emoji -> reactor ids for one post, plus its scan bookkeeping."""
+
+  def __init__(self, guild_id: int, message_id: int, tracked: frozenset[str]) -> None:
+    self.guild_id = guild_id
+    self.message_id = message_id
+    self.tracked = tracked
+
+    self.live = False
+    self.version = 0
+    self.fetched_at: float | None = None  # time.monotonic() of the last full scan
+    self.scanned_at: float | None = None  # time.time() of the same, for persistence
+    self.last_scan: ScanStats | None = None
+
+    self._reactors: dict[str, set[int]] = defaultdict(set)
+    self._lock = asyncio.Lock()
+    self._refresh_task: asyncio.Task | None = None
+
+    # Events seen while a scan is in flight, replayed once it lands
+    self._seeding = False
+    self._pending: list[tuple[str, str | None, int | None]] = []
+
+    # Materialized member view, rebuilt only when `version` moves
+    self._snapshot: ReactSnapshot | None = None
+    # User id -> role ids as last saved, until live members replace them
+    self._saved_roles: dict[int, list[int]] = {}
+
+  @property
+  def seeded(self) -> bool:
+    return self.fetched_at is not None
+
+  @property
+  def age(self) -> float | None:
+    return None if self.fetched_at is None else time.monotonic() - self.fetched_at
+
+  def is_stale(self, max_age: float) -> bool:
+    age = self.age
+    return not self.live or age is None or age > max_age
+
+  def tracks(self, emoji_str: str) -> bool:
+    # An empty tracked set means every react on the post counts
+    return not self.tracked or emoji_str in self.tracked
+
+  def reactor_ids(self) -> dict[str, set[int]]:
+    return {e: set(ids) for e, ids in self._reactors.items() if ids}
+
+  def has_reactor(self, user_id: int) -> bool:
+    return any(user_id in ids for ids in self._reactors.values())
+
+  @property
+  def cached_snapshot(self) -> ReactSnapshot | None:
+    """Last materialized snapshot, possibly behind `version`."""
+    return self._snapshot
+
+  def invalidate_members(self) -> None:
+    """Member details changed: rebuild the snapshot under a new version."""
+    self.version = next(_versions)
+
+  def apply(self, op: str, emoji_str: str | None, user_id: int | None) -> None:
+    if self._seeding:
+      self._pending.append((op, emoji_str, user_id))
+      return
+
+    if op == "add":
+      assert emoji_str is not None and user_id is not None
+      self._reactors[emoji_str].add(user_id)
+    elif op == "remove":
+      assert emoji_str is not None and user_id is not None
+      self._reactors[emoji_str].discard(user_id)
+    elif op == "clear":
+      self._reactors.clear()
+    elif op == "clear_emoji":
+      assert emoji_str is not None
+      self._reactors.pop(emoji_str, None)
+
+    self.version = next(_versions)
+
+  def member_roles(self) -> dict[int, list[int]]:
+    """User id -> role ids of the reactors, as last resolved or saved."""
+    if self._snapshot is None:
+      return dict(self._saved_roles)
+    return {
+      m.id: [r.id for r in m.roles if not r.is_default()] for m in self._snapshot.members
+    }
+
+  def restore(
+    self,
+    reactors: dict[str, set[int]],
+    scanned_at: float,
+    member_roles: dict[int, list[int]] | None = None,
+  ) -> None:
+    """Load previously saved state. Stays not live until rescanned."""
+    self._reactors = defaultdict(set, reactors)
+    self._saved_roles = member_roles or {}
+    self.version = next(_versions)
+    self.scanned_at = scanned_at
+    self.fetched_at = time.monotonic() - max(0.0, time.time() - scanned_at)
+    self.live = False
+
+  async def seed(self, message: discord.Message) -> dict[str, tuple[set[int], set[int]]]:
+    """
+    Full scan, replacing the current state. Caller holds `_lock`.
+
+    Returns emoji -> (added, removed) user ids relative to the state the
+    scan replaced, for every emoji that changed.
+    """
+    before = self.reactor_ids()
+    self._seeding = True
+    self._pending = []
+    try:
+      reactors, self.last_scan = await scan_reactions(message, self.tracked)
+    except BaseException:
+      # Failed or cancelled: keep the events seen meanwhile, and rescan on
+      # the next read or pre-warm tick
+      self._replay_pending()
+      self.live = False
+      raise
+    print(f"Scanned post {message.id}: {self.last_scan}")
+
+    self._reactors = defaultdict(set, reactors)
+    self.version = next(_versions)
+    self._replay_pending()
+
+    self.fetched_at = time.monotonic()
+    self.scanned_at = time.time()
+    self.live = True
+
+    diff = {}
+    for emoji_str in set(before) | set(self._reactors):
+      have = before.get(emoji_str, set())
+      want = self._reactors.get(emoji_str, set())
+      if have != want:
+        diff[emoji_str] = (want - have, have - want)
+
+    if before and diff:
+      added = sum(len(a) for a, _ in diff.values())
+      removed = sum(len(r) for _, r in diff.values())
+      print(f"Reconciled post {message.id}: {added} reacts added, {removed} removed")
+
+    return diff
+
+  def _replay_pending(self) -> None:
+    self._seeding = False
+    pending, self._pending = self._pending, []
+    for op, emoji_str, user_id in pending:
+      self.apply(op, emoji_str, user_id)
+
+  async def snapshot(
+    self, guild: discord.Guild, member_cache: MemberCache
+  ) -> ReactSnapshot:
+    if self._snapshot is None or self._snapshot.version != self.version:
+      version = self.version
+      members = await member_cache.resolve(guild, set().union(*self._reactors.values()))
+
+      data = {}
+      for emoji_str, user_ids in self._reactors.items():
+        data[emoji_str] = {members[u] for u in user_ids if u in members}
+
+      self._snapshot = ReactSnapshot(self.guild_id, self.message_id, version, data)
+      self._reconcile_roles()
+
+    return self._snapshot
+
+  def _reconcile_roles(self) -> None:
+    """Report reactors whose roles changed since they were saved."""
+    saved, self._saved_roles = self._saved_roles, {}
+    if not saved or self._snapshot is None:
+      return
+
+    live = self.member_roles()
+    changed = sum(
+      1 for user_id, roles in live.items() if user_id in saved and set(saved[user_id]) != set(roles)
+    )
+    if changed:
+      print(f"Reconciled post {self.message_id}: {changed} reactors' roles changed while down")
+
+
+class ReactionIndex:
+  """
+  Reaction state per (guild_id, message_id), kept current from gateway events.
+
+  Posts are seeded once with a full scan, then updated from raw reaction
+  events. Any gap in the event stream (disconnect, resume) marks posts as
+  not live. Reads are stale-while-revalidate: once a post has been scanned,
+  readers get the current state immediately and stale posts are rescanned
+  in the background. Only a never-scanned post makes a reader wait.
+  """
+
+  def __init__(
+    self, member_cache: MemberCache, refresh_interval: float = SNAPSHOT_REFRESH_INTERVAL
+  ) -> None:
+    self.member_cache = member_cache
+    self.refresh_interval = refresh_interval
+    self._posts: dict[tuple[int, int], PostReactions] = {}
+    self._by_message: dict[int, PostReactions] = {}
+
+  @property
+  def posts(self) -> list[PostReactions]:
+    return list(self._posts.values())
+
+  def _post(self, guild_id: int, message_id: int, tracked: Collection[str]) -> PostReactions:
+    tracked = frozenset(tracked)
+    post = self._posts.get((guild_id, message_id))
+    if post is None:
+      post = PostReactions(guild_id, message_id, tracked)
+      self._posts[(guild_id, message_id)] = post
+      self._by_message[message_id] = post
+    elif post.tracked != tracked:
+      # Different react set: rescan, serving the old view meanwhile
+      post.tracked = tracked
+      post.live = False
+
+    return post
+
+  def restore(
+    self,
+    guild_id: int,
+    message_id: int,
+    tracked: Collection[str],
+    reactors: dict[str, set[int]],
+    scanned_at: float,
+    member_roles: dict[int, list[int]] | None = None,
+  ) -> PostReactions:
+    """Warm a post from saved state; it is rescanned in the background."""
+    post = self._post(guild_id, message_id, tracked)
+    post.restore(reactors, scanned_at, member_roles)
+    return post
+
+  def select(self, guild_id: int, message_id: int) -> None:
+    """A new post was selected for `guild_id`: drop that guild's other posts."""
+    for key, post in list(self._posts.items()):
+      if post.guild_id == guild_id and post.message_id != message_id:
+        self._drop(key)
+
+  def _drop(self, key: tuple[int, int]) -> None:
+    post = self._posts.pop(key)
+    self._by_message.pop(post.message_id, None)
+    if post._refresh_task:
+      post._refresh_task.cancel()
+
+  def invalidate(self, where: Callable[[int], bool] | None = None) -> None:
+    """
+    Drop out of live mode, e.g. after missing gateway events. Only posts
+    whose guild id satisfies `where`, if given (e.g. one shard's guilds).
+    """
+    for post in self._posts.values():
+      if where is None or where(post.guild_id):
+        post.live = False
+
+  def on_member_changed(self, guild_id: int, user_id: int) -> None:
+    """Re-resolve members on next read for `guild_id` posts `user_id` reacted to."""
+    for post in self._posts.values():
+      if post.guild_id == guild_id and post.has_reactor(user_id):
+        post.invalidate_members()
+
+  # Gateway event handlers
+
+  def on_add(self, payload: discord.RawReactionActionEvent) -> None:
+    post = self._by_message.get(payload.message_id)
+    if post is None or not post.tracks(str(payload.emoji)):
+      return
+    if payload.member is not None and payload.member.bot:
+      return
+
+    post.apply("add", str(payload.emoji), payload.user_id)
+
+  def on_remove(self, payload: discord.RawReactionActionEvent) -> None:
+    post = self._by_message.get(payload.message_id)
+    if post is None or not post.tracks(str(payload.emoji)):
+      return
+
+    post.apply("remove", str(payload.emoji), payload.user_id)
+
+  def on_clear(self, payload: discord.RawReactionClearEvent) -> None:
+    post = self._by_message.get(payload.message_id)
+    if post is None:
+      return
+
+    post.apply("clear", None, None)
+
+  def on_clear_emoji(self, payload: discord.RawReactionClearEmojiEvent) -> None:
+    post = self._by_message.get(payload.message_id)
+    if post is None or not post.tracks(str(payload.emoji)):
+      return
+
+    post.apply("clear_emoji", str(payload.emoji), None)
+
+  # Reads
+
+  async def get_snapshot(
+    self,
+    guild: discord.Guild,
+    message: discord.Message,
+    tracked: Collection[str] = (),
+  ) -> ReactSnapshot:
+    """Emoji -> members for `message`, never waiting on a rescan once warm."""
+    post = self._post(guild.id, message.id, tracked)
+
+    if not post.seeded:
+      await self._refresh(post, message)
+    elif post.is_stale(self.refresh_interval):
+      self._schedule_refresh(post, message)
+
+    return await post.snapshot(guild, self.member_cache)
+
+  async def refresh(
+    self,
+    guild: discord.Guild,
+    message: discord.Message,
+    tracked: Collection[str] = (),
+  ) -> None:
+    """Rescan `message` now if it is stale (or was never scanned)."""
+    post = self._post(guild.id, message.id, tracked)
+    if post.is_stale(self.refresh_interval * (1 - REFRESH_SLACK)):
+      await self._refresh(post, message)
+
+  def _schedule_refresh(self, post: PostReactions, message: discord.Message) -> None:
+    if post._refresh_task is None or post._refresh_task.done():
+      post._refresh_task = asyncio.create_task(self._refresh(post, message))
+      post._refresh_task.add_done_callback(_log_refresh_error)
+
+  async def _refresh(self, post: PostReactions, message: discord.Message) -> None:
+    requested_at = time.monotonic()
+    async with post._lock:
+      # Someone else rescanned while we waited for the lock
+      if post.live and post.fetched_at is not None and post.fetched_at >= requested_at:
+        return
+
+      await post.seed(message)
+
+  async def verify(
+    self, message: discord.Message, tracked: Collection[str] = ()
+  ) -> dict[str, tuple[set[int], set[int]]]:
+    """
+    Compare the incremental state against a full scan.
+
+    Returns emoji -> (missing from index, extra in index) for every emoji
+    that disagrees. The post is resynced to the scan either way.
+    """
+    assert message.guild is not None
+    post = self._post(message.guild.id, message.id, tracked)
+
+    async with post._lock:
+      return await post.seed(message)
+
+
+def _log_refresh_error(task: asyncio.Task) -> None:
+  if not task.cancelled() and task.exception():
+    print(f"Background reaction refresh failed: {task.exception()!r}")
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import time
+from collections.abc import Collection
+from dataclasses import dataclass
+
+import discord
+
+# Max reaction pages (and REST member fetches) in flight at once
+SCAN_CONCURRENCY = int(os.getenv("REACTION_SCAN_CONCURRENCY", "4"))
+
+# Discord caps reaction user pages at 100
+PAGE_SIZE = 100
+
+
+@dataclass
+class ScanStats:
+  elapsed: float = 0.0
+  requests: int = 0
+  reactions_scanned: int = 0
+  reactions_skipped: int = 0
+  reactors: int = 0
+
+  def __str__(self) -> str:
+    return (
+      f"{self.reactions_scanned} reacts ({self.reactions_skipped} skipped), "
+      f"{self.reactors} reactors, {self.requests} requests in {self.elapsed:.2f}s"
+    )
+
+
+async def scan_reactions(
+  message: discord.Message,
+  tracked: Collection[str] | None = None,
+  concurrency: int = SCAN_CONCURRENCY,
+) -> tuple[dict[str, set[int]], ScanStats]:
+  """
+  Full scan of a post's reactions into emoji -> non-bot user ids.
+
+  Reactions are paged concurrently (at most `concurrency` requests in
+  flight). Only emojis in `tracked` are scanned; an empty/None `tracked`
+  scans everything.
+  """
+  stats = ScanStats()
+  start = time.perf_counter()
+  semaphore = asyncio.Semaphore(concurrency)
+
+  # `message` may be a long-lived cached object whose reaction list is out
+  # of date, so start from a fresh copy
+  message = await message.fetch()
+  stats.requests += 1
+
+  reactions = []
+  for reaction in message.reactions:
+    if tracked and str(reaction.emoji) not in tracked:
+      stats.reactions_skipped += 1
+      continue
+    reactions.append(reaction)
+
+  async def scan_one(reaction: discord.Reaction) -> tuple[str, set[int]]:
+    user_ids = set()
+    after = None
+    while True:
+      async with semaphore:
+        page = [u async for u in reaction.users(limit=PAGE_SIZE, after=after)]
+      stats.requests += 1
+
+      user_ids.update(u.id for u in page if not u.bot)
+      if len(page) < PAGE_SIZE:
+        break
+      # discord.py yields each page highest id first
+      after = max(page, key=lambda u: u.id)
+
+    return str(reaction.emoji), user_ids
+
+  results = await asyncio.gather(*(scan_one(r) for r in reactions))
+  data = dict(results)
+
+  stats.reactions_scanned = len(reactions)
+  stats.reactors = len(set().union(*data.values()))
+  stats.elapsed = time.perf_counter() - start
+  return data, stats
+
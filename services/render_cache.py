@@ -0,0 +1,54 @@
+import os
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "64"))
+
+
+class RenderCache:
+  """
+  Per-guild LRUs of rendered command output, keyed by everything it was
+  rendered from.
+
+  Keys include the roster matrix version, which moves whenever reactions or
+  member details change, so entries never need explicit invalidation; old
+  versions just age out.
+  """
+
+  def __init__(self, maxsize: int = RENDER_CACHE_SIZE) -> None:
+    self.maxsize = maxsize
+    self._guilds: dict[int, OrderedDict[Hashable, Any]] = {}
+    self.hits = 0
+    self.misses = 0
+
+  def __len__(self) -> int:
+    return sum(len(entries) for entries in self._guilds.values())
+
+  async def get_or_render(
+    self, guild_id: int, key: Hashable, render: Callable[[], Awaitable[Any]]
+  ) -> Any:
+    entries = self._guilds.setdefault(guild_id, OrderedDict())
+    if key in entries:
+      self.hits += 1
+      entries.move_to_end(key)
+      return entries[key]
+
+    self.misses += 1
+    value = await render()
+    entries[key] = value
+    while len(entries) > self.maxsize:
+      entries.popitem(last=False)
+    return value
+
+  def clear(self) -> None:
+    self._guilds.clear()
+
+  def summary(self) -> str:
+    return (
+      f"{len(self)} entries over {len(self._guilds)} guilds ({self.maxsize} per guild), "
+      f"{self.hits} hits, {self.misses} misses"
+    )
+
+
+render_cache = RenderCache()
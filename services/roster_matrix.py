@@ -0,0 +1,134 @@
+from array import array
+from collections.abc import Iterator, Sequence
+
+import discord
+
+from services.reaction_index import ReactSnapshot
+from services.signup_service import RosterMember
+
+
+class RosterMatrix:
+  """
+  A react snapshot flattened into bitmasks over the GvG roles and reacts.
+
+  Per member: a `RosterMember` record with a role mask and a react mask.
+  Per role/react: a column bitset over member indices (bit j <=> member j),
+  so filters, totals and unique counts are a few big-int `&` and
+  `bit_count` calls instead of rescans of `member.roles`.
+
+  Members are stored pre-sorted in overview order (by GvG roles held, in
+  role order, then by name).
+  """
+
+  def __init__(
+    self,
+    snapshot: ReactSnapshot,
+    roles: Sequence[discord.Role],
+    reacts: Sequence[str],
+  ) -> None:
+    self.version = snapshot.version
+    self.roles = list(roles)
+    self.role_ids = [r.id for r in roles]
+    # No configured reacts means every react on the post counts
+    self.reacts = list(reacts) or list(snapshot.react_data)
+
+    role_bit = {r_id: 1 << i for i, r_id in enumerate(self.role_ids)}
+    react_bit = {e: 1 << i for i, e in enumerate(self.reacts)}
+
+    by_id: dict[int, RosterMember] = {}
+    for emoji_str, members in snapshot.react_data.items():
+      bit = react_bit.get(emoji_str, 0)
+      for m in members:
+        rm = by_id.get(m.id)
+        if rm is None:
+          role_mask = 0
+          for r in m.roles:
+            role_mask |= role_bit.get(r.id, 0)
+          rm = RosterMember(m.id, m.display_name, m.display_avatar.url, role_mask)
+          by_id[m.id] = rm
+        rm.react_mask |= bit
+
+    n_roles = len(self.role_ids)
+    full = (1 << n_roles) - 1
+
+    def sort_key(rm: RosterMember) -> tuple[int, str]:
+      # Reverse the missing-role bits so role 0 is the most significant,
+      # matching a tuple of "lacks role i" flags
+      missing = rm.role_mask ^ full
+      weight = int(f"{missing:0{n_roles}b}"[::-1], 2) if n_roles else 0
+      return weight, rm.display_name.lower()
+
+    self.members: list[RosterMember] = sorted(by_id.values(), key=sort_key)
+    self.member_ids = array("Q", (rm.id for rm in self.members))
+
+    self.role_columns = [0] * n_roles
+    self.react_columns = [0] * len(self.reacts)
+    self.single_role = 0  # members holding exactly one GvG role
+    for j, rm in enumerate(self.members):
+      col_bit = 1 << j
+      for i in _bits(rm.role_mask):
+        self.role_columns[i] |= col_bit
+      for i in _bits(rm.react_mask):
+        self.react_columns[i] |= col_bit
+      if rm.role_mask.bit_count() == 1:
+        self.single_role |= col_bit
+
+    self.all_members = (1 << len(self.members)) - 1
+
+  def __len__(self) -> int:
+    return len(self.members)
+
+  def react_mask(self, react_filter: str | None) -> int:
+    """Column bitset of members matching `react_filter` (everyone if None)."""
+    if react_filter is None:
+      return self.all_members
+    if react_filter not in self.reacts:
+      return 0
+    return self.react_columns[self.reacts.index(react_filter)]
+
+  def select(self, mask: int) -> Iterator[RosterMember]:
+    """Members whose column bit is set in `mask`, in overview order."""
+    for j in _bits(mask):
+      yield self.members[j]
+
+  def totals(self, mask: int) -> list[int]:
+    return [(col & mask).bit_count() for col in self.role_columns]
+
+  def unique_counts(self, mask: int) -> list[int]:
+    return [(col & mask & self.single_role).bit_count() for col in self.role_columns]
+
+  def role_index(self, role_id: int) -> int | None:
+    try:
+      return self.role_ids.index(role_id)
+    except ValueError:
+      return None
+
+
+def _bits(mask: int) -> Iterator[int]:
+  """Indices of set bits, lowest first."""
+  while mask:
+    low = mask & -mask
+    yield low.bit_length() - 1
+    mask ^= low
+
+
+# Guild id -> (key, matrix) of the last matrix built for that guild
+_matrices: dict[int, tuple[tuple, RosterMatrix]] = {}
+
+
+def get_roster_matrix(
+  snapshot: ReactSnapshot, roles: Sequence[discord.Role], reacts: Sequence[str]
+) -> RosterMatrix:
+  """The matrix for `snapshot`, built once per snapshot version/role set."""
+  key = (
+    snapshot.message_id,
+    snapshot.version,
+    tuple((r.id, r.name) for r in roles),
+    tuple(reacts),
+  )
+  cached = _matrices.get(snapshot.guild_id)
+  if cached is None or cached[0] != key:
+    cached = (key, RosterMatrix(snapshot, roles, reacts))
+    _matrices[snapshot.guild_id] = cached
+
+  return cached[1]
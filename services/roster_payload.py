@@ -0,0 +1,120 @@
+import json
+import os
+from collections import OrderedDict
+
+from services.roster_store import RosterView
+from services.signup_service import RosterMember
+
+try:
+  import orjson
+except ImportError:  # Optional: falls back to the stdlib encoder
+  orjson = None
+
+# Versions per guild kept around to answer `since` deltas
+ROSTER_API_HISTORY = int(os.getenv("ROSTER_API_HISTORY", "16"))
+
+MEMBER_COLUMNS = ["id", "display_name", "avatar_url", "role_mask", "react_mask"]
+
+
+def dumps(obj: object) -> bytes:
+  if orjson is not None:
+    return orjson.dumps(obj)
+  return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _row(member: RosterMember) -> list:
+  # Ids as strings: snowflakes don't fit in a JavaScript number
+  return [
+    str(member.id),
+    member.display_name,
+    member.avatar_url,
+    member.role_mask,
+    member.react_mask,
+  ]
+
+
+def _header(view: RosterView) -> dict:
+  """Everything but the members. Bit i of a mask is `roles[i]` / `reacts[i]`."""
+  return {
+    "guild_id": str(view.guild_id),
+    "message_id": str(view.message_id),
+    "version": view.version,
+    "roles": [
+      {"id": str(r["id"]), "name": r["name"], "color": r["color"]} for r in view.roles
+    ],
+    "reacts": list(view.reacts),
+    "columns": MEMBER_COLUMNS,
+  }
+
+
+class RosterPayloads:
+  """
+  Encoded `/api/roster` payloads, built once per guild and roster version.
+
+  The last `history` versions of each guild are kept so a client that
+  already has one can fetch only the members that changed since.
+  """
+
+  def __init__(self, history: int = ROSTER_API_HISTORY) -> None:
+    self.history = history
+    # Guild id -> version -> view, oldest first
+    self._views: dict[int, OrderedDict[int, RosterView]] = {}
+    # Guild id -> (since, version) -> encoded payload; since is None for full
+    self._payloads: dict[int, OrderedDict[tuple[int | None, int], bytes]] = {}
+
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, view: RosterView, since: int | None = None) -> bytes:
+    """The full payload, or a delta if `since` is a version still known."""
+    self._remember(view)
+
+    views = self._views[view.guild_id]
+    if since is not None:
+      old = views.get(since)
+      # A delta only makes sense if the mask bits still mean the same thing
+      if old is None or old.roles != view.roles or old.reacts != view.reacts:
+        since = None
+
+    payloads = self._payloads.setdefault(view.guild_id, OrderedDict())
+    key = (since, view.version)
+    payload = payloads.get(key)
+    if payload is not None:
+      self.hits += 1
+      return payload
+
+    self.misses += 1
+    if since is None:
+      members = [_row(m) for m in view.members]
+      payload = dumps({**_header(view), "delta": False, "members": members})
+    else:
+      payload = dumps({**_header(view), **_delta(views[since], view), "since": since})
+
+    payloads[key] = payload
+    while len(payloads) > 2 * self.history:
+      payloads.popitem(last=False)
+    return payload
+
+  def _remember(self, view: RosterView) -> None:
+    views = self._views.setdefault(view.guild_id, OrderedDict())
+    if view.version in views:
+      return
+
+    views[view.version] = view
+    while len(views) > self.history:
+      views.popitem(last=False)
+
+  def summary(self) -> str:
+    return f"{len(self._views)} guilds, {self.hits} hits, {self.misses} misses"
+
+
+def _delta(old: RosterView, new: RosterView) -> dict:
+  before = {m.id: m for m in old.members}
+  after = {m.id: m for m in new.members}
+
+  return {
+    "delta": True,
+    # Changed or new members; clients re-sort, roster order isn't kept here
+    "upserts": [_row(m) for m_id, m in after.items() if before.get(m_id) != m],
+    "removed": [str(m_id) for m_id in before.keys() - after.keys()],
+  }
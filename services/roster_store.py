@@ -0,0 +1,246 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import discord
+from sqlmodel import Session, select
+
+from core.database import get_session_context, run_db
+from core.models import RosterRecord
+from services.roster_matrix import RosterMatrix, get_roster_matrix
+from services.signup_service import RosterMember, Signup, get_and_hydrate_signup
+from services.snapshot_service import SnapshotService
+
+# How often the bot publishes changed rosters, and how often web workers
+# check for a newer one. Together they bound how stale a worker can be.
+ROSTER_PUBLISH_INTERVAL = float(os.getenv("ROSTER_PUBLISH_INTERVAL", "2"))
+ROSTER_POLL_INTERVAL = float(os.getenv("ROSTER_POLL_INTERVAL", "1"))
+
+MAX_CACHED_SELECTIONS = 32
+
+
+@dataclass(frozen=True)
+class RosterView:
+  """One guild's roster as the web dashboard sees it, free of discord.py objects."""
+
+  guild_id: int
+  message_id: int
+  guild_name: str
+  roles: tuple[dict, ...]  # {"id", "name", "color"}
+  reacts: tuple[str, ...]
+  members: tuple[RosterMember, ...]  # in roster order
+  published_at: float
+
+  # (react, role id, sort) -> members, filled by `select`
+  _selections: dict[tuple, tuple[RosterMember, ...]] = field(
+    default_factory=dict, init=False, repr=False, compare=False
+  )
+
+  @property
+  def version(self) -> int:
+    """Increases with every publish (microseconds since the epoch)."""
+    return int(self.published_at * 1_000_000)
+
+  @property
+  def role_ids(self) -> list[int]:
+    return [r["id"] for r in self.roles]
+
+  @cached_property
+  def member_ids(self) -> frozenset[int]:
+    return frozenset(m.id for m in self.members)
+
+  def select(
+    self, react: str | None = None, role_id: int | None = None, sort: str = "roster"
+  ) -> tuple[RosterMember, ...]:
+    """
+    Members with `react` and `role_id` (each if given), in roster order
+    (by GvG roles held, then name) or, with `sort="name"`, by name.
+    """
+    key = (react, role_id, sort)
+    selection = self._selections.get(key)
+    if selection is not None:
+      return selection
+
+    react_bit = role_bit = 0
+    if react is not None:
+      react_bit = 1 << self.reacts.index(react) if react in self.reacts else 0
+    if role_id is not None:
+      role_ids = self.role_ids
+      role_bit = 1 << role_ids.index(role_id) if role_id in role_ids else 0
+
+    members = [
+      m
+      for m in self.members
+      if (react is None or m.react_mask & react_bit)
+      and (role_id is None or m.role_mask & role_bit)
+    ]
+    if sort == "name":
+      members.sort(key=lambda m: m.display_name.lower())
+
+    if len(self._selections) >= MAX_CACHED_SELECTIONS:
+      self._selections.clear()
+    selection = self._selections[key] = tuple(members)
+    return selection
+
+  @property
+  def key(self) -> tuple:
+    """Changes whenever anything shown changes."""
+    return (self.message_id, self.roles, self.reacts, self.members)
+
+  @classmethod
+  def from_matrix(cls, signup: Signup, matrix: RosterMatrix) -> "RosterView":
+    return cls(
+      guild_id=signup.guild.id,
+      message_id=signup.post.id,
+      guild_name=signup.guild.name,
+      roles=tuple(
+        {"id": r.id, "name": r.name, "color": str(r.color)} for r in matrix.roles
+      ),
+      reacts=tuple(matrix.reacts),
+      members=tuple(matrix.members),
+      published_at=time.time(),
+    )
+
+  @classmethod
+  def from_record(cls, record: RosterRecord) -> "RosterView":
+    return cls(
+      guild_id=record.guild_id,
+      message_id=record.message_id,
+      guild_name=record.guild_name,
+      roles=tuple(record.roles),
+      reacts=tuple(record.reacts),
+      members=tuple(RosterMember(*m) for m in record.members),
+      published_at=record.published_at,
+    )
+
+  def to_record(self) -> RosterRecord:
+    return RosterRecord(
+      guild_id=self.guild_id,
+      message_id=self.message_id,
+      guild_name=self.guild_name,
+      roles=list(self.roles),
+      reacts=list(self.reacts),
+      members=[
+        [m.id, m.display_name, m.avatar_url, m.role_mask, m.react_mask]
+        for m in self.members
+      ],
+      published_at=self.published_at,
+    )
+
+
+class LiveRosterSource:
+  """Rosters straight from the bot's snapshots, for a web app in the bot process."""
+
+  def __init__(self, bot: discord.Client, snapshots: SnapshotService) -> None:
+    self.bot = bot
+    self.snapshots = snapshots
+    # Guild id -> (matrix, view), so a view is built once per matrix
+    self._views: dict[int, tuple[RosterMatrix, RosterView]] = {}
+
+  async def get(self, guild_id: int) -> RosterView | None:
+    # Guild ids come from URLs; never look up (or cache) guilds we're not in
+    if self.bot.get_guild(guild_id) is None:
+      return None
+
+    signup = await get_and_hydrate_signup(self.bot, guild_id=guild_id)
+    if not signup:
+      return None
+
+    snapshot = await self.snapshots.get(signup)
+    matrix = get_roster_matrix(snapshot, signup.roles, signup.tracked_reacts)
+
+    cached = self._views.get(guild_id)
+    if cached is None or cached[0] is not matrix:
+      cached = (matrix, RosterView.from_matrix(signup, matrix))
+      self._views[guild_id] = cached
+
+    return cached[1]
+
+
+class StoreRosterSource:
+  """
+  Rosters read from the DB, for web workers running apart from the bot.
+
+  Each guild's roster is kept in memory and revalidated at most every
+  `poll_interval` seconds with a primary-key lookup of its publish time;
+  the full record is only reloaded when that moved.
+  """
+
+  def __init__(self, poll_interval: float = ROSTER_POLL_INTERVAL) -> None:
+    self.poll_interval = poll_interval
+    # Guild id -> (monotonic time last checked, view)
+    self._views: dict[int, tuple[float, RosterView | None]] = {}
+    self._locks: dict[int, asyncio.Lock] = {}
+
+    self.polls = 0
+    self.reloads = 0
+
+  async def get(self, guild_id: int) -> RosterView | None:
+    cached = self._views.get(guild_id)
+    if cached is not None and time.monotonic() - cached[0] < self.poll_interval:
+      return cached[1]
+
+    async with self._locks.setdefault(guild_id, asyncio.Lock()):
+      # Another request revalidated while we waited
+      cached = self._views.get(guild_id)
+      if cached is not None and time.monotonic() - cached[0] < self.poll_interval:
+        return cached[1]
+
+      view = cached[1] if cached is not None else None
+      view = await run_db(self._revalidate, guild_id, view)
+      self._views[guild_id] = (time.monotonic(), view)
+      return view
+
+  def _revalidate(self, guild_id: int, view: RosterView | None) -> RosterView | None:
+    self.polls += 1
+    with get_session_context() as session:
+      published_at = get_roster_published_at(session, guild_id)
+      if published_at is None:
+        return None
+      if view is not None and view.published_at == published_at:
+        return view
+
+      record = session.get(RosterRecord, guild_id)
+      if record is None:
+        return None
+
+      self.reloads += 1
+      return RosterView.from_record(record)
+
+
+class RosterPublisher:
+  """Writes changed rosters to the DB for `StoreRosterSource` readers."""
+
+  def __init__(self) -> None:
+    self._published: dict[int, tuple] = {}
+    self.publishes = 0
+
+  async def publish(self, view: RosterView) -> bool:
+    """Save `view` unless the same roster was already published."""
+    if self._published.get(view.guild_id) == view.key:
+      return False
+
+    def _save() -> None:
+      with get_session_context() as session:
+        save_roster(session, view.to_record())
+
+    await run_db(_save)
+    self._published[view.guild_id] = view.key
+    self.publishes += 1
+    return True
+
+  def summary(self) -> str:
+    return f"{len(self._published)} guilds, {self.publishes} publishes"
+
+
+def get_roster_published_at(session: Session, guild_id: int) -> float | None:
+  return session.exec(
+    select(RosterRecord.published_at).where(RosterRecord.guild_id == guild_id)
+  ).first()
+
+
+def save_roster(session: Session, record: RosterRecord) -> None:
+  session.merge(record)
+  session.commit()
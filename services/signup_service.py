@@ -1,21 +1,30 @@
 from collections import defaultdict
+from collections.abc import Collection
 import re
 import discord
 from dataclasses import dataclass
+from functools import cached_property
 
-from core.database import get_session_context
-from core.models import SignupConfig
-from services.config import get_signup_config
+from services.config import get_cached_signup_config
 from services.discord_bus import hydrate_channel, hydrate_message
+from services.member_cache import MemberCache
+from services.reaction_scan import scan_reactions
 
+CUSTOM_EMOJI_RE = re.compile(r":(\d+)>")
 
-@dataclass
+
+@dataclass(slots=True)
 class RosterMember:
   id: int
   display_name: str
   avatar_url: str
-  role_names: list[str]
-  is_signed_up: bool = True
+  # Bit i set <=> has the i-th GvG role / reacted with the i-th GvG react
+  role_mask: int = 0
+  react_mask: int = 0
+
+  @property
+  def mention(self) -> str:
+    return f"<@{self.id}>"
 
 
 @dataclass
@@ -24,17 +33,102 @@ class Signup:
   management_channel: discord.TextChannel
   guild: discord.Guild
   roles: list[discord.Role]
-  reacts: list[str | discord.Reaction]
+  reacts: list[str | discord.Emoji]
+
+  @cached_property
+  def tracked_reacts(self) -> list[str]:
+    """Reacts in the same string form as `str(reaction.emoji)`."""
+    return [str(r) for r in self.reacts]
+
+
+class SignupCache:
+  """
+  Each guild's hydrated `Signup`, built once per config version.
+
+  Gateway listeners call `invalidate_for` when something a signup was built
+  from (the post, its channels, roles or emojis) changes.
+  """
+
+  def __init__(self) -> None:
+    # Guild id -> (config version, signup)
+    self._signups: dict[int, tuple[int, Signup]] = {}
+    self._generations: dict[int, int] = {}
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, guild_id: int, config_version: int) -> Signup | None:
+    entry = self._signups.get(guild_id)
+    if entry is not None and entry[0] == config_version:
+      self.hits += 1
+      return entry[1]
+
+    self.misses += 1
+    return None
+
+  def generation(self, guild_id: int) -> int:
+    return self._generations.get(guild_id, 0)
+
+  def store(
+    self, guild_id: int, signup: Signup, config_version: int, generation: int
+  ) -> None:
+    # Skip if invalidated while this signup was being built
+    if generation == self.generation(guild_id):
+      self._signups[guild_id] = (config_version, signup)
+
+  def invalidate(self, guild_id: int) -> None:
+    self._signups.pop(guild_id, None)
+    self._generations[guild_id] = self.generation(guild_id) + 1
+
+  def invalidate_for(
+    self,
+    *,
+    guild_id: int | None = None,
+    channel_id: int | None = None,
+    message_id: int | None = None,
+  ) -> None:
+    for s_guild_id, (_, s) in list(self._signups.items()):
+      if (
+        guild_id == s_guild_id
+        or channel_id in (s.post.channel.id, s.management_channel.id)
+        or message_id == s.post.id
+      ):
+        self.invalidate(s_guild_id)
+
+  def summary(self) -> str:
+    return f"{len(self._signups)} guilds, {self.hits} hits, {self.misses} misses"
+
+
+signup_cache = SignupCache()
 
 
 async def get_and_hydrate_signup(
-  bot: discord.Client, interaction: discord.Interaction | None = None
+  bot: discord.Client,
+  interaction: discord.Interaction | None = None,
+  guild_id: int | None = None,
 ) -> Signup | None:
-  """Basically just a hydration helper."""
+  """
+  Basically just a hydration helper (cached, see `SignupCache`).
+
+  The guild is `guild_id` if given, else the interaction's guild.
+  """
   # TODO(@alexandersoen): Probably needs better error handling...
 
-  with get_session_context() as session:
-    signup_config: SignupConfig = get_signup_config(session)
+  if guild_id is None and interaction is not None:
+    guild_id = interaction.guild_id
+
+  if guild_id is None:
+    if interaction:
+      await interaction.response.send_message(
+        "GvG signups can only be used in a server.", ephemeral=True
+      )
+    return None
+
+  signup_config = await get_cached_signup_config(guild_id)
+  signup = signup_cache.get(guild_id, signup_config.version)
+  if signup is not None:
+    return signup
+
+  generation = signup_cache.generation(guild_id)
 
   management_channel = await hydrate_channel(bot, signup_config.management_channel)
   signup_post = await hydrate_message(bot, signup_config.selected_post)
@@ -73,7 +167,7 @@ async def get_and_hydrate_signup(
   reacts = []
   for r_str in signup_config.gvg_reacts:
     react = r_str
-    custom_emoji_match = re.search(r":(\d+)>", react)
+    custom_emoji_match = CUSTOM_EMOJI_RE.search(react)
     if custom_emoji_match:
       r_id = int(custom_emoji_match.group(1))
 
@@ -83,29 +177,32 @@ async def get_and_hydrate_signup(
 
     reacts.append(react)
 
-  return Signup(
+  signup = Signup(
     post=signup_post,
     management_channel=management_channel,
     guild=guild,
     reacts=reacts,
     roles=roles,
   )
+  signup_cache.store(guild_id, signup, signup_config.version, generation)
+  return signup
 
 
 async def get_react_data(
-  guild: discord.Guild, message: discord.Message
+  guild: discord.Guild,
+  message: discord.Message,
+  tracked: Collection[str] | None = None,
+  member_cache: MemberCache | None = None,
 ) -> dict[str, set[discord.Member]]:
-  """Get react data from reacts to user ids."""
-  data = defaultdict(set)
+  """Get react data from reacts to members with a full scan of the post."""
+  if member_cache is None:
+    member_cache = MemberCache()
 
-  for reaction in message.reactions:
-    emoji_str = str(reaction.emoji)
+  reactors, _ = await scan_reactions(message, tracked)
+  members = await member_cache.resolve(guild, set().union(*reactors.values()))
 
-    async for user in reaction.users():
-      if user.bot:
-        continue
-
-      m = guild.get_member(user.id) or await guild.fetch_member(user.id)
-      data[emoji_str].add(m)
+  data = defaultdict(set)
+  for emoji_str, user_ids in reactors.items():
+    data[emoji_str].update(members[u] for u in user_ids if u in members)
 
   return data
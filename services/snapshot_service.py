@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections.abc import Callable
+
+from core.database import get_session_context, run_db
+from core.models import PostReactionsRecord
+from services.config import config_cache
+from services.reaction_index import PostReactions, ReactionIndex, ReactSnapshot
+from services.signup_service import Signup
+from services.snapshot_store import load_post_reactions, save_post_reactions
+
+
+class SnapshotService:
+  """
+  Single entry point for react snapshots, shared by the bot and the web app.
+
+  Concurrent requests for the same post are coalesced: the first starts the
+  build and every other caller awaits that same in-flight task. Post
+  reactions are saved to the DB so a restart starts warm.
+  """
+
+  def __init__(self, index: ReactionIndex) -> None:
+    self.index = index
+    self._inflight: dict[tuple[int, int], asyncio.Task[ReactSnapshot]] = {}
+    self._persisted: dict[tuple[int, int], int] = {}
+
+    self.requests = 0
+    self.collapsed = 0
+
+  async def get(self, signup: Signup) -> ReactSnapshot:
+    self.requests += 1
+
+    key = (signup.guild.id, signup.post.id)
+    task = self._inflight.get(key)
+    if task is None:
+      task = asyncio.create_task(
+        self.index.get_snapshot(signup.guild, signup.post, signup.tracked_reacts)
+      )
+      self._inflight[key] = task
+      task.add_done_callback(lambda _: self._inflight.pop(key, None))
+    else:
+      self.collapsed += 1
+
+    # Shield so one cancelled waiter (e.g. a dropped HTTP request) doesn't
+    # cancel the build for everyone else
+    return await asyncio.shield(task)
+
+  async def restore(self, owns_guild: Callable[[int], bool] = lambda _: True) -> None:
+    """Warm the index with each owned guild's selected post's saved reactions."""
+    selected = {
+      (c.guild_id, c.selected_post.message_id): c
+      for c in config_cache.with_selected_post()
+      if c.selected_post is not None and owns_guild(c.guild_id)
+    }
+    if not selected:
+      return
+
+    def _load() -> list[PostReactionsRecord]:
+      with get_session_context() as session:
+        return load_post_reactions(session)
+
+    for record in await run_db(_load):
+      signup_config = selected.get((record.guild_id, record.message_id))
+      if signup_config is None:
+        continue
+
+      post = self.index.restore(
+        record.guild_id,
+        record.message_id,
+        signup_config.gvg_reacts,
+        {e: set(ids) for e, ids in record.reactors.items()},
+        record.fetched_at,
+        {int(u): roles for u, roles in record.member_roles.items()},
+      )
+      self._persisted[(post.guild_id, post.message_id)] = post.version
+      print(f"Restored saved reactions for post {record.message_id}")
+
+  async def persist(self) -> None:
+    """Save every post whose reactions changed since it was last saved."""
+    for post in self.index.posts:
+      key = (post.guild_id, post.message_id)
+      if not post.seeded or self._persisted.get(key) == post.version:
+        continue
+
+      version = post.version
+      record = _to_record(post)
+
+      def _save() -> None:
+        with get_session_context() as session:
+          save_post_reactions(session, record)
+
+      await run_db(_save)
+      self._persisted[key] = version
+
+  def summary(self) -> str:
+    return (
+      f"{self.requests} requests, {self.collapsed} collapsed into in-flight builds, "
+      f"{len(self._inflight)} in flight"
+    )
+
+
+def _to_record(post: PostReactions) -> PostReactionsRecord:
+  # A live post is current as of now, otherwise as of its last scan
+  fetched_at = time.time() if post.live else post.scanned_at
+  assert fetched_at is not None
+
+  return PostReactionsRecord(
+    guild_id=post.guild_id,
+    message_id=post.message_id,
+    reactors={e: sorted(ids) for e, ids in post.reactor_ids().items()},
+    # JSON object keys are strings
+    member_roles={str(u): roles for u, roles in post.member_roles().items()},
+    fetched_at=fetched_at,
+  )
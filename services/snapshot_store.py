@@ -0,0 +1,19 @@
+from sqlmodel import Session, delete, select
+
+from core.models import PostReactionsRecord
+
+
+def load_post_reactions(session: Session) -> list[PostReactionsRecord]:
+  return list(session.exec(select(PostReactionsRecord)).all())
+
+
+def save_post_reactions(session: Session, record: PostReactionsRecord) -> None:
+  """Upsert `record`, replacing any other saved post for the same guild."""
+  session.exec(
+    delete(PostReactionsRecord).where(
+      PostReactionsRecord.guild_id == record.guild_id,
+      PostReactionsRecord.message_id != record.message_id,
+    )
+  )
+  session.merge(record)
+  session.commit()
@@ -0,0 +1,209 @@
+import asyncio
+import math
+import os
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+from services.assignments import Cells
+from services.signup_service import RosterMember
+
+# Wall time the local search may use after the greedy pass
+SOLVER_TIME_BUDGET = float(os.getenv("SOLVER_TIME_BUDGET", "0.25"))
+
+# Solves run here so their CPU time never stalls the event loop (Discord
+# gateway heartbeats and uvicorn share it). One at a time: each already
+# spends its whole budget.
+solver_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="solver")
+
+
+@dataclass
+class TeamSolution:
+  # New cells for members that had none; locked members are left out
+  assignments: Cells
+  # Members that fit nowhere within the quotas
+  unplaced: list[int]
+  # [group - 1][role index] -> members, locked ones included
+  counts: list[list[int]]
+  quotas: list[int]
+  elapsed: float
+  timed_out: bool
+
+
+def default_quotas(members: Sequence[RosterMember], num_roles: int, num_groups: int) -> list[int]:
+  """Per-group slots for each role: enough for every holder, split evenly."""
+  holders = [0] * num_roles
+  for member in members:
+    for i in range(num_roles):
+      holders[i] += member.role_mask >> i & 1
+  return [math.ceil(h / num_groups) for h in holders]
+
+
+async def run_solver(
+  members: Sequence[RosterMember],
+  role_ids: Sequence[int],
+  num_groups: int,
+  quotas: Sequence[int] | None = None,
+  locked: Cells | None = None,
+) -> TeamSolution:
+  """`solve_teams` on the solver thread."""
+  loop = asyncio.get_running_loop()
+  return await loop.run_in_executor(
+    solver_executor, partial(solve_teams, members, role_ids, num_groups, quotas, locked)
+  )
+
+
+def solve_teams(
+  members: Sequence[RosterMember],
+  role_ids: Sequence[int],
+  num_groups: int,
+  quotas: Sequence[int] | None = None,
+  locked: Cells | None = None,
+  budget: float = SOLVER_TIME_BUDGET,
+) -> TeamSolution:
+  """
+  Place members into groups 1..`num_groups`, one GvG role each, with at
+  most `quotas[i]` members per group in role `role_ids[i]`.
+
+  Members with a `locked` cell keep it and count towards the quotas. The
+  rest are placed greedily, least flexible first, into the role and group
+  with the most open slots. A local search then, until `budget` runs out,
+  places leftovers by moving a placed member to another open slot, and
+  moves members to even out role counts and group sizes.
+  """
+  start = time.perf_counter()
+  deadline = start + budget
+  num_roles = len(role_ids)
+  quotas = list(quotas) if quotas is not None else default_quotas(members, num_roles, num_groups)
+  locked = locked or {}
+  role_index = {r_id: i for i, r_id in enumerate(role_ids)}
+
+  counts = [[0] * num_roles for _ in range(num_groups)]
+  sizes = [0] * num_groups
+  locked_members = set()
+  for (member_id, role_id), group in locked.items():
+    locked_members.add(member_id)
+    i = role_index.get(role_id)
+    if i is not None and 1 <= group <= num_groups:
+      counts[group - 1][i] += 1
+      sizes[group - 1] += 1
+
+  free = [m for m in members if m.role_mask and m.id not in locked_members]
+  roles_of = {m.id: [i for i in range(num_roles) if m.role_mask >> i & 1] for m in free}
+
+  # (group index, role index) -> members placed there by the solver
+  cells: dict[tuple[int, int], list[int]] = {
+    (g, i): [] for g in range(num_groups) for i in range(num_roles)
+  }
+  placed: dict[int, tuple[int, int]] = {}
+
+  def put(member_id: int, g: int, i: int) -> None:
+    cells[(g, i)].append(member_id)
+    placed[member_id] = (g, i)
+    counts[g][i] += 1
+    sizes[g] += 1
+
+  def take(member_id: int) -> None:
+    g, i = placed.pop(member_id)
+    cells[(g, i)].remove(member_id)
+    counts[g][i] -= 1
+    sizes[g] -= 1
+
+  def open_slot(member_id: int) -> tuple[int, int] | None:
+    best = None
+    for i in roles_of[member_id]:
+      for g in range(num_groups):
+        room = quotas[i] - counts[g][i]
+        if room > 0:
+          key = (room, -sizes[g], -g)
+          if best is None or key > best[0]:
+            best = (key, g, i)
+    return None if best is None else (best[1], best[2])
+
+  # Greedy: members with fewer roles have fewer places to go
+  unplaced = []
+  for m in sorted(free, key=lambda m: (len(roles_of[m.id]), m.id)):
+    slot = open_slot(m.id)
+    if slot is None:
+      unplaced.append(m.id)
+    else:
+      put(m.id, *slot)
+
+  def spread(values: list[int]) -> float:
+    # Sum of squared deviations from the mean
+    return sum(v * v for v in values) - sum(values) ** 2 / num_groups
+
+  def move_cost(g: int, i: int, g2: int, i2: int) -> float:
+    """Change in imbalance from moving one member from (g, i) to (g2, i2)."""
+    affected_roles = {i, i2}
+    before = sum(spread([counts[x][r] for x in range(num_groups)]) for r in affected_roles)
+    before += spread(sizes)
+    counts[g][i] -= 1
+    counts[g2][i2] += 1
+    sizes[g] -= 1
+    sizes[g2] += 1
+    after = sum(spread([counts[x][r] for x in range(num_groups)]) for r in affected_roles)
+    after += spread(sizes)
+    counts[g][i] += 1
+    counts[g2][i2] -= 1
+    sizes[g] += 1
+    sizes[g2] -= 1
+    return after - before
+
+  def place_by_bumping(member_id: int) -> bool:
+    """Free a full slot of `member_id`'s by moving its holder to an open one."""
+    for i in roles_of[member_id]:
+      for g in range(num_groups):
+        for other in cells[(g, i)]:
+          slot = open_slot(other)
+          if slot is not None:
+            take(other)
+            put(other, *slot)
+            put(member_id, g, i)
+            return True
+    return False
+
+  timed_out = False
+  improved = True
+  while improved:
+    improved = False
+
+    for member_id in list(unplaced):
+      if time.perf_counter() > deadline:
+        timed_out = True
+        break
+      slot = open_slot(member_id)
+      if slot is not None:
+        put(member_id, *slot)
+      elif not place_by_bumping(member_id):
+        continue
+      unplaced.remove(member_id)
+      improved = True
+
+    for (g, i), members_here in cells.items():
+      if timed_out or time.perf_counter() > deadline:
+        timed_out = True
+        break
+      for g2 in range(num_groups):
+        for i2 in range(num_roles):
+          if (g2, i2) == (g, i) or counts[g2][i2] >= quotas[i2]:
+            continue
+          mover = next((m for m in members_here if i2 in roles_of[m]), None)
+          if mover is not None and move_cost(g, i, g2, i2) < -1e-9:
+            take(mover)
+            put(mover, g2, i2)
+            improved = True
+
+    if timed_out:
+      break
+
+  return TeamSolution(
+    assignments={(m_id, role_ids[i]): g + 1 for m_id, (g, i) in placed.items()},
+    unplaced=unplaced,
+    counts=counts,
+    quotas=quotas,
+    elapsed=time.perf_counter() - start,
+    timed_out=timed_out,
+  )
@@ -32,19 +32,36 @@ const RosterManager = {
     const rowClass = input.classList[0];
     this.updateRowState(rowClass, input);
 
-    // 4. Trigger HTMX
-    htmx.trigger("#roster-form", "change");
+    // 4. Save just this cell
+    this.saveCells([input]);
   },
 
   resetRow: function(rowClass) {
     const rowInputs = document.querySelectorAll('.' + rowClass);
+    const changed = [];
     rowInputs.forEach(inp => {
       const btn = inp.nextElementSibling;
+      if (parseInt(inp.value) !== 0) changed.push(inp);
       inp.value = 0;
       btn.innerText = "-";
       btn.setAttribute('data-active', false);
       btn.disabled = false;
     });
-    htmx.trigger("#roster-form", "change");
+    this.saveCells(changed);
+  },
+
+  // Post only the changed cells; the server coalesces bursts of clicks
+  saveCells: function(inputs) {
+    if (inputs.length === 0) return;
+
+    const body = new URLSearchParams();
+    inputs.forEach(inp => body.append(inp.name, inp.value));
+    const url = document.getElementById("roster-form").dataset.updateUrl;
+    fetch(url, { method: "POST", body: body, keepalive: true });
   }
 };
+
+// Filter changes report the new member count via an HX-Trigger header
+document.body.addEventListener("roster-count", function(evt) {
+  document.getElementById("roster-count").innerText = evt.detail.value;
+});
@@ -1,66 +1,323 @@
-from fastapi import FastAPI, Request
-from fastapi.templating import Jinja2Templates
+import json
+import secrets
+from collections.abc import Sequence
+from contextlib import asynccontextmanager
+from functools import cache
+from typing import TYPE_CHECKING, Literal
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.staticfiles import StaticFiles
 
-from services.signup_service import get_and_hydrate_signup, get_react_data, RosterMember
+from services.assignments import MAX_NUM_GROUPS, Cells, TeamAssignments
+from services.roster_payload import RosterPayloads
+from services.roster_store import RosterView, StoreRosterSource
+from services.signup_service import RosterMember
+from services.team_solver import run_solver
+from web.caching import finalize, make_etag, not_modified
+
+if TYPE_CHECKING:
+  from fastapi.templating import Jinja2Templates
+
+# Rows per lazily loaded page of the team builder
+ROSTER_PAGE_SIZE = 50
+
+# Identifies a browser, so each one's team builder clicks coalesce together
+SESSION_COOKIE = "gvg_session"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  yield
+  # Don't lose the last burst of clicks
+  await app.state.assignments.flush_all()
 
-# TODO: Make this configurable in the UI
-MAX_NUM_GROUPS = 3
 
 # Initialize FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+
+
+@cache
+def get_templates() -> "Jinja2Templates":
+  # Jinja is imported on the first page render, not at startup
+  from fastapi.templating import Jinja2Templates
+
+  return Jinja2Templates(directory="templates")
+
+
+# Read rosters the bot published to the DB. When the web app runs inside
+# the bot process, main.py swaps in the bot's live source instead.
+app.state.rosters = StoreRosterSource()
+# Likewise for team assignments. Web workers write each click straight
+# away: the bot's /team_balance can't flush buffers in another process.
+app.state.assignments = TeamAssignments(buffered=False)
+roster_payloads = RosterPayloads()
 
 
 @app.get("/")
 async def hello_world(request: Request):
   # This sends 'request' and a 'message' variable to hello.html
-  return templates.TemplateResponse(
+  return get_templates().TemplateResponse(
+    request,
     "hello.html",
-    {"request": request, "message": "The Team Builder is under construction!"},
+    {"message": "The Team Builder is under construction!"},
   )
 
 
-@app.get("/roster")
-async def view_roster(request: Request):
-  bot = request.app.state.bot
-
-  # Get the config from DB
-  signup = await get_and_hydrate_signup(bot)
-
-  # TODO: Error catch this
-  if not signup:
-    raise NotImplementedError()
+def react_label(react: str) -> str:
+  # '<:tank:12345>' -> ':tank:'; unicode emojis render as themselves
+  if react.startswith("<") and ":" in react:
+    return f":{react.split(':')[1]}:"
+  return react
 
-  react_data = await get_react_data(signup.guild, signup.post)
 
-  # TEMP, no filtering
-  members = set().union(*react_data.values())
+def roster_rows(
+  view: RosterView, members: Sequence[RosterMember], assignments: Cells
+) -> list[dict]:
+  role_ids = view.role_ids
 
-  gvg_roles = []
-  for role in signup.roles:
-    if role:
-      gvg_roles.append({"id": role.id, "name": role.name, "color": str(role.color)})
-
-  roster = []
+  rows = []
   for member in members:
-    roster.append(
+    groups = {r_id: assignments.get((member.id, r_id), 0) for r_id in role_ids}
+    rows.append(
       {
         "id": member.id,
         "display_name": member.display_name,
-        "avatar_url":member.display_avatar.url,
-        "role_ids":[r.id for r in member.roles if r in signup.roles],
+        "avatar_url": member.avatar_url,
+        "role_ids": [r_id for i, r_id in enumerate(role_ids) if member.role_mask >> i & 1],
+        "groups": groups,
+        "assigned": any(groups.values()),
       }
     )
+  return rows
+
+
+async def get_roster_view(request: Request, guild_id: int) -> RosterView:
+  roster_view = await request.app.state.rosters.get(guild_id)
+  if roster_view is None:
+    raise HTTPException(status_code=404, detail="No signup roster for this guild.")
+  return roster_view
+
+
+def roster_etag(view: RosterView, assignments_revision: int) -> str:
+  # A new view is published whenever the snapshot or config behind it changes
+  return make_etag(
+    view.guild_id, view.published_at, assignments_revision, MAX_NUM_GROUPS, ROSTER_PAGE_SIZE
+  )
+
+
+async def get_assignments(request: Request, guild_id: int) -> tuple[int, Cells]:
+  assignments = request.app.state.assignments
+  # Show this browser its own clicks, even those still buffered
+  if session_id := request.cookies.get(SESSION_COOKIE):
+    await assignments.flush(guild_id, session_id)
+  return await assignments.get(guild_id)
+
+
+def is_number(s: str) -> bool:
+  # str.isdigit() also accepts digits int() can't parse, like "²"
+  return s.isascii() and s.isdigit()
+
+
+def parse_role(role: str) -> int | None:
+  # Filter selects send "" for "any role"
+  return int(role) if is_number(role) else None
+
+
+def rows_context(
+  view: RosterView,
+  assignments: Cells,
+  react: str,
+  role: int | None,
+  sort: str,
+  page: int,
+) -> dict:
+  """One page of roster rows, plus the URL that lazily loads the next one."""
+  members = view.select(react or None, role, sort)
+  start = page * ROSTER_PAGE_SIZE
+  end = start + ROSTER_PAGE_SIZE
 
-  return templates.TemplateResponse(
+  next_url = None
+  if end < len(members):
+    params = {"guild_id": view.guild_id, "page": page + 1, "sort": sort}
+    if react:
+      params["react"] = react
+    if role is not None:
+      params["role"] = role
+    next_url = f"/roster/rows?{urlencode(params)}"
+
+  return {
+    "roster": roster_rows(view, members[start:end], assignments),
+    "num_members": len(members),
+    "next_url": next_url,
+    "all_gvg_roles": view.roles,
+    "max_num_groups": MAX_NUM_GROUPS,
+  }
+
+
+@app.get("/roster")
+async def view_roster(
+  request: Request,
+  guild_id: int,
+  react: str = "",
+  role: str = "",
+  sort: Literal["roster", "name"] = "roster",
+):
+  """The team builder: header, filters and the first page of rows."""
+  roster_view = await get_roster_view(request, guild_id)
+  revision, assignments = await get_assignments(request, guild_id)
+  etag = roster_etag(roster_view, revision)
+  if cached := not_modified(request, etag):
+    return cached
+
+  role_id = parse_role(role)
+  response = get_templates().TemplateResponse(
+    request,
     "roster.html",
     {
-      "request": request,
-      "roster": roster,
-      "guild_name": signup.guild.name,
-      "all_gvg_roles": gvg_roles,
-      "max_num_groups": MAX_NUM_GROUPS,
+      **rows_context(roster_view, assignments, react, role_id, sort, page=0),
+      "guild_id": guild_id,
+      "guild_name": roster_view.guild_name,
+      "reacts": [(r, react_label(r)) for r in roster_view.reacts],
+      "filters": {"react": react, "role": role_id, "sort": sort},
+    },
+  )
+  if SESSION_COOKIE not in request.cookies:
+    response.set_cookie(SESSION_COOKIE, secrets.token_urlsafe(16), httponly=True, samesite="lax")
+  return finalize(request, response, etag)
+
+
+@app.get("/roster/rows")
+async def view_roster_rows(
+  request: Request,
+  guild_id: int,
+  page: int = Query(0, ge=0),
+  react: str = "",
+  role: str = "",
+  sort: Literal["roster", "name"] = "roster",
+):
+  """A page of roster rows, for lazy loading and filter changes."""
+  roster_view = await get_roster_view(request, guild_id)
+  revision, assignments = await get_assignments(request, guild_id)
+  etag = roster_etag(roster_view, revision)
+  if cached := not_modified(request, etag):
+    return cached
+
+  role_id = parse_role(role)
+
+  context = rows_context(roster_view, assignments, react, role_id, sort, page)
+  response = get_templates().TemplateResponse(request, "partials/roster_rows.html", context)
+  if page == 0:
+    # New filter: let the page update its member count
+    response.headers["HX-Trigger"] = json.dumps({"roster-count": context["num_members"]})
+  return finalize(request, response, etag)
+
+
+@app.get("/api/roster")
+async def api_roster(request: Request, guild_id: int, since: int | None = None):
+  """
+  The roster as compact JSON: role/react bitmasks and a member table. With
+  `since` (a version from an earlier response), only the members that
+  changed, unless that version is no longer known.
+  """
+  roster_view = await get_roster_view(request, guild_id)
+  etag = make_etag("api", roster_view.guild_id, roster_view.published_at, since)
+  if cached := not_modified(request, etag):
+    return cached
+
+  payload = roster_payloads.get(roster_view, since)
+  return finalize(request, Response(payload, media_type="application/json"), etag)
+
+
+def parse_cells(body: bytes) -> Cells:
+  """`member_<id>_role_<id>=<group>` form fields -> cells."""
+  cells = {}
+  for name, value in parse_qsl(body.decode()):
+    match name.split("_"):
+      case ["member", member_id, "role", role_id] if is_number(member_id) and is_number(role_id):
+        pass
+      case _:
+        raise HTTPException(status_code=400, detail=f"Unexpected field `{name}`.")
+
+    if not is_number(value) or int(value) > MAX_NUM_GROUPS:
+      raise HTTPException(status_code=400, detail=f"Group must be 0-{MAX_NUM_GROUPS}.")
+    cells[(int(member_id), int(role_id))] = int(value)
+  return cells
+
+
+@app.post("/team/update-assignment", status_code=204)
+async def update_assignment(request: Request, guild_id: int):
+  """
+  Save team builder cells. The body carries only the cells that changed;
+  when the web app runs in the bot process, bursts of clicks from one
+  browser are coalesced into one write. Cells must be for roster members
+  and tracked roles.
+  """
+  roster_view = await get_roster_view(request, guild_id)
+  cells = parse_cells(await request.body())
+  role_ids = set(roster_view.role_ids)
+  if any(role_id not in role_ids for _, role_id in cells):
+    raise HTTPException(status_code=400, detail="Role is not tracked for this guild.")
+  if any(member_id not in roster_view.member_ids for member_id, _ in cells):
+    raise HTTPException(status_code=400, detail="Member is not on this guild's roster.")
+
+  if cells:
+    session_id = request.cookies.get(SESSION_COOKIE, "")
+    await request.app.state.assignments.update(guild_id, session_id, cells)
+  return Response(status_code=204)
+
+
+def parse_balance_form(body: bytes, view: RosterView) -> tuple[str, list[int] | None]:
+  """The react filter and `quota_<role id>=<n>` per-group quotas, if given."""
+  react = ""
+  quotas = {}
+  for name, value in parse_qsl(body.decode()):
+    if name == "react":
+      react = value
+    elif name in ("guild_id", "role", "sort"):
+      # The rest of the filter form, posted along with the button
+      continue
+    elif name.startswith("quota_") and is_number(name[6:]) and is_number(value):
+      quotas[int(name[6:])] = int(value)
+    else:
+      raise HTTPException(status_code=400, detail=f"Unexpected field `{name}`.")
+
+  if not quotas:
+    return react, None
+  # Roles without a quota get no slots
+  return react, [quotas.get(r_id, 0) for r_id in view.role_ids]
+
+
+@app.post("/team/balance", status_code=204)
+async def balance_teams(request: Request, guild_id: int):
+  """
+  Fill the groups automatically. Assigned cells are kept as locks; the
+  rest of the (react-filtered) roster is placed around them.
+  """
+  roster_view = await get_roster_view(request, guild_id)
+  react, quotas = parse_balance_form(await request.body(), roster_view)
+  assignments = request.app.state.assignments
+  # Lock in every browser's pending clicks, not just this one's
+  await assignments.flush_guild(guild_id)
+  _, locked = await assignments.get(guild_id)
+
+  solution = await run_solver(
+    roster_view.select(react or None),
+    roster_view.role_ids,
+    MAX_NUM_GROUPS,
+    quotas,
+    locked,
+  )
+  if solution.assignments:
+    session_id = request.cookies.get(SESSION_COOKIE, "")
+    await assignments.save(guild_id, session_id, solution.assignments)
+
+  return Response(
+    status_code=204,
+    headers={
+      # Reload the page to show the new assignments
+      "HX-Refresh": "true",
+      "Server-Timing": f"solve;dur={solution.elapsed * 1e3:.1f}",
     },
   )
@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import pathlib
+from collections import OrderedDict
+
+from fastapi import Request, Response
+
+try:
+  import brotli
+except ImportError:  # Optional: without it, only gzip is offered
+  brotli = None
+
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# (url, etag, encoding) -> compressed body, so each version of a page is
+# compressed once
+COMPRESSED_CACHE_SIZE = 128
+_compressed: OrderedDict[tuple[str, str, str], bytes] = OrderedDict()
+
+
+def _templates_version() -> str:
+  """Changes whenever a template does, so deploys invalidate cached pages."""
+  digest = hashlib.blake2b(digest_size=8)
+  for path in sorted(pathlib.Path("templates").rglob("*.html")):
+    digest.update(path.read_bytes())
+  return digest.hexdigest()
+
+
+TEMPLATES_VERSION = _templates_version()
+
+
+def make_etag(*parts: object) -> str:
+  """
+  Weak ETag over `parts` and the templates. Weak, since the same ETag is
+  served for every content encoding of a page.
+  """
+  digest = hashlib.blake2b(repr((TEMPLATES_VERSION, parts)).encode(), digest_size=12)
+  return f'W/"{digest.hexdigest()}"'
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+  """A 304 response if the client's cached copy is still `etag`."""
+  if_none_match = request.headers.get("if-none-match", "")
+  tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+  if etag.removeprefix("W/") in tags or "*" in tags:
+    return Response(status_code=304, headers=_cache_headers(etag))
+  return None
+
+
+def finalize(request: Request, response: Response, etag: str) -> Response:
+  """Tag `response` with `etag` and compress it for the client."""
+  response.headers.update(_cache_headers(etag))
+
+  body = bytes(response.body)
+  encoding = _pick_encoding(request.headers.get("accept-encoding", ""))
+  if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+    return response
+
+  key = (str(request.url), etag, encoding)
+  compressed = _compressed.get(key)
+  if compressed is None:
+    if encoding == "br":
+      assert brotli is not None
+      compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+      compressed = gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+    _compressed[key] = compressed
+    while len(_compressed) > COMPRESSED_CACHE_SIZE:
+      _compressed.popitem(last=False)
+  else:
+    _compressed.move_to_end(key)
+
+  body = compressed
+  response.body = body
+  response.headers["Content-Encoding"] = encoding
+  response.headers["Content-Length"] = str(len(body))
+  return response
+
+
+def _cache_headers(etag: str) -> dict[str, str]:
+  # Cache, but revalidate every time (cheap: a 304 when unchanged)
+  return {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+
+def _pick_encoding(accept_encoding: str) -> str | None:
+  accepted = {}
+  for item in accept_encoding.split(","):
+    name, _, params = item.strip().partition(";")
+    q = 1.0
+    if params.strip().startswith("q="):
+      try:
+        q = float(params.strip()[2:])
+      except ValueError:
+        q = 0.0
+    accepted[name.strip().lower()] = q
+
+  if brotli is not None and accepted.get("br", 0) > 0:
+    return "br"
+  if accepted.get("gzip", 0) > 0:
+    return "gzip"
+  return None
@@ -0,0 +1,54 @@
+from contextlib import asynccontextmanager
+
+import aiohttp
+from fastapi import FastAPI, Request, Response
+
+from bot.sharding import ShardLayout
+
+# Hop-by-hop headers are per connection and must not be forwarded. Host is
+# kept, so workers build URLs (`url_for`) for the public address.
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "upgrade"}
+
+
+def make_router(layout: ShardLayout, worker_host: str = "127.0.0.1") -> FastAPI:
+  """
+  Front web app for multi-process mode.
+
+  Forwards each request to the worker process that owns the shard of the
+  request's `guild_id` query parameter (worker 0 if there is none).
+  """
+
+  @asynccontextmanager
+  async def lifespan(app: FastAPI):
+    # Pass bodies through untouched, compressed or not
+    app.state.session = aiohttp.ClientSession(auto_decompress=False)
+    yield
+    await app.state.session.close()
+
+  app = FastAPI(lifespan=lifespan)
+
+  @app.api_route(
+    "/{path:path}", methods=["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"]
+  )
+  async def forward(request: Request, path: str) -> Response:
+    guild_id = request.query_params.get("guild_id", "")
+    index = layout.process_for_guild(int(guild_id)) if guild_id.isdigit() else 0
+    url = f"http://{worker_host}:{layout.worker_port(index)}/{path}"
+
+    async with request.app.state.session.request(
+      request.method,
+      url,
+      params=list(request.query_params.multi_items()),
+      headers={k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS},
+      data=await request.body(),
+      allow_redirects=False,
+    ) as upstream:
+      return Response(
+        content=await upstream.read(),
+        status_code=upstream.status,
+        headers={
+          k: v for k, v in upstream.headers.items() if k.lower() not in HOP_HEADERS
+        },
+      )
+
+  return app